@@ -0,0 +1,40 @@
+// Compiles a Tailwind CSS source for a given list of class candidates.
+//
+//   node assets/build_css.mjs assets/app.css < candidates.txt > app.css
+//
+// Run by `python manage.py build_assets`, which scans the templates for the
+// candidates (one per line on stdin). Uses the tailwindcss package in
+// node_modules directly, so no CLI or network access is needed.
+import fs from 'node:fs';
+import path from 'node:path';
+import { fileURLToPath } from 'node:url';
+
+const root = path.dirname(path.dirname(fileURLToPath(import.meta.url)));
+const tailwind = path.join(root, 'node_modules', 'tailwindcss');
+const { compile } = await import(path.join(tailwind, 'dist', 'lib.mjs'));
+
+async function loadStylesheet(id, base) {
+  let file;
+  if (id === 'tailwindcss') {
+    file = path.join(tailwind, 'index.css');
+  } else if (id.startsWith('tailwindcss/')) {
+    file = path.join(tailwind, id.slice('tailwindcss/'.length));
+  } else {
+    file = path.resolve(base, id);
+  }
+  if (!file.endsWith('.css')) {
+    file += '.css';
+  }
+  return { path: file, base: path.dirname(file), content: fs.readFileSync(file, 'utf8') };
+}
+
+const source = process.argv[2];
+const candidates = fs.readFileSync(0, 'utf8').split('\n').filter(Boolean);
+const compiler = await compile(fs.readFileSync(source, 'utf8'), {
+  base: path.dirname(path.resolve(source)),
+  loadStylesheet,
+  loadModule: async (id) => {
+    throw new Error(`Plugins are not supported here: ${id}`);
+  },
+});
+process.stdout.write(compiler.build(candidates));
@@ -2,6 +2,10 @@
 ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with any ASGI server, e.g. ``uvicorn core.asgi:application``; the
+dashboard views are async and the project's middleware runs without thread
+hops except where it touches the database. ``manage.py benchmark_asgi``
+compares it with core/wsgi.py.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
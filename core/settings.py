@@ -1,6 +1,8 @@
 from pathlib import Path
 import os
 
+import dj_database_url
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', 'django-insecure-%vr%a@af!w-+on*a-*x3b&932sm!8+l(1kbn_4@$()7r*$&kv=')
@@ -25,6 +27,10 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'school.middleware.RoleMiddleware',
+    'school.middleware.TenantMiddleware',
+    'school.audit.AuditMiddleware',
+    'school.db_router.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -48,12 +54,75 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'core.wsgi.application'
 
+# DATABASE_URL is the primary (all writes); DATABASE_REPLICA_URLS is an
+# optional comma-separated list of read replicas used by the read-only views
+# (see school/db_router.py). To try it locally with two SQLite files:
+#   cp db.sqlite3 /tmp/replica.sqlite3
+#   DATABASE_REPLICA_URLS=sqlite:////tmp/replica.sqlite3 python manage.py runserver
+DATABASE_URL = os.environ.get('DATABASE_URL', f'sqlite:///{BASE_DIR / "db.sqlite3"}')
+DATABASE_CONN_MAX_AGE = int(os.environ.get('DJANGO_DB_CONN_MAX_AGE', '600'))
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': dj_database_url.parse(
+        DATABASE_URL, conn_max_age=DATABASE_CONN_MAX_AGE, conn_health_checks=True
+    ),
+}
+
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # Take the write lock when a transaction starts, so concurrent writers (job
+    # workers, requests) wait for it instead of failing with "database is locked".
+    DATABASES['default'].setdefault('OPTIONS', {})['transaction_mode'] = 'IMMEDIATE'
+
+REPLICA_DATABASES = []
+for index, url in enumerate(u.strip() for u in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if u.strip()):
+    alias = f'replica_{index}'
+    DATABASES[alias] = dj_database_url.parse(url, conn_max_age=DATABASE_CONN_MAX_AGE, conn_health_checks=True)
+    # Tests read replicas through the primary's test database.
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['school.db_router.PrimaryReplicaRouter']
+
+# After a request writes, the client's reads stay on the primary this long so
+# it sees its own changes despite replication lag.
+REPLICA_PIN_SECONDS = int(os.environ.get('DJANGO_REPLICA_PIN_SECONDS', '5'))
+
+# DJANGO_CACHE_URL selects the cache backend: redis://host:6379/0 or
+# file:///var/tmp/afriedusync-cache; unset means per-process local memory.
+CACHE_URL = os.environ.get('DJANGO_CACHE_URL', '')
+
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_URL}}
+elif CACHE_URL.startswith('file://'):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': CACHE_URL[len('file://'):]}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Role generations (see school/roles.py) are read through the cache only when
+# it is shared by all processes; otherwise from the database on each request.
+ROLE_VERSION_CACHE_SECONDS = int(os.environ.get('DJANGO_ROLE_VERSION_CACHE_SECONDS', '300' if CACHE_URL else '0'))
+
+# DJANGO_SESSION_BACKEND: db, cached_db or signed_cookies (see school/sessions.py).
+# cached_db is only the default with a cache shared by all processes.
+SESSION_BACKENDS = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
 }
+SESSION_BACKEND = os.environ.get('DJANGO_SESSION_BACKEND', 'cached_db' if CACHE_URL else 'db')
+SESSION_ENGINE = SESSION_BACKENDS[SESSION_BACKEND]
+SESSION_SERIALIZER = 'school.sessions.CompactJSONSerializer'
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# Dashboards are cached per school version (see school/caching.py), so entries
+# never go stale; the timeout only bounds how long abandoned versions linger.
+# Off (0) without a shared cache: per-process versions cannot be bumped
+# across workers.
+DASHBOARD_CACHE_SECONDS = int(os.environ.get('DJANGO_DASHBOARD_CACHE_SECONDS', '3600' if CACHE_URL else '0'))
+# Async dashboards run independent queries concurrently on this many threads,
+# each with its own database connection (see school/parallel.py).
+DASHBOARD_PARALLEL_QUERIES = os.environ.get('DJANGO_DASHBOARD_PARALLEL_QUERIES', 'True') == 'True'
+DASHBOARD_QUERY_THREADS = int(os.environ.get('DJANGO_DASHBOARD_QUERY_THREADS', '8'))
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -81,7 +150,53 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+# collectstatic writes content-hashed, precompressed copies (school/staticfiles.py).
+# static/build/app.css itself comes from `manage.py build_assets`.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'school.staticfiles.CompressedManifestStaticFilesStorage'},
+}
+# Serve STATIC_ROOT from Django, with immutable caching for hashed names, where
+# nothing in front of it does. Off in DEBUG, where runserver serves static files.
+SERVE_STATIC = os.environ.get('DJANGO_SERVE_STATIC', 'True') == 'True'
+if SERVE_STATIC:
+    MIDDLEWARE.insert(MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1, 'school.staticfiles.StaticFilesMiddleware')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-LOGIN_URL = '/login/'
\ No newline at end of file
+LOGIN_URL = '/login/'
+
+# Offline clients whose sync cursor is older than this get a full resync.
+SYNC_TOMBSTONE_DAYS = 90
+# Each sync re-sends changes this recent before the client's cursor, to catch
+# writes whose transaction committed after they were timestamped.
+SYNC_OVERLAP_SECONDS = int(os.environ.get('DJANGO_SYNC_OVERLAP_SECONDS', '60'))
+
+# Opt-in request profiling: Server-Timing headers and one JSON log line per
+# request (see school/profiling.py). Not installed at all when disabled.
+PROFILING_ENABLED = os.environ.get('DJANGO_PROFILING', 'False') == 'True'
+PROFILING_SLOW_QUERY_MS = float(os.environ.get('DJANGO_PROFILING_SLOW_QUERY_MS', '50'))
+PROFILING_SLOW_QUERY_SAMPLES = 5
+
+if PROFILING_ENABLED:
+    MIDDLEWARE = ['school.profiling.ProfilingMiddleware'] + MIDDLEWARE + ['school.profiling.ViewTimingMiddleware']
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'school.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'school.jobs': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,47 @@
+"""
+Lean production profile for the serverless deployment (core/wsgi.py on
+Vercel), where every cold start pays for imports and ``django.setup()``.
+core/wsgi.py, the Vercel entrypoint, selects it unless DJANGO_SETTINGS_MODULE
+says otherwise; manage.py and core/asgi.py keep core.settings.
+
+Compared with core/settings.py:
+
+* DEBUG defaults to off.
+* The admin (and its app-directory templates) is left out unless
+  DJANGO_ADMIN_ENABLED=True. Serve it from a separate, non-serverless
+  deployment of the default settings, or enable it here at a startup cost.
+* Templates are compiled once per process by the cached loader, from an
+  explicit loader list instead of scanning every installed app.
+
+``manage.py benchmark_startup --settings-module core.settings --settings-module
+core.settings_lean`` compares the two.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, INSTALLED_APPS, os
+
+DEBUG = os.environ.get('DJANGO_DEBUG', 'False') == 'True'
+
+ADMIN_ENABLED = os.environ.get('DJANGO_ADMIN_ENABLED', 'False') == 'True'
+
+if not ADMIN_ENABLED:
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app != 'django.contrib.admin']
+
+TEMPLATE_LOADERS = ['django.template.loaders.filesystem.Loader']
+if ADMIN_ENABLED:
+    TEMPLATE_LOADERS.append('django.template.loaders.app_directories.Loader')
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [BASE_DIR / 'templates'],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+            'loaders': [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)],
+        },
+    },
+]
@@ -1,7 +1,12 @@
-from django.contrib import admin
+from django.apps import apps
 from django.urls import path, include
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('', include('school.urls')),
-]
\ No newline at end of file
+]
+
+# The lean settings profile (core/settings_lean.py) can leave the admin out.
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
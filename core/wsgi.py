@@ -1,6 +1,8 @@
 import os
 from django.core.wsgi import get_wsgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# This is the Vercel entrypoint, so it defaults to the lean serverless profile
+# (see core/settings_lean.py); manage.py and core/asgi.py use core.settings.
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings_lean')
 
 application = get_wsgi_application()
\ No newline at end of file
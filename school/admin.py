@@ -1,11 +1,265 @@
-from django.contrib import admin
-from .models import School, TeacherProfile, ParentProfile, Student, LessonPlan, Club, Course, Assignment
-
-admin.site.register(School)
-admin.site.register(TeacherProfile)
-admin.site.register(ParentProfile)
-admin.site.register(Student)
-admin.site.register(LessonPlan)
-admin.site.register(Club)
-admin.site.register(Course)
-admin.site.register(Assignment)
\ No newline at end of file
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
+
+from . import approvals, directory, search, tenancy
+from .models import (
+    School, TeacherProfile, ParentProfile, Student, LessonPlan, Club, Course, Assignment, GradeRecord,
+    Room, Period, TimetableEntry, AuditEvent,
+)
+
+# Unfiltered changelists of tables at least this big show an estimated count.
+ESTIMATE_COUNT_THRESHOLD = 100_000
+
+
+def estimated_count(model, using):
+    """
+    The planner's row estimate for ``model``'s table, without reading it:
+    ``pg_class.reltuples`` on PostgreSQL, ``sqlite_stat1`` on SQLite. Both
+    only exist once the table has been analyzed; ``None`` until then, and on
+    other backends.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    queries = {
+        'postgresql': ('SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)', [table]),
+        'sqlite': ('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table]),
+    }
+    if connection.vendor not in queries:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(*queries[connection.vendor])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if not row or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    # PostgreSQL reports -1 for a table that has never been analyzed.
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Counts an unfiltered changelist from the table statistics once the table
+    has ESTIMATE_COUNT_THRESHOLD rows; filtered lists, smaller tables and
+    tables without statistics still get an exact COUNT(*).
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= ESTIMATE_COUNT_THRESHOLD:
+                return estimate
+        return queryset.count()
+
+
+class SchoolListFilter(admin.SimpleListFilter):
+    """
+    Filter by school, chosen from a name search (school_q) instead of a list
+    of every school.
+    """
+    title = 'school'
+    parameter_name = 'school'
+    search_parameter = 'school_q'
+    template = 'admin/school_filter.html'
+
+    def __init__(self, request, params, model, model_admin):
+        self.search = params.pop(self.search_parameter, [''])[-1].strip()
+        ignored = {self.parameter_name, self.search_parameter, 'p'}
+        self.preserved_params = [
+            (name, value) for name, values in request.GET.lists() if name not in ignored for value in values
+        ]
+        super().__init__(request, params, model, model_admin)
+
+    def lookups(self, request, model_admin):
+        choices = [(str(school['id']), school['name']) for school in directory.lookup(self.search)]
+        if self.value() and self.value().isdigit() and self.value() not in {pk for pk, _ in choices}:
+            choices += [
+                (str(pk), name)
+                for pk, name in School.objects.filter(pk=self.value()).values_list('pk', 'name')
+            ]
+        return choices
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(school_id=self.value())
+        return queryset
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelists that stay fast on large tables: estimated counts instead of
+    COUNT(*), no full-table total or facet counts, and related objects picked
+    by id or autocomplete instead of dropdowns listing every row.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    list_filter = (SchoolListFilter,)
+    autocomplete_fields = ('school',)
+
+
+class IndexedSearchAdmin(LargeTableAdmin):
+    """Answer the changelist search box from the full-text index, across schools."""
+    search_doc_type = None
+    search_limit = 1000
+    actions = ('reindex_selected',)
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        ids = search.matching_ids(self.search_doc_type, search_term, limit=self.search_limit)
+        return queryset.filter(pk__in=ids), False
+
+    @admin.action(description='Rebuild search index entries for selected %(verbose_name_plural)s')
+    def reindex_selected(self, request, queryset):
+        objects = list(queryset)
+        search.index_objects(objects)
+        self.message_user(request, f'Reindexed {len(objects)} {self.opts.verbose_name_plural}.', messages.SUCCESS)
+
+
+@admin.register(School)
+class SchoolAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_display = ('name', 'proprietor', 'created_at')
+    search_fields = ('name',)
+    search_help_text = 'Schools whose name starts with the search text.'
+
+    def get_queryset(self, request):
+        # The other models are scoped by their managers (school/tenancy.py).
+        queryset = super().get_queryset(request)
+        school_id = tenancy.current_school_id()
+        if school_id is not None:
+            queryset = queryset.filter(pk=school_id)
+        return queryset
+
+    def get_search_results(self, request, queryset, search_term):
+        # Prefix match on the indexed name_key, also used by autocomplete fields.
+        if not search_term.strip():
+            return queryset, False
+        return directory.filter_prefix(queryset, search_term), False
+
+
+@admin.register(Student)
+class StudentAdmin(IndexedSearchAdmin):
+    search_doc_type = 'student'
+    search_fields = ('name', 'admission_number')
+    list_display = ('name', 'admission_number', 'grade', 'school')
+    list_select_related = ('school',)
+    raw_id_fields = ('courses', 'clubs')
+
+
+@admin.register(LessonPlan)
+class LessonPlanAdmin(IndexedSearchAdmin):
+    search_doc_type = 'lessonplan'
+    search_fields = ('title', 'objective', 'activities')
+    list_display = ('title', 'teacher', 'school', 'approved', 'submission_date')
+    list_filter = (SchoolListFilter, 'approved')
+    list_select_related = ('teacher', 'school')
+    raw_id_fields = ('teacher',)
+    actions = ('approve_selected', 'reject_selected', 'reindex_selected')
+
+    def _review(self, request, queryset, approved):
+        by_school = {}
+        for pk, school_id in queryset.values_list('pk', 'school_id'):
+            by_school.setdefault(school_id, []).append(pk)
+        # Same path as the headteacher queue: one UPDATE per school, which
+        # also invalidates that school's dashboards.
+        updated = sum(approvals.review_plans(school_id, ids, approved) for school_id, ids in by_school.items())
+        self.message_user(request, f'{updated} lesson plans {"approved" if approved else "rejected"}.', messages.SUCCESS)
+
+    @admin.action(description='Approve selected lesson plans')
+    def approve_selected(self, request, queryset):
+        self._review(request, queryset, True)
+
+    @admin.action(description='Reject selected lesson plans')
+    def reject_selected(self, request, queryset):
+        self._review(request, queryset, False)
+
+
+@admin.register(Assignment)
+class AssignmentAdmin(IndexedSearchAdmin):
+    search_doc_type = 'assignment'
+    search_fields = ('title', 'description')
+    list_display = ('title', 'course', 'school', 'due_date')
+    list_select_related = ('course', 'school')
+    raw_id_fields = ('course',)
+
+
+@admin.register(TeacherProfile)
+class TeacherProfileAdmin(LargeTableAdmin):
+    list_display = ('user', 'school')
+    list_select_related = ('user', 'school')
+    raw_id_fields = ('user',)
+
+
+@admin.register(ParentProfile)
+class ParentProfileAdmin(LargeTableAdmin):
+    list_display = ('user', 'school')
+    list_select_related = ('user', 'school')
+    raw_id_fields = ('user', 'students')
+
+
+@admin.register(Club)
+class ClubAdmin(LargeTableAdmin):
+    list_display = ('name', 'school')
+    list_select_related = ('school',)
+
+
+@admin.register(Course)
+class CourseAdmin(LargeTableAdmin):
+    list_display = ('name', 'teacher', 'school', 'lessons_per_week')
+    list_select_related = ('teacher', 'school')
+    raw_id_fields = ('teacher',)
+
+
+@admin.register(GradeRecord)
+class GradeRecordAdmin(LargeTableAdmin):
+    list_display = ('student', 'course', 'term', 'assessment', 'score', 'school')
+    list_select_related = ('student', 'course', 'school')
+    raw_id_fields = ('student', 'course')
+
+
+@admin.register(Room)
+class RoomAdmin(LargeTableAdmin):
+    list_display = ('name', 'capacity', 'school')
+    list_select_related = ('school',)
+
+
+@admin.register(Period)
+class PeriodAdmin(LargeTableAdmin):
+    list_display = ('__str__', 'start_time', 'end_time', 'school')
+    list_select_related = ('school',)
+
+
+@admin.register(TimetableEntry)
+class TimetableEntryAdmin(LargeTableAdmin):
+    list_display = ('course', 'period', 'room', 'school')
+    list_select_related = ('course', 'period', 'room', 'school')
+    raw_id_fields = ('course', 'period', 'room')
+
+
+@admin.register(AuditEvent)
+class AuditEventAdmin(LargeTableAdmin):
+    list_display = ('created_at', 'action', 'model', 'object_id', 'actor', 'school')
+    list_filter = (SchoolListFilter, 'action', 'model')
+    list_select_related = ('actor', 'school')
+    autocomplete_fields = ()
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,184 @@
+"""
+Term results: rankings, means, medians, percentiles and grade distributions
+for the school, each class (``Student.grade``) and each course.
+
+A student's result in a course is the average of their assessments, and
+their term average is the mean of those. One aggregate query returns every
+(student, course) average of the term, and a single pass over the rows packs
+them into a typed ``array('d')`` per course and a running total per student.
+Each group is then sorted once and every statistic is read off the sorted
+scores: the mean from one ``fsum``, median and percentiles by interpolating
+between neighbours, grade bands by bisecting at the band edges. No statistic
+walks the records again, and templates only format numbers.
+
+numpy would do the same arithmetic, but it is not a dependency here and at
+school sizes (60k results for 10k students) the work is dominated by the
+query, not the maths.
+
+Results are cached per school and term under the dashboards' version key
+(school/caching.py), so a new or changed grade recomputes them on next view.
+"""
+import hashlib
+from array import array
+from bisect import bisect_left
+from math import fsum, sqrt
+from operator import mul
+
+from django.db.models import Avg, FloatField
+
+from . import caching, gradebook
+from .models import Course, GradeRecord, Student
+
+# Lower bound of each band, best first.
+GRADE_BANDS = (('A', 70), ('B', 60), ('C', 50), ('D', 45), ('E', 40), ('F', 0))
+PASS_MARK = 40
+PERCENTILES = (10, 25, 75, 90)
+
+
+class TermScores:
+    """
+    One term's per-(student, course) averages for a school: an ``array('d')``
+    of scores per course, and each student's running total and course count.
+    """
+
+    def __init__(self, school_id, term):
+        self.school_id = school_id
+        self.term = term
+        self.results = 0
+        self.course_scores = {}
+        self.student_totals = {}
+        self.student_courses = {}
+        rows = (
+            GradeRecord.objects.filter(school_id=school_id, term=term)
+            .values_list('student_id', 'course_id')
+            .annotate(average=Avg('score', output_field=FloatField()))
+            .order_by()
+        )
+        totals, courses = self.student_totals, self.student_courses
+        for student_id, course_id, average in rows.iterator(chunk_size=5000):
+            scores = self.course_scores.get(course_id)
+            if scores is None:
+                scores = self.course_scores[course_id] = array('d')
+            scores.append(average)
+            totals[student_id] = totals.get(student_id, 0.0) + average
+            courses[student_id] = courses.get(student_id, 0) + 1
+            self.results += 1
+        self.course_names = dict(Course.objects.filter(school_id=school_id).values_list('id', 'name'))
+        self.students = {
+            pk: (name, grade)
+            for pk, name, grade in Student.objects.filter(school_id=school_id).values_list('id', 'name', 'grade')
+        }
+
+    def __len__(self):
+        return self.results
+
+
+def percentile(ordered, fraction):
+    """Linear interpolation between the closest ranks of an ascending sequence."""
+    position = fraction * (len(ordered) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def describe(ordered):
+    """Summary statistics of an ascending ``array('d')`` of scores."""
+    count = len(ordered)
+    if not count:
+        return None
+    mean = fsum(ordered) / count
+    # Count of scores at or above each band's lower bound, from bisecting once per band.
+    at_least = [count - bisect_left(ordered, bound) for _, bound in GRADE_BANDS]
+    bands = []
+    previous = 0
+    for (band, _), reached in zip(GRADE_BANDS, at_least):
+        bands.append({'band': band, 'count': reached - previous, 'percent': round(100 * (reached - previous) / count, 1)})
+        previous = reached
+    stats = {
+        'count': count,
+        'mean': round(mean, 2),
+        'median': round(percentile(ordered, 0.5), 2),
+        'stdev': round(sqrt(max(fsum(map(mul, ordered, ordered)) / count - mean * mean, 0.0)), 2),
+        'lowest': round(ordered[0], 2),
+        'highest': round(ordered[-1], 2),
+        'pass_rate': round(100 * (count - bisect_left(ordered, PASS_MARK)) / count, 1),
+        'distribution': bands,
+    }
+    for p in PERCENTILES:
+        stats[f'p{p}'] = round(percentile(ordered, p / 100), 2)
+    return stats
+
+
+def rank(averages):
+    """
+    ``[(position, student_id, average)]`` best first, for a ``{student_id:
+    average}`` mapping. Ties share a position and the next one is skipped
+    (1, 2, 2, 4), as on report cards.
+    """
+    ordered = sorted(averages.items(), key=lambda item: (-item[1], item[0]))
+    ranking = []
+    for index, (student_id, average) in enumerate(ordered):
+        position = ranking[-1][0] if ranking and ranking[-1][2] == average else index + 1
+        ranking.append((position, student_id, average))
+    return ranking
+
+
+def compute(scores):
+    """All statistics for one term's ``TermScores``, as plain (cacheable) data."""
+    # Term average of each student: mean of their course averages.
+    student_averages = {
+        student_id: round(total / scores.student_courses[student_id], 2)
+        for student_id, total in scores.student_totals.items()
+    }
+
+    classes = {}
+    for student_id, average in student_averages.items():
+        grade = scores.students.get(student_id, ('', ''))[1] or 'Unassigned'
+        classes.setdefault(grade, {})[student_id] = average
+
+    class_results = []
+    for grade in sorted(classes):
+        averages = classes[grade]
+        ranking = [
+            (position, student_id, scores.students.get(student_id, ('',))[0], average)
+            for position, student_id, average in rank(averages)
+        ]
+        class_results.append({
+            'name': grade,
+            'stats': describe(array('d', sorted(averages.values()))),
+            'ranking': ranking,
+        })
+
+    course_results = [
+        {'course_id': course_id, 'name': scores.course_names.get(course_id, ''), 'stats': describe(array('d', sorted(values)))}
+        for course_id, values in scores.course_scores.items()
+    ]
+    # Weakest first: the ones a headteacher needs to look at.
+    course_results.sort(key=lambda course: (course['stats']['mean'], course['name']))
+
+    return {
+        'term': scores.term,
+        'school': describe(array('d', sorted(student_averages.values()))),
+        'classes': class_results,
+        'courses': course_results,
+    }
+
+
+def term_results(school_id, term):
+    """Cached ``compute`` for one school and term; ``None`` when nothing is graded."""
+    def build():
+        scores = TermScores(school_id, term)
+        return compute(scores) if len(scores) else None
+
+    # Cached as a one-item list so an ungraded term is cached as well; the term
+    # label is hashed since it contains spaces.
+    key = hashlib.md5(term.encode()).hexdigest()
+    return caching.cached(school_id, 'term_results', lambda: [build()], key)[0]
+
+
+def dashboard(school_id, term=None):
+    """``(terms, results)`` for a dashboard: ``term`` or the most recently graded one."""
+    terms = caching.cached(school_id, 'grade_terms', lambda: gradebook.terms(school_id))
+    if term not in terms:
+        term = terms[0] if terms else None
+    return terms, term_results(school_id, term) if term else None
@@ -0,0 +1,94 @@
+"""
+Headteacher lesson-plan approval queue.
+
+The queue is read newest-first with keyset pagination on
+``(submission_date, id)``, which the ``(school, approved, submission_date)``
+index serves directly: every page is an index range scan, however deep the
+headteacher pages, and no COUNT(*) is needed. Reviews are applied with one
+UPDATE for any number of plans.
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import audit, caching, jobs, summaries
+from .models import AuditEvent, LessonPlan
+
+PAGE_SIZE = 25
+
+
+def encode_cursor(plan):
+    return f'{plan.submission_date.isoformat()}_{plan.pk}'
+
+
+def decode_cursor(cursor):
+    """Return ``(submission_date, id)`` or ``None`` for a missing/garbled cursor."""
+    try:
+        timestamp, pk = cursor.rsplit('_', 1)
+        submitted = parse_datetime(timestamp)
+        pk = int(pk)
+    except (AttributeError, TypeError, ValueError):
+        return None
+    if submitted is None:
+        return None
+    return submitted, pk
+
+
+def pending_page(school_id, cursor=None, page_size=PAGE_SIZE):
+    """
+    Return ``(plans, next_cursor)`` for one page of unapproved plans.
+
+    ``next_cursor`` is ``None`` on the last page.
+    """
+    plans = (
+        LessonPlan.objects.filter(school_id=school_id, approved=False)
+        .select_related('teacher')
+        .only('id', 'title', 'approved', 'rejection_reason', 'submission_date', 'teacher__username')
+        .order_by('-submission_date', '-id')
+    )
+    position = decode_cursor(cursor)
+    if position is not None:
+        submitted, pk = position
+        plans = plans.filter(
+            Q(submission_date__lt=submitted) | Q(submission_date=submitted, id__lt=pk)
+        )
+    # Fetch one extra row to learn whether another page exists.
+    plans = list(plans[:page_size + 1])
+    if len(plans) > page_size:
+        plans = plans[:page_size]
+        return plans, encode_cursor(plans[-1])
+    return plans, None
+
+
+def review_plans(school_id, plan_ids, approved, rejection_reason=''):
+    """
+    Approve or reject many plans with one UPDATE; returns the number changed.
+    The locked rows read first decide which plans change, and those alone are
+    updated, counted in the pending total, audited and notified.
+    """
+    reason = '' if approved else rejection_reason
+    values = {'approved': approved, 'rejection_reason': reason, 'updated_at': timezone.now()}
+    with transaction.atomic():
+        # What each plan was before the review, locked until the UPDATE commits.
+        current = (
+            LessonPlan.objects.select_for_update().filter(school_id=school_id, id__in=plan_ids)
+            .values_list('id', 'approved', 'rejection_reason')
+        )
+        changed = [row for row in current if row[1:] != (approved, reason)]
+        if not changed:
+            return 0
+        LessonPlan.objects.filter(id__in=[pk for pk, _, _ in changed]).update(**values)
+        flipped = sum(1 for _, was_approved, _ in changed if was_approved != approved)
+        summaries.adjust(school_id, pending_plans=-flipped if approved else flipped)
+        events = []
+        for pk, was_approved, old_reason in changed:
+            changes = {field: [old, new] for field, old, new in (
+                ('approved', was_approved, approved), ('rejection_reason', old_reason, reason),
+            ) if old != new}
+            events.append(audit.event(LessonPlan, school_id, pk, AuditEvent.UPDATE, changes))
+        audit.add(events)
+        # Only teachers whose plan actually changed are notified.
+        jobs.enqueue('lesson_plans_reviewed', {'plan_ids': [pk for pk, _, _ in changed], 'approved': approved})
+    caching.bump(school_id)
+    return len(changed)
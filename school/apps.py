@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class SchoolConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'school'
\ No newline at end of file
+    name = 'school'
+
+    def ready(self):
+        from . import signals, tasks  # noqa: F401
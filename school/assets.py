@@ -0,0 +1,166 @@
+"""
+Build of the site stylesheet, static/build/app.css (``manage.py build_assets``).
+
+Pages used to load Tailwind's in-browser compiler, Font Awesome and Google
+Fonts from CDNs and generate their CSS on every page view. Instead:
+
+* Templates and views are scanned for class-name candidates, the same way
+  Tailwind's own scanner does, and only those utilities are generated from
+  assets/app.css by the tailwindcss package in node_modules
+  (assets/build_css.mjs).
+* The ``fa-*`` icons in use are read from assets/icons/ (Font Awesome Free
+  solid SVGs, named as the templates use them) and emitted as CSS masks, so
+  an icon is a few hundred bytes of the one stylesheet instead of a 150 KB
+  webfont and its CSS.
+* The result is minified and committed, so deployments need no Node.js;
+  ``build_assets --check`` fails when it is out of date.
+
+Hashed names, precompressed copies and far-future cache headers are added by
+collectstatic and the serving code in school/staticfiles.py.
+"""
+import json
+import re
+import subprocess
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+
+SOURCE = 'assets/app.css'
+ICON_DIR = 'assets/icons'
+OUTPUT = 'static/build/app.css'
+NODE_SCRIPT = 'assets/build_css.mjs'
+SCAN_GLOBS = ('templates/**/*.html', 'school/**/*.py')
+ICON_CLASSES = ('fa', 'fas', 'fa-solid')
+
+# Same split as Tailwind's scanner: a candidate cannot contain whitespace,
+# quotes or markup delimiters, so template and Python syntax falls away.
+_CANDIDATE_SPLIT = re.compile(r'''[\s"'`<>=;{}]+''')
+_ICON = re.compile(r'(?<![\w-])fa-([a-z0-9]+(?:-[a-z0-9]+)*)\b')
+_VIEWBOX = re.compile(r'viewBox="0 0 (\d+) (\d+)"')
+_SVG_COMMENT = re.compile(r'<!--.*?-->', re.S)
+
+
+def base_dir():
+    return Path(settings.BASE_DIR)
+
+
+def scanned_files(root=None):
+    root = Path(root or base_dir())
+    for pattern in SCAN_GLOBS:
+        for path in sorted(root.glob(pattern)):
+            if 'migrations' not in path.parts and path.name not in ('tests.py', 'assets.py'):
+                yield path
+
+
+def candidates(texts):
+    """Sorted class-name candidates and ``fa-*`` icon names found in ``texts``."""
+    found, icons = set(), set()
+    for text in texts:
+        for token in _CANDIDATE_SPLIT.split(text):
+            if token:
+                found.add(token)
+        icons.update(_ICON.findall(text))
+    return sorted(found), sorted(icons - {name[len('fa-'):] for name in ICON_CLASSES})
+
+
+def icon_css(icons, icon_dir):
+    """CSS for ``icons``, each an SVG mask sized from its viewBox; raises for a missing icon."""
+    icon_dir = Path(icon_dir)
+    rules = [
+        ','.join(f'.{name}' for name in ICON_CLASSES)
+        + '{display:inline-block;height:1em;width:1em;vertical-align:-.125em;background-color:currentColor;'
+        '-webkit-mask:var(--fa-icon) center/contain no-repeat;mask:var(--fa-icon) center/contain no-repeat}'
+    ]
+    missing = []
+    for name in icons:
+        path = icon_dir / f'{name}.svg'
+        if not path.is_file():
+            missing.append(name)
+            continue
+        svg = _SVG_COMMENT.sub('', path.read_text()).strip()
+        width, height = (int(n) for n in _VIEWBOX.search(svg).groups())
+        data = quote(svg.replace('"', "'"), safe=" /:='.,-")
+        rules.append(f'.fa-{name}{{--fa-icon:url("data:image/svg+xml,{data}");width:{round(width / height, 4):g}em}}')
+    if missing:
+        raise FileNotFoundError(f'No SVG in {icon_dir} for: {", ".join("fa-" + name for name in missing)}')
+    return '\n'.join(rules)
+
+
+def minify(css):
+    """Drop comments (except ``/*! ... */``) and insignificant whitespace, leaving strings alone."""
+    out = []
+    i, length = 0, len(css)
+    while i < length:
+        char = css[i]
+        if char in '"\'':
+            end = i + 1
+            while end < length and css[end] != char:
+                end += 2 if css[end] == '\\' else 1
+            out.append(css[i:end + 1])
+            i = end + 1
+        elif css.startswith('/*', i):
+            end = css.find('*/', i + 2)
+            end = length if end < 0 else end + 2
+            if css.startswith('/*!', i):
+                out.append(css[i:end] + '\n')
+            i = end
+        elif char.isspace():
+            while i < length and css[i].isspace():
+                i += 1
+            previous = out[-1][-1:] if out else ''
+            following = css[i:i + 1]
+            if previous and following and previous not in '{};,:>\n' and following not in '{};,>!)':
+                out.append(' ')
+        elif char == ';' and css[i + 1:].lstrip().startswith('}'):
+            i += 1
+        else:
+            out.append(char)
+            i += 1
+    return ''.join(out).strip() + '\n'
+
+
+def compile_tailwind(source, classes, node='node'):
+    """Run assets/build_css.mjs on ``source`` for the given candidates."""
+    result = subprocess.run(
+        [node, str(base_dir() / NODE_SCRIPT), str(source)],
+        input='\n'.join(classes), capture_output=True, text=True, cwd=base_dir(), check=False,
+    )
+    if result.returncode:
+        raise RuntimeError(f'Tailwind build failed:\n{result.stderr.strip()}')
+    return result.stdout
+
+
+def build(node='node'):
+    """The minified stylesheet for the current templates, and the icons it contains."""
+    root = base_dir()
+    classes, icons = candidates(path.read_text() for path in scanned_files(root))
+    licence = '/*! Icons: Font Awesome Free by @fontawesome - https://fontawesome.com License - https://fontawesome.com/license/free (CC BY 4.0) */'
+    css = compile_tailwind(root / SOURCE, classes, node=node)
+    return minify(css + '\n' + licence + '\n' + icon_css(icons, root / ICON_DIR)), icons
+
+
+def vendor_icons(names, fontawesome, icon_dir=None):
+    """
+    Copy the solid SVGs for ``names`` from a Font Awesome Free download
+    (the directory holding ``svgs/`` and ``metadata/``), resolving the
+    version 5 names the templates use through ``metadata/icons.json``.
+    Returns the names that could not be found.
+    """
+    fontawesome = Path(fontawesome)
+    icon_dir = Path(icon_dir or base_dir() / ICON_DIR)
+    icon_dir.mkdir(parents=True, exist_ok=True)
+    metadata_path = fontawesome / 'metadata' / 'icons.json'
+    aliases = {}
+    if metadata_path.is_file():
+        for name, meta in json.loads(metadata_path.read_text()).items():
+            for alias in (meta.get('aliases') or {}).get('names', []):
+                aliases.setdefault(alias, name)
+    missing = []
+    for name in names:
+        svg = fontawesome / 'svgs' / 'solid' / f'{aliases.get(name, name)}.svg'
+        if svg.is_file():
+            (icon_dir / f'{name}.svg').write_text(svg.read_text())
+        else:
+            missing.append(name)
+    return missing
@@ -0,0 +1,173 @@
+"""
+Daily attendance ledger.
+
+A roll call saves a whole class in one transaction: the day's records are
+upserted with a single ``bulk_create(update_conflicts=True)`` and the
+per-term AttendanceSummary counters are adjusted with ``F()`` increments,
+one UPDATE per distinct change (e.g. "+1 present"), so a class of 40 costs a
+handful of statements.
+
+The students' summary rows are created if missing and locked before the
+previous statuses are read, so two roll calls for the same students queue
+behind each other and the second sees what the first wrote. Without that
+lock, both could find no record for a student and both count a new day.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from . import audit, caching, summaries
+from .models import AttendanceRecord, AttendanceSummary, AuditEvent, Student
+from .terms import term_bounds, term_for_date
+
+STATUSES = tuple(status for status, label in AttendanceRecord.STATUS_CHOICES)
+# Statuses that count towards the attendance rate.
+ATTENDED = (AttendanceRecord.PRESENT, AttendanceRecord.LATE)
+
+
+def record_roll_call(school_id, date, statuses, recorded_by=None):
+    """
+    Save ``statuses`` (a ``{student_id: status}`` mapping) for ``date``.
+
+    Returns the number of records written.
+    """
+    unknown = set(statuses.values()) - set(STATUSES)
+    if unknown:
+        raise ValueError(f'Unknown attendance status: {", ".join(sorted(unknown))}')
+    if not statuses:
+        return 0
+
+    term = term_for_date(date)
+    student_ids = sorted(statuses)
+    with transaction.atomic():
+        AttendanceSummary.objects.bulk_create(
+            [AttendanceSummary(school_id=school_id, student_id=student_id, term=term) for student_id in student_ids],
+            ignore_conflicts=True,
+        )
+        # Locked in id order, so overlapping roll calls cannot deadlock.
+        list(
+            AttendanceSummary.objects.select_for_update()
+            .filter(term=term, student_id__in=student_ids).order_by('student_id').values_list('id', flat=True)
+        )
+        previous = dict(
+            AttendanceRecord.objects.filter(date=date, student_id__in=student_ids)
+            .values_list('student_id', 'status')
+        )
+        records = AttendanceRecord.objects.bulk_create(
+            [
+                AttendanceRecord(
+                    school_id=school_id, student_id=student_id, date=date,
+                    status=status, recorded_by=recorded_by,
+                )
+                for student_id, status in statuses.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['student', 'date'],
+            update_fields=['status', 'recorded_by', 'recorded_at'],
+        )
+        _apply_deltas(school_id, term, previous, statuses)
+        _audit(school_id, date, previous, records)
+    caching.bump(school_id)
+    return len(statuses)
+
+
+def _apply_deltas(school_id, term, previous, statuses):
+    # Group students by the exact counter change they need so each group is
+    # one UPDATE ... SET present = present + 1, absent = absent - 1.
+    groups = defaultdict(list)
+    for student_id, status in statuses.items():
+        old = previous.get(student_id)
+        if old == status:
+            continue
+        delta = Counter({status: 1})
+        if old is not None:
+            delta[old] -= 1
+        groups[tuple(sorted(delta.items()))].append(student_id)
+
+    if not groups:
+        return
+    attended = recorded = 0
+    for delta, student_ids in groups.items():
+        AttendanceSummary.objects.filter(term=term, student_id__in=student_ids).update(
+            **{status: F(status) + change for status, change in delta if change}
+        )
+        for status, change in delta:
+            recorded += change * len(student_ids)
+            if status in ATTENDED:
+                attended += change * len(student_ids)
+    summaries.adjust_attendance(school_id, term, attended, recorded)
+
+
+def _audit(school_id, date, previous, records):
+    changed = [record for record in records if previous.get(record.student_id) != record.status]
+    if any(record.pk is None for record in changed):
+        # Backends that cannot return ids from an upsert.
+        ids = dict(
+            AttendanceRecord.objects.filter(date=date, student_id__in=[record.student_id for record in changed])
+            .values_list('student_id', 'id')
+        )
+        for record in changed:
+            record.pk = ids.get(record.student_id)
+    events = []
+    for record in changed:
+        old = previous.get(record.student_id)
+        if old is None:
+            changes = {'student_id': [None, record.student_id], 'date': [None, date], 'status': [None, record.status]}
+        else:
+            changes = {'status': [old, record.status]}
+        action = AuditEvent.CREATE if old is None else AuditEvent.UPDATE
+        events.append(audit.event(AttendanceRecord, school_id, record.pk, action, changes))
+    audit.add(events)
+
+
+def summaries_for(student_ids, term):
+    """``{student_id: AttendanceSummary}`` for one term, in one query."""
+    return {
+        summary.student_id: summary
+        for summary in AttendanceSummary.objects.filter(student_id__in=student_ids, term=term)
+    }
+
+
+def rebuild_summaries(school_id, term):
+    """Recount a school's summaries for one term from the raw ledger."""
+    start, end = term_bounds(term)
+    counts = defaultdict(Counter)
+    rows = (
+        AttendanceRecord.objects.filter(school_id=school_id, date__range=(start, end))
+        .values('student_id', 'status')
+        .annotate(days=Count('id'))
+        .order_by()
+    )
+    for row in rows:
+        counts[row['student_id']][row['status']] = row['days']
+    with transaction.atomic():
+        AttendanceSummary.objects.filter(school_id=school_id, term=term).delete()
+        AttendanceSummary.objects.bulk_create(
+            [
+                AttendanceSummary(
+                    school_id=school_id, student_id=student_id, term=term,
+                    **{status: counter[status] for status in STATUSES},
+                )
+                for student_id, counter in counts.items()
+            ],
+            batch_size=1000,
+        )
+        summaries.rebuild(school_id)
+    caching.bump(school_id)
+    return len(counts)
+
+
+def school_attendance_rate(school_id, term):
+    """Attendance rate for a whole school and term from the summary table."""
+    totals = AttendanceSummary.objects.filter(school_id=school_id, term=term).aggregate(
+        **{status: Sum(status) for status in STATUSES}
+    )
+    recorded = sum(totals[status] or 0 for status in STATUSES)
+    if not recorded:
+        return None
+    return 100 * ((totals['present'] or 0) + (totals['late'] or 0)) / recorded
+
+
+def course_roster(course):
+    return Student.objects.filter(courses=course).only('id', 'name', 'grade').order_by('name')
@@ -0,0 +1,266 @@
+"""
+Append-only audit log of changes to school data.
+
+Every create, update and delete of the AUDITED models becomes an AuditEvent
+holding the changed fields as ``{field: [old, new]}``, the acting user and
+the school. Old values come from a snapshot each instance takes when it is
+loaded (post_init), so recording an update costs no extra query; fields
+deferred with ``only()`` are not compared.
+
+Signals cover single-row saves and deletes (views, forms, the admin). The
+bulk paths that bypass them record their own events: roster imports,
+review_plans and roll calls.
+
+Events are only kept once the change commits (``on_commit``). While
+AuditMiddleware is collecting, they are buffered for the request and written
+with one ``bulk_create`` after the response; elsewhere (commands, jobs) they
+are written as they commit. The term rollover (school/rollover.py) is
+recorded by its RolloverRun rather than row by row.
+
+The table is only ever appended to, with two indexes, so writes stay cheap
+however long the log grows. ``compact_audit_log`` keeps it from growing
+without bound: a run of one user's updates to one object on one day, once
+older than AUDIT_COMPACT_DAYS, becomes a single event with the first old
+and last new value of each field, and events older than
+AUDIT_RETENTION_DAYS are deleted. Both work in batches of short
+transactions.
+"""
+import contextvars
+import datetime
+from contextlib import contextmanager
+from itertools import groupby
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import (
+    AuditEvent, Assignment, AttendanceRecord, Club, Course, GradeRecord, LessonPlan, ParentProfile, Period, Room,
+    School, Student, TeacherProfile, TimetableEntry,
+)
+
+AUDITED = (
+    School, TeacherProfile, ParentProfile, Student, LessonPlan, Club, Course, Assignment, GradeRecord,
+    AttendanceRecord, Room, Period, TimetableEntry,
+)
+# Bookkeeping columns whose changes are not worth an event of their own.
+IGNORED_FIELDS = frozenset({'updated_at', 'recorded_at', 'name_key'})
+WRITE_BATCH_SIZE = 1000
+MAINTENANCE_BATCH_SIZE = 1000
+
+_buffer = contextvars.ContextVar('audit_buffer', default=None)
+_actor = contextvars.ContextVar('audit_actor', default=None)
+
+
+def _fields(model):
+    return [field.attname for field in model._meta.concrete_fields if field.attname not in IGNORED_FIELDS]
+
+
+def snapshot(instance):
+    """Remember ``instance``'s loaded values, to diff against when it is saved."""
+    values = instance.__dict__
+    instance._audit_snapshot = {name: values[name] for name in _fields(type(instance)) if name in values}
+
+
+def loaded(instance):
+    """The values ``instance`` had when loaded or last saved (see ``snapshot``)."""
+    return getattr(instance, '_audit_snapshot', {})
+
+
+def _school_id(instance):
+    return instance.pk if isinstance(instance, School) else instance.school_id
+
+
+def event(model, school_id, object_id, action, changes):
+    return AuditEvent(
+        school_id=school_id, actor_id=_actor.get(), action=action,
+        model=model._meta.model_name, object_id=object_id, changes=changes,
+    )
+
+
+def _diff(instance, created, update_fields=None):
+    values = instance.__dict__
+    names = [name for name in _fields(type(instance)) if name in values]
+    if created:
+        return {name: [None, values[name]] for name in names}
+    before = getattr(instance, '_audit_snapshot', {})
+    if update_fields is not None:
+        update_fields = {instance._meta.get_field(name).attname for name in update_fields}
+        names = [name for name in names if name in update_fields]
+    return {name: [before[name], values[name]] for name in names if name in before and before[name] != values[name]}
+
+
+def saved(instances, created, update_fields=None):
+    """Record creates or updates of ``instances`` (all of one model)."""
+    events = []
+    for instance in instances:
+        changes = _diff(instance, created, update_fields)
+        if changes:
+            action = AuditEvent.CREATE if created else AuditEvent.UPDATE
+            events.append(event(type(instance), _school_id(instance), instance.pk, action, changes))
+        snapshot(instance)
+    add(events)
+
+
+def deleted(instance):
+    values = instance.__dict__
+    changes = {name: [values[name], None] for name in _fields(type(instance)) if name in values}
+    add([event(type(instance), _school_id(instance), instance.pk, AuditEvent.DELETE, changes)])
+
+
+def add(events, using=None):
+    """Keep ``events`` once the current transaction commits (now, outside one)."""
+    if not events:
+        return
+    buffer = _buffer.get()
+    if buffer is None:
+        transaction.on_commit(lambda: write(events), using=using or router.db_for_write(AuditEvent))
+    else:
+        transaction.on_commit(lambda: buffer.extend(events), using=using or router.db_for_write(AuditEvent))
+
+
+def write(events):
+    AuditEvent.objects.bulk_create(events, batch_size=WRITE_BATCH_SIZE)
+
+
+def begin(actor_id=None):
+    """Start buffering events, made by ``actor_id``; returns a token for ``end``."""
+    return _buffer.set([]), _actor.set(actor_id)
+
+
+def end(token):
+    """Stop buffering and return the events collected since ``begin``."""
+    buffer_token, actor_token = token
+    events = _buffer.get()
+    _buffer.reset(buffer_token)
+    _actor.reset(actor_token)
+    return events
+
+
+@contextmanager
+def collecting(actor_id=None):
+    """Buffer the events of a block and write them in one go at the end."""
+    token = begin(actor_id)
+    try:
+        yield
+    finally:
+        write(end(token))
+
+
+def history(model_name, object_id, school_id, limit=100):
+    """The newest ``limit`` events of one object, newest first."""
+    return list(
+        AuditEvent.objects.filter(model=model_name, object_id=object_id, school_id=school_id)
+        .select_related('actor').order_by('-created_at', '-id')[:limit]
+    )
+
+
+def compact_before():
+    return timezone.now() - datetime.timedelta(days=getattr(settings, 'AUDIT_COMPACT_DAYS', 90))
+
+
+def retention_start():
+    return timezone.now() - datetime.timedelta(days=getattr(settings, 'AUDIT_RETENTION_DAYS', 7 * 365))
+
+
+def _run_key(audit_event):
+    # Consecutive updates of one object by one user on one day are merged.
+    return audit_event.model, audit_event.object_id, audit_event.actor_id, timezone.localdate(audit_event.created_at)
+
+
+def _merge(run):
+    """Fold a run of update events into its first one."""
+    first = run[0]
+    changes = {}
+    for audit_event in run:
+        for field, (old, new) in audit_event.changes.items():
+            changes[field] = [changes[field][0] if field in changes else old, new]
+    first.changes = {field: values for field, values in changes.items() if values[0] != values[1]}
+    first.merged = sum(audit_event.merged for audit_event in run)
+    first.created_at = run[-1].created_at
+    return first
+
+
+def compact(before=None, batch_size=MAINTENANCE_BATCH_SIZE):
+    """Merge runs of updates older than ``before``; returns the number of events removed."""
+    before = before or compact_before()
+    updates = AuditEvent.all_schools.filter(action=AuditEvent.UPDATE, created_at__lt=before)
+    objects = (
+        updates.values('model', 'object_id').annotate(events=Count('id')).filter(events__gt=1)
+        .order_by('model', 'object_id').values_list('model', 'object_id')
+    )
+    removed = 0
+    last = None
+    while True:
+        page = objects
+        if last is not None:
+            page = page.filter(Q(model__gt=last[0]) | Q(model=last[0], object_id__gt=last[1]))
+        batch = list(page[:batch_size])
+        if not batch:
+            return removed
+        last = batch[-1]
+        by_model = {}
+        for model, object_id in batch:
+            by_model.setdefault(model, []).append(object_id)
+        with transaction.atomic():
+            events = updates.filter(
+                Q(*[Q(model=model, object_id__in=ids) for model, ids in by_model.items()], _connector=Q.OR)
+            ).order_by('model', 'object_id', 'created_at', 'id')
+            kept, dropped = [], []
+            for _, run in groupby(events, key=_run_key):
+                run = list(run)
+                if len(run) > 1:
+                    kept.append(_merge(run))
+                    dropped.extend(audit_event.pk for audit_event in run[1:])
+            AuditEvent.all_schools.bulk_update(kept, ['changes', 'merged', 'created_at'], batch_size=batch_size)
+            AuditEvent.all_schools.filter(pk__in=dropped).delete()
+        removed += len(dropped)
+
+
+def prune(before=None, batch_size=MAINTENANCE_BATCH_SIZE):
+    """Delete events older than ``before``, oldest first; returns how many."""
+    before = before or retention_start()
+    deleted = 0
+    while True:
+        ids = list(
+            AuditEvent.all_schools.filter(created_at__lt=before).order_by('created_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += AuditEvent.all_schools.filter(pk__in=ids).delete()[0]
+
+
+class AuditMiddleware:
+    """
+    Attribute the request's changes to its user and write their audit events
+    with a single INSERT after the response. Must come after RoleMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def actor_id(request):
+        return request.user.pk if request.user.is_authenticated else None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with collecting(self.actor_id(request)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        token = begin(self.actor_id(request))
+        try:
+            return await self.get_response(request)
+        finally:
+            events = end(token)
+            if events:
+                await sync_to_async(write)(events)
@@ -0,0 +1,301 @@
+"""
+Per-view latency and SQL query budgets.
+
+Every URL in ``school/urls.py`` is requested as an anonymous user and as a
+user of each role. Query counts include the session and user lookups done by
+middleware; the first request after login (which resolves and caches roles)
+is a warm-up and is not measured.
+
+``run_session_flows`` logs in through the form under each session engine and
+counts the queries, writes and session-table hits of login -> dashboard ->
+role dashboard.
+
+``run_load`` requests the dashboards from many concurrent clients through
+Django's WSGI handler (one thread per client, as a threaded WSGI server
+would) and its ASGI handler (one task per client on a single event loop) and
+reports throughput and latency of each.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import roles
+from .models import Course
+
+ANONYMOUS = 'Anonymous'
+
+# Highest number of queries any role may trigger on a single GET of the view,
+# without a shared cache: signed-in requests then read the role generation
+# (school/roles.py) from the database.
+QUERY_BUDGETS = {
+    'landing': 4,
+    'dashboard': 4,
+    'register': 4,
+    'school_lookup': 4,
+    'login': 4,
+    'logout': 5,
+    'teacher_profile': 5,
+    'lesson_plan': 4,
+    'parent_view': 11,
+    'approve_lesson_plan': 4,
+    'import_students': 4,
+    'class_averages': 5,
+    'roll_call': 6,
+    'teacher_dashboard': 5,
+    'headteacher_dashboard': 11,
+    'proprietor_dashboard': 8,
+    'vice_dashboard': 4,
+    'parent_dashboard': 5,
+    'sync_changes': 12,
+    'search': 4,
+    'timetable': 7,
+    'rollover': 5,
+    'object_history': 4,
+    'export_index': 4,
+    'export_data': 9,
+}
+
+
+def url_cases(school):
+    """``(url_name, path)`` for every URL; logout comes last since it ends the session."""
+    course = Course.objects.filter(school=school).order_by('pk').first()
+    cases = []
+    for name in QUERY_BUDGETS:
+        if name == 'roll_call':
+            if course is None:
+                continue
+            path = reverse(name, kwargs={'course_id': course.pk})
+        elif name == 'export_data':
+            path = reverse(name, kwargs={'dataset': 'students'})
+        elif name == 'school_lookup':
+            path = f'{reverse(name)}?q={school.name[:3]}'
+        elif name == 'object_history':
+            path = reverse(name, kwargs={'model': 'school', 'object_id': school.pk})
+        else:
+            path = reverse(name)
+        cases.append((name, path))
+    cases.sort(key=lambda case: case[0] == 'logout')
+    return cases
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class Result:
+    def __init__(self, url_name, role, status_code, queries, timings, budget):
+        self.url_name = url_name
+        self.role = role
+        self.status_code = status_code
+        self.queries = queries
+        self.budget = budget
+        self.p50 = percentile(timings, 0.50)
+        self.p95 = percentile(timings, 0.95)
+        self.p99 = percentile(timings, 0.99)
+
+    @property
+    def over_budget(self):
+        return self.queries > self.budget
+
+    def __str__(self):
+        flag = '  OVER BUDGET' if self.over_budget else ''
+        return (f'{self.url_name:<22} {self.role:<14} {self.status_code:>3} '
+                f'{self.queries:>3}/{self.budget:<3} queries  '
+                f'p50 {self.p50 * 1000:7.1f}ms  p95 {self.p95 * 1000:7.1f}ms  '
+                f'p99 {self.p99 * 1000:7.1f}ms{flag}')
+
+
+def _measure(client, url_name, path, role, iterations):
+    timings, queries, status_code = [], 0, None
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(path)
+            if response.streaming:
+                # Streamed bodies run their queries while being read.
+                b''.join(response.streaming_content)
+            timings.append(time.perf_counter() - started)
+        queries = max(queries, len(captured))
+        status_code = response.status_code
+    return Result(url_name, role, status_code, queries, timings, QUERY_BUDGETS[url_name])
+
+
+def run(school, users, iterations=10):
+    """
+    Request every URL as every role in ``users`` (a ``{role: user}`` mapping,
+    see ``synthetic.role_users``) plus an anonymous client.
+    """
+    results = []
+    cases = url_cases(school)
+    # Queries are counted on this thread's connection, so the dashboards'
+    # concurrent queries (school/parallel.py) must run on it as well.
+    with override_settings(DASHBOARD_PARALLEL_QUERIES=False):
+        for role in (ANONYMOUS,) + roles.ROLES:
+            if role != ANONYMOUS and role not in users:
+                continue
+            client = Client()
+            if role != ANONYMOUS:
+                client.force_login(users[role])
+                client.get(reverse('dashboard'))
+            for url_name, path in cases:
+                results.append(_measure(client, url_name, path, role, iterations))
+    return results
+
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class SessionFlowResult:
+    """Queries per step of login -> dashboard -> role dashboard under one session engine."""
+
+    def __init__(self, engine, steps, cookie_bytes):
+        self.engine = engine
+        self.steps = steps  # [(path, status, queries, writes, session queries)]
+        self.cookie_bytes = cookie_bytes
+
+    @property
+    def writes(self):
+        return sum(step[3] for step in self.steps)
+
+    @property
+    def session_queries(self):
+        return sum(step[4] for step in self.steps)
+
+    def __str__(self):
+        lines = [f'{self.engine.rsplit(".", 1)[-1]}: {self.writes} writes, '
+                 f'{self.session_queries} session queries, session cookie {self.cookie_bytes} bytes']
+        for path, status, queries, writes, session_queries in self.steps:
+            lines.append(f'  {path:<28} {status:>3} {queries:>3} queries  {writes:>2} writes  '
+                         f'{session_queries:>2} on django_session')
+        return '\n'.join(lines)
+
+
+def session_flow(engine, username, password):
+    """Log in through the form and follow the redirects to the role dashboard."""
+    client = Client()
+    steps = []
+    request = ('post', reverse('login'), {'username': username, 'password': password})
+    while request is not None:
+        method, path, data = request
+        with CaptureQueriesContext(connection) as captured:
+            response = getattr(client, method)(path, data)
+        statements = [query['sql'].lstrip().upper() for query in captured]
+        steps.append((
+            path, response.status_code, len(statements),
+            sum(statement.startswith(WRITE_STATEMENTS) for statement in statements),
+            sum('DJANGO_SESSION' in statement for statement in statements),
+        ))
+        request = ('get', response.url, {}) if response.status_code == 302 else None
+    cookie = client.cookies.get(settings.SESSION_COOKIE_NAME)
+    return SessionFlowResult(engine, steps, len(cookie.value) if cookie else 0)
+
+
+def run_session_flows(username, password, engines=None):
+    """``session_flow`` once per session engine (default: every DJANGO_SESSION_BACKEND)."""
+    results = []
+    for engine in engines or settings.SESSION_BACKENDS.values():
+        # Start every flow cold, so no engine profits from what an earlier one cached.
+        cache.clear()
+        with override_settings(SESSION_ENGINE=engine):
+            results.append(session_flow(engine, username, password))
+    return results
+
+
+LOAD_DASHBOARDS = (
+    ('teacher_dashboard', roles.TEACHER),
+    ('headteacher_dashboard', roles.HEAD_TEACHER),
+    ('proprietor_dashboard', roles.PROPRIETOR),
+)
+
+
+class LoadResult:
+    def __init__(self, interface, url_name, concurrency, timings, elapsed, errors):
+        self.interface = interface
+        self.url_name = url_name
+        self.concurrency = concurrency
+        self.requests = len(timings)
+        self.errors = errors
+        self.throughput = len(timings) / elapsed if elapsed else 0.0
+        self.p50 = percentile(timings, 0.50)
+        self.p95 = percentile(timings, 0.95)
+        self.p99 = percentile(timings, 0.99)
+
+    def __str__(self):
+        errors = f'  {self.errors} FAILED' if self.errors else ''
+        return (f'{self.url_name:<22} {self.interface:<4} x{self.concurrency:<3} '
+                f'{self.throughput:7.1f} req/s  p50 {self.p50 * 1000:7.1f}ms  '
+                f'p95 {self.p95 * 1000:7.1f}ms  p99 {self.p99 * 1000:7.1f}ms{errors}')
+
+
+def _wsgi_load(user, path, concurrency, requests):
+    clients = []
+    for _ in range(concurrency):
+        client = Client()
+        client.force_login(user)
+        # Warm-up: caches the roles in the session, the only write of the flow.
+        client.get(path)
+        clients.append(client)
+
+    def worker(client):
+        timings, errors = [], 0
+        for _ in range(requests):
+            started = time.perf_counter()
+            errors += client.get(path).status_code != 200
+            timings.append(time.perf_counter() - started)
+        return timings, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(worker, clients))
+    return outcomes, time.perf_counter() - started
+
+
+async def _asgi_load(user, path, concurrency, requests):
+    clients = []
+    for _ in range(concurrency):
+        client = AsyncClient()
+        await client.aforce_login(user)
+        await client.get(path)
+        clients.append(client)
+
+    async def worker(client):
+        timings, errors = [], 0
+        for _ in range(requests):
+            started = time.perf_counter()
+            errors += (await client.get(path)).status_code != 200
+            timings.append(time.perf_counter() - started)
+        return timings, errors
+
+    started = time.perf_counter()
+    outcomes = await asyncio.gather(*(worker(client) for client in clients))
+    return outcomes, time.perf_counter() - started
+
+
+def run_load(users, concurrency=16, requests=20, interfaces=('wsgi', 'asgi')):
+    """
+    ``requests`` GETs of each dashboard from each of ``concurrency`` clients,
+    under every interface. ``users`` is a ``{role: user}`` mapping (see
+    ``synthetic.role_users``).
+    """
+    results = []
+    for url_name, role in LOAD_DASHBOARDS:
+        if role not in users:
+            continue
+        path = reverse(url_name)
+        for interface in interfaces:
+            if interface == 'wsgi':
+                outcomes, elapsed = _wsgi_load(users[role], path, concurrency, requests)
+            else:
+                outcomes, elapsed = asyncio.run(_asgi_load(users[role], path, concurrency, requests))
+            timings = [timing for client_timings, _ in outcomes for timing in client_timings]
+            errors = sum(client_errors for _, client_errors in outcomes)
+            results.append(LoadResult(interface, url_name, concurrency, timings, elapsed, errors))
+    return results
@@ -0,0 +1,93 @@
+"""
+Per-school versioned caching for the dashboards.
+
+Every cache key embeds the school's current version number. Any change to a
+school's data bumps that number (see school/signals.py, plus explicit calls
+from bulk code paths that bypass signals), which makes every older key
+unreachable at once: invalidation is a single cache write, with no key
+scanning, on any backend (local memory, file or Redis). Abandoned entries
+simply expire.
+
+The version must be shared by every process, so dashboard caching is off
+(DASHBOARD_CACHE_SECONDS = 0) unless DJANGO_CACHE_URL names a shared cache:
+with per-process local memory a bump in one worker would leave the others
+serving stale entries.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _version_key(school_id):
+    return f'school:{school_id}:version'
+
+
+def timeout():
+    return getattr(settings, 'DASHBOARD_CACHE_SECONDS', 3600)
+
+
+def get_version(school_id):
+    key = _version_key(school_id)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock, not 1, so a version lost to eviction can never
+        # be handed out again while entries keyed on it are still cached.
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(school_id):
+    key = _version_key(school_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, int(time.time() * 1000), None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump(school_id):
+    """
+    Invalidate the school's cached entries once the current transaction
+    commits (now, outside one). Bumping earlier would let a concurrent
+    reader cache the data from before the commit under the new version.
+    """
+    if school_id is None:
+        return
+    transaction.on_commit(lambda: _incr(school_id))
+
+
+def _incr(school_id):
+    key = _version_key(school_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, int(time.time() * 1000), None)
+
+
+def cached(school_id, name, compute, *parts):
+    """Return ``compute()`` cached under the school's current version."""
+    if not timeout():
+        return compute()
+    suffix = ':'.join(str(part) for part in parts)
+    key = f'school:{school_id}:v{get_version(school_id)}:{name}:{suffix}'
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout())
+    return value
+
+
+async def acached(school_id, name, compute, *parts):
+    """``cached`` for async views: ``compute`` is a coroutine function."""
+    if not timeout():
+        return await compute()
+    suffix = ':'.join(str(part) for part in parts)
+    key = f'school:{school_id}:v{await aget_version(school_id)}:{name}:{suffix}'
+    value = await cache.aget(key)
+    if value is None:
+        value = await compute()
+        await cache.aset(key, value, timeout())
+    return value
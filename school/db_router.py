@@ -0,0 +1,134 @@
+"""
+Primary/replica database routing.
+
+Writes always go to ``default``. Reads go to a random alias from
+``REPLICA_DATABASES`` only inside views decorated with ``replica_reads`` (the
+dashboards and reports) on GET/HEAD requests; everything else, including the
+session, user and role lookups done by middleware, reads from the primary.
+
+A request that writes is pinned to the primary for the rest of the request,
+and ReplicaMiddleware sets a short-lived cookie so the client's next requests
+(typically the redirect after a POST) also read from the primary for
+``REPLICA_PIN_SECONDS`` and see their own changes despite replication lag.
+
+A dashboard cached right after a school's version is bumped may be filled
+from a replica that has not caught up yet, so replica lag should stay well
+under ``REPLICA_PIN_SECONDS``. With no replicas configured the router returns
+``None`` and Django uses ``default`` as before.
+"""
+import contextvars
+import random
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+PIN_COOKIE = 'db_primary'
+
+# True inside a ``replica_reads`` view.
+_replica_allowed = contextvars.ContextVar('replica_allowed', default=False)
+# The current request's RequestState, set by ReplicaMiddleware.
+_request_state = contextvars.ContextVar('replica_request_state', default=None)
+
+
+class RequestState:
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def replicas():
+    return getattr(settings, 'REPLICA_DATABASES', ())
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if not aliases or not _replica_allowed.get():
+            return None
+        state = _request_state.get()
+        if state is not None and (state.pinned or state.wrote):
+            return None
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replicas():
+            return False
+        return None
+
+
+def replica_reads(view_func):
+    """Let the view's GET/HEAD queries read from a replica (sync or async views)."""
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _async_view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await view_func(request, *args, **kwargs)
+            # Copied into the threads that run the view's queries (school/parallel.py).
+            token = _replica_allowed.set(True)
+            try:
+                return await view_func(request, *args, **kwargs)
+            finally:
+                _replica_allowed.reset(token)
+        return _async_view
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view_func(request, *args, **kwargs)
+        token = _replica_allowed.set(True)
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _replica_allowed.reset(token)
+    return _wrapped_view
+
+
+class ReplicaMiddleware:
+    """Pin clients that wrote recently to the primary."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RequestState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self._pin(state, response)
+
+    async def __acall__(self, request):
+        state = RequestState(pinned=PIN_COOKIE in request.COOKIES)
+        token = _request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self._pin(state, response)
+
+    @staticmethod
+    def _pin(state, response):
+        if state.wrote and replicas():
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,46 @@
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import redirect
+
+
+def role_required(*roles):
+    """
+    Allow the view only for logged-in users holding one of ``roles``.
+
+    Reads the roles cached by RoleMiddleware, so no group query is run.
+    Works on sync and async views.
+    """
+    allowed = frozenset(roles)
+
+    def denied(request):
+        if not allowed & request.roles:
+            messages.error(request, 'Access denied.')
+            return redirect('dashboard')
+        return None
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            # login_required's async path loads the user a second time via
+            # request.auser(); RoleMiddleware has already loaded request.user.
+            @wraps(view_func)
+            async def _async_view(request, *args, **kwargs):
+                if not request.user.is_authenticated:
+                    return redirect_to_login(request.get_full_path())
+                response = denied(request)
+                if response is None:
+                    response = await view_func(request, *args, **kwargs)
+                return response
+            return _async_view
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            response = denied(request)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+            return response
+        return login_required(_wrapped_view)
+    return decorator
@@ -0,0 +1,75 @@
+"""
+School name lookups for the registration picker.
+
+Names are matched by prefix on ``School.name_key``, a case-folded copy of the
+name with whitespace collapsed, kept up to date by ``School.save``. The lookup
+is a range over that column's index (``key <= name_key < key + U+10FFFF``),
+which every backend can serve without scanning the table; ``startswith``
+re-checks the rows in the range, since a non-C collation on PostgreSQL may
+order a few other names inside it.
+
+Short prefixes are the hot ones (everyone types them, and they match the most
+schools), so results for up to ``HOT_PREFIX_LENGTH`` characters are cached.
+Entries are keyed on a directory version that any school save or delete bumps
+(see school/signals.py), so a new school shows up on the next keystroke.
+Results are capped at ``MAX_RESULTS``.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+
+from .models import School
+
+MAX_RESULTS = 10
+HOT_PREFIX_LENGTH = 3
+MAX_QUERY_LENGTH = 100
+CACHE_SECONDS = 3600
+_VERSION_KEY = 'schools:directory:version'
+_RANGE_END = '\U0010ffff'
+
+
+def _version():
+    version = cache.get(_VERSION_KEY)
+    if version is None:
+        cache.add(_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(_VERSION_KEY)
+    return version
+
+
+def bump():
+    try:
+        cache.incr(_VERSION_KEY)
+    except ValueError:
+        cache.add(_VERSION_KEY, int(time.time() * 1000), None)
+
+
+def filter_prefix(queryset, query):
+    """Narrow a School queryset to names starting with ``query``, in name order."""
+    key = School.fold_name(query[:MAX_QUERY_LENGTH])
+    return queryset.filter(
+        name_key__gte=key, name_key__lt=key + _RANGE_END, name_key__startswith=key,
+    ).order_by('name_key', 'pk')
+
+
+def _lookup(key, limit):
+    return [
+        {'id': pk, 'name': name}
+        for pk, name in filter_prefix(School.objects.all(), key).values_list('pk', 'name')[:limit]
+    ]
+
+
+def lookup(query, limit=MAX_RESULTS):
+    """Schools whose name starts with ``query``, as ``[{'id', 'name'}]`` in name order."""
+    key = School.fold_name(query[:MAX_QUERY_LENGTH])
+    if not key:
+        return []
+    limit = max(1, min(limit, MAX_RESULTS))
+    if len(key) > HOT_PREFIX_LENGTH:
+        return _lookup(key, limit)
+    cache_key = f'schools:directory:v{_version()}:{hashlib.md5(key.encode()).hexdigest()}'
+    results = cache.get(cache_key)
+    if results is None:
+        results = _lookup(key, MAX_RESULTS)
+        cache.set(cache_key, results, CACHE_SECONDS)
+    return results[:limit]
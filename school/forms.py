@@ -0,0 +1,121 @@
+"""
+Forms for school/views.py.
+
+Kept out of the views module and imported inside the views that use them,
+so a cold start only builds the form classes a request actually needs.
+"""
+from django import forms
+from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils.html import format_html
+
+from . import search, tenancy
+from .models import School, TeacherProfile, LessonPlan
+
+class SchoolPicker(forms.Widget):
+    """
+    A hidden school id plus a search box that register.html fills from the
+    school_lookup endpoint, so the page never lists every school.
+    """
+
+    def render(self, name, value, attrs=None, renderer=None):
+        attrs = self.build_attrs(self.attrs, attrs)
+        input_id = attrs.get('id') or f'id_{name}'
+        value = '' if value is None else str(value)
+        label = School.objects.filter(pk=value).values_list('name', flat=True).first() if value.isdigit() else ''
+        return format_html(
+            '<input type="hidden" name="{}" id="{}" value="{}">'
+            '<input type="text" id="{}_search" value="{}" autocomplete="off" role="combobox" '
+            'aria-expanded="false" aria-controls="{}_results" placeholder="Start typing your school\'s name" '
+            'data-school-picker="{}" data-lookup-url="{}">'
+            '<ul id="{}_results" role="listbox" class="hidden absolute z-10 w-full mt-1 bg-white border '
+            'border-gray-200 rounded-lg shadow-lg max-h-60 overflow-auto"></ul>',
+            name, input_id, value if label else '',
+            input_id, label, input_id, input_id, reverse('school_lookup'), input_id,
+        )
+
+class CustomUserCreationForm(UserCreationForm):
+    ROLE_CHOICES = (
+        ('Proprietor', 'Proprietor'),
+        ('HeadTeacher', 'HeadTeacher'),
+        ('ViceAdmin', 'Vice Admin'),
+        ('ViceAcademics', 'Vice Academics'),
+        ('Teacher', 'Teacher'),
+        ('Parent', 'Parent'),
+    )
+    role = forms.ChoiceField(choices=ROLE_CHOICES)
+    # Only the submitted id is looked up; the widget never lists the choices.
+    school = forms.ModelChoiceField(queryset=School.objects.all(), required=False, widget=SchoolPicker)
+
+    class Meta:
+        model = User
+        fields = ('username', 'email', 'password1', 'password2', 'role', 'school')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Staff registering users from inside a school can only pick that school.
+        school_id = tenancy.current_school_id()
+        if school_id is not None:
+            self.fields['school'].queryset = School.objects.filter(pk=school_id)
+
+class TeacherProfileForm(forms.ModelForm):
+    class Meta:
+        model = TeacherProfile
+        fields = ['courses_taught']
+        widgets = {
+            'courses_taught': forms.SelectMultiple(attrs={'class': 'w-full p-2 border rounded-lg'}),
+        }
+
+class LessonPlanForm(forms.ModelForm):
+    class Meta:
+        model = LessonPlan
+        fields = ['title', 'objective', 'materials', 'activities']
+        widgets = {
+            'title': forms.TextInput(attrs={'class': 'w-full p-2 border rounded-lg'}),
+            'objective': forms.Textarea(attrs={'class': 'w-full p-2 border rounded-lg', 'rows': 3}),
+            'materials': forms.Textarea(attrs={'class': 'w-full p-2 border rounded-lg', 'rows': 3}),
+            'activities': forms.Textarea(attrs={'class': 'w-full p-2 border rounded-lg', 'rows': 5}),
+        }
+
+class LessonPlanApprovalForm(forms.ModelForm):
+    rejection_reason = forms.CharField(
+        widget=forms.Textarea(attrs={'class': 'w-full p-2 border rounded-lg', 'rows': 3, 'placeholder': 'Optional feedback for the teacher...'}),
+        required=False
+    )
+
+    class Meta:
+        model = LessonPlan
+        fields = ['approved', 'rejection_reason']
+        widgets = {
+            'approved': forms.Select(choices=[(True, 'Approve'), (False, 'Reject')], attrs={'class': 'w-full p-2 border rounded-lg'}),
+        }
+
+class BulkReviewForm(forms.Form):
+    ACTION_CHOICES = (
+        ('approve', 'Approve selected'),
+        ('reject', 'Reject selected'),
+    )
+    plan_ids = forms.ModelMultipleChoiceField(queryset=LessonPlan.objects.none())
+    action = forms.ChoiceField(choices=ACTION_CHOICES)
+    rejection_reason = forms.CharField(required=False)
+
+    def __init__(self, *args, school_id=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['plan_ids'].queryset = LessonPlan.objects.filter(school_id=school_id).only('id')
+
+class RosterUploadForm(forms.Form):
+    roster = forms.FileField(
+        help_text='CSV or XLSX with admission_number, name, grade and optional courses, clubs, behavior_notes columns.',
+        widget=forms.ClearableFileInput(attrs={'class': 'w-full p-2 border rounded-lg', 'accept': '.csv,.xlsx'}),
+    )
+    dry_run = forms.BooleanField(required=False, initial=True, label='Dry run (validate only)')
+
+class RollCallForm(forms.Form):
+    date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date', 'class': 'w-full p-2 border rounded-lg'}))
+
+class SearchForm(forms.Form):
+    q = forms.CharField(max_length=200, required=False,
+                        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Search lesson plans, assignments, students'}))
+    type = forms.ChoiceField(choices=[('', 'Everything')] + list(search.TYPE_LABELS.items()), required=False,
+                             widget=forms.Select(attrs={'class': 'form-select'}))
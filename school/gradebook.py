@@ -0,0 +1,47 @@
+"""
+Report-card and class-average queries over GradeRecord.
+
+Everything here is a single aggregate query; scores are never loaded into
+Python row by row.
+"""
+from django.db.models import Avg, Count, Max, Min
+
+from .models import GradeRecord
+
+
+def terms(school_id):
+    """Terms with recorded grades for a school, most recently recorded first."""
+    latest = (
+        GradeRecord.objects.filter(school_id=school_id)
+        .values('term')
+        .annotate(last_recorded=Max('recorded_at'))
+        .order_by('-last_recorded')
+    )
+    return [row['term'] for row in latest]
+
+
+def class_averages(school_id, term):
+    """Per-course average, range and head count for one school and term."""
+    return (
+        GradeRecord.objects.filter(school_id=school_id, term=term)
+        .values('course_id', 'course__name')
+        .annotate(
+            average=Avg('score'),
+            lowest=Min('score'),
+            highest=Max('score'),
+            students=Count('student_id', distinct=True),
+        )
+        .order_by('course__name')
+    )
+
+
+def report_cards(student_ids, term=None):
+    """Per-student, per-course averages; ``term=None`` covers every term."""
+    records = GradeRecord.objects.filter(student_id__in=student_ids)
+    if term is not None:
+        records = records.filter(term=term)
+    return (
+        records.values('student_id', 'term', 'course__name')
+        .annotate(average=Avg('score'), assessments=Count('id'))
+        .order_by('student_id', 'term', 'course__name')
+    )
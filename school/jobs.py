@@ -0,0 +1,227 @@
+"""
+A small background job queue stored in the database.
+
+Jobs are rows in the ``Job`` table, written in the same transaction as the
+data they are about, so work is never queued for a change that rolled back.
+``manage.py run_worker`` claims and runs them outside the request cycle.
+
+Claiming marks up to ``limit`` due jobs with a fresh claim token in one
+UPDATE. On PostgreSQL the candidate rows are picked with
+``SELECT ... FOR UPDATE SKIP LOCKED``, so concurrent workers never wait on or
+take each other's jobs. SQLite has no row locks; the transaction takes the
+database write lock up front (``transaction_mode = IMMEDIATE`` in settings),
+the UPDATE only takes rows still queued, and a worker runs exactly the rows
+carrying its token.
+
+Tasks are registered with ``@task`` (see school/tasks.py). A task with
+``batch_size > 1`` receives a list of payloads so many small jobs (one per
+notification chunk, say) run as one call. Failed jobs are retried with
+exponential backoff until ``max_attempts``, then kept as ``failed`` with
+the traceback. A task's ``concurrency`` caps how many of its jobs run at
+once across all workers: its running jobs are counted inside the claiming
+transaction, after taking a per-task advisory lock on PostgreSQL (SQLite's
+write lock already serializes claims), so two workers cannot both take the
+last free slot. Successful jobs are deleted.
+
+A claimed job's lease (``locked_at``) restarts when its batch starts, not
+when it was claimed, so jobs waiting behind a long batch are not handed to
+another worker by ``requeue_stale``; a job that was requeued anyway is
+skipped by the worker that lost it.
+"""
+import datetime
+import logging
+import random
+import traceback
+import uuid
+
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger('school.jobs')
+
+DEFAULT_QUEUE = 'default'
+BACKOFF_SECONDS = 10
+MAX_BACKOFF_SECONDS = 3600
+# Running jobs whose worker has not finished them in this long are requeued.
+LEASE_SECONDS = 600
+
+TASKS = {}
+
+
+class Task:
+    def __init__(self, func, name, queue, max_attempts, batch_size, concurrency):
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.max_attempts = max_attempts
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+
+    def run(self, payloads):
+        if self.batch_size > 1:
+            return self.func(payloads)
+        for payload in payloads:
+            self.func(payload)
+
+
+def task(name=None, queue=DEFAULT_QUEUE, max_attempts=5, batch_size=1, concurrency=None):
+    """Register a function as a job task."""
+    def decorator(func):
+        task_name = name or func.__name__
+        TASKS[task_name] = Task(func, task_name, queue, max_attempts, batch_size, concurrency)
+        return func
+    return decorator
+
+
+def _job(name, payload, run_at):
+    registered = TASKS[name]
+    return Job(task=name, queue=registered.queue, payload=payload or {},
+               max_attempts=registered.max_attempts, run_at=run_at or timezone.now())
+
+
+def enqueue(name, payload=None, run_at=None):
+    job = _job(name, payload, run_at)
+    job.save()
+    return job
+
+
+def enqueue_many(name, payloads, run_at=None):
+    return Job.objects.bulk_create([_job(name, payload, run_at) for payload in payloads])
+
+
+def backoff(attempts):
+    """Seconds to wait before retry number ``attempts``, with jitter."""
+    delay = min(BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _free_slots(names=None, lock=False):
+    """
+    ``{task name: jobs it may still start}`` for the tasks (of ``names``)
+    with a concurrency limit. Only exact with ``lock``, inside the claiming
+    transaction.
+    """
+    limited = {
+        name: registered.concurrency for name, registered in sorted(TASKS.items())
+        if registered.concurrency and (names is None or name in names)
+    }
+    if not limited:
+        return {}
+    if lock and connection.vendor == 'postgresql':
+        # Held until the claim commits, so the next claimer counts our jobs.
+        with connection.cursor() as cursor:
+            for name in limited:
+                cursor.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', [f'school.jobs:{name}'])
+    running = dict(
+        Job.objects.filter(status=Job.RUNNING, task__in=list(limited)).order_by()
+        .values('task').annotate(count=Count('id')).values_list('task', 'count')
+    )
+    return {name: max(limit - running.get(name, 0), 0) for name, limit in limited.items()}
+
+
+def claim(queues=(DEFAULT_QUEUE,), limit=10):
+    """Claim up to ``limit`` due jobs and return them."""
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    due = Job.objects.filter(status=Job.QUEUED, queue__in=list(queues), run_at__lte=now)
+    # A cheap first look, so tasks at their limit do not crowd out the rest.
+    full = [name for name, free in _free_slots().items() if not free]
+    if full:
+        due = due.exclude(task__in=full)
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        candidates = list(due.order_by('run_at', 'id').values_list('id', 'task')[:limit])
+        slots = _free_slots({name for _, name in candidates}, lock=True)
+        ids = []
+        for job_id, name in candidates:
+            if name in slots:
+                if not slots[name]:
+                    continue
+                slots[name] -= 1
+            ids.append(job_id)
+        if not ids:
+            return []
+        Job.objects.filter(id__in=ids, status=Job.QUEUED).update(
+            status=Job.RUNNING, claim_token=token, locked_at=now, attempts=F('attempts') + 1,
+        )
+    return list(Job.objects.filter(claim_token=token).order_by('run_at', 'id'))
+
+
+def requeue_stale(lease_seconds=LEASE_SECONDS):
+    """Put jobs back whose worker died mid-run; returns how many."""
+    cutoff = timezone.now() - datetime.timedelta(seconds=lease_seconds)
+    return Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff).update(
+        status=Job.QUEUED, claim_token='', locked_at=None,
+    )
+
+
+def _failed(jobs, error):
+    now = timezone.now()
+    retry, failed = [], []
+    for job in jobs:
+        job.last_error = error
+        job.claim_token = ''
+        job.locked_at = None
+        if job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.run_at = now + datetime.timedelta(seconds=backoff(job.attempts))
+            retry.append(job)
+        else:
+            job.status = Job.FAILED
+            failed.append(job)
+    Job.objects.bulk_update(retry + failed, ['status', 'run_at', 'last_error', 'claim_token', 'locked_at'])
+    for job in failed:
+        logger.error('Job %s failed after %s attempts', job, job.attempts)
+
+
+def _renew(jobs):
+    """Restart the lease of claimed jobs about to run; returns those still ours."""
+    ids = [job.id for job in jobs]
+    ours = Job.objects.filter(id__in=ids, status=Job.RUNNING, claim_token__in={job.claim_token for job in jobs})
+    if ours.update(locked_at=timezone.now()) == len(jobs):
+        return jobs
+    # Some were requeued by requeue_stale and may already run elsewhere.
+    kept = set(ours.values_list('id', flat=True))
+    return [job for job in jobs if job.id in kept]
+
+
+def execute(jobs):
+    """Run claimed jobs, a batch per task; returns the number that succeeded."""
+    by_task = {}
+    for job in jobs:
+        by_task.setdefault(job.task, []).append(job)
+    succeeded = 0
+    for name, task_jobs in by_task.items():
+        registered = TASKS.get(name)
+        if registered is None:
+            _failed(task_jobs, f'Unknown task "{name}".')
+            continue
+        for start in range(0, len(task_jobs), registered.batch_size):
+            batch = _renew(task_jobs[start:start + registered.batch_size])
+            if not batch:
+                continue
+            try:
+                with transaction.atomic():
+                    registered.run([job.payload for job in batch])
+                    Job.objects.filter(id__in=[job.id for job in batch]).delete()
+            except Exception:
+                _failed(batch, traceback.format_exc()[-4000:])
+            else:
+                succeeded += len(batch)
+    return succeeded
+
+
+def work(queues=(DEFAULT_QUEUE,), limit=10, max_jobs=None):
+    """Claim and run jobs until none are due (or ``max_jobs`` ran); returns the count run."""
+    total = 0
+    while max_jobs is None or total < max_jobs:
+        jobs = claim(queues, limit if max_jobs is None else min(limit, max_jobs - total))
+        if not jobs:
+            break
+        execute(jobs)
+        total += len(jobs)
+    return total
@@ -0,0 +1,63 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+
+from school import analytics
+from school.synthetic import SyntheticConfig, generate
+from school.terms import current_term
+
+
+class Command(BaseCommand):
+    help = (
+        'Build a synthetic school in a throwaway test database and time the term results '
+        '(school/analytics.py): loading scores, computing every statistic, and a cached read.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=10000)
+        parser.add_argument('--teachers', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs; the best is reported.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--max-ms', type=float, help='Fail if loading plus computing takes longer.')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            config = SyntheticConfig(
+                students=options['students'], teachers=options['teachers'], assignments_per_course=1,
+                lesson_plans_per_teacher=1, attendance_days=1, seed=options['seed'],
+            )
+            school = generate(config)[0]
+            term = current_term()
+            load_times, compute_times = [], []
+            for _ in range(max(options['repeat'], 1)):
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    scores = analytics.TermScores(school.pk, term)
+                    loaded = time.perf_counter()
+                    results = analytics.compute(scores)
+                    load_times.append(loaded - started)
+                    compute_times.append(time.perf_counter() - loaded)
+            cache.clear()
+            analytics.term_results(school.pk, term)
+            started = time.perf_counter()
+            analytics.term_results(school.pk, term)
+            cached = time.perf_counter() - started
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        load, compute = min(load_times) * 1000, min(compute_times) * 1000
+        self.stdout.write(
+            f'{options["students"]} students, {len(scores)} student-course results, '
+            f'{len(results["classes"])} classes, {len(results["courses"])} courses'
+        )
+        self.stdout.write(f'  load     {load:8.1f}ms  ({len(queries)} queries)')
+        self.stdout.write(f'  compute  {compute:8.1f}ms')
+        self.stdout.write(f'  cached   {cached * 1000:8.1f}ms')
+        if options['max_ms'] is not None and load + compute > options['max_ms']:
+            raise CommandError(f'Term results took {load + compute:.0f}ms, over the {options["max_ms"]:.0f}ms budget.')
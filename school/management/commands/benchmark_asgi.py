@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from school import benchmarks
+from school.synthetic import SyntheticConfig, generate, role_users
+
+UNCACHED = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class Command(BaseCommand):
+    help = (
+        'Build a synthetic school in a throwaway test database and load the dashboards from many '
+        'concurrent clients through the WSGI and the ASGI handler, reporting throughput and latency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2000)
+        parser.add_argument('--teachers', type=int, default=40)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients.')
+        parser.add_argument('--requests', type=int, default=20, help='Requests per client and dashboard.')
+        parser.add_argument('--interface', action='append', dest='interfaces', choices=('wsgi', 'asgi'),
+                            help='Handler to load; repeat for both (default: both).')
+        parser.add_argument('--cached', action='store_true',
+                            help='Keep the configured cache; by default every request runs its queries.')
+        parser.add_argument('--sequential-queries', action='store_true',
+                            help='Run each view\'s queries one after another (DASHBOARD_PARALLEL_QUERIES=False).')
+
+    def handle(self, *args, **options):
+        overrides = {'DASHBOARD_PARALLEL_QUERIES': not options['sequential_queries']}
+        if not options['cached']:
+            overrides['CACHES'] = UNCACHED
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            config = SyntheticConfig(students=options['students'], teachers=options['teachers'], seed=options['seed'])
+            school = generate(config)[0]
+            with override_settings(**overrides):
+                results = benchmarks.run_load(
+                    role_users(school), concurrency=options['concurrency'], requests=options['requests'],
+                    interfaces=options['interfaces'] or ('wsgi', 'asgi'),
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for result in results:
+            self.stdout.write(str(result))
+        failed = sum(result.errors for result in results)
+        if failed:
+            raise CommandError(f'{failed} request(s) did not return 200.')
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from school import benchmarks, roles
+from school.synthetic import SYNTHETIC_PASSWORD, SyntheticConfig, generate, role_users
+
+
+class Command(BaseCommand):
+    help = (
+        'Log in through the login form under each session engine in a throwaway test database '
+        'and report queries and writes per request for login -> dashboard -> role dashboard.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend', action='append', dest='backends', choices=sorted(settings.SESSION_BACKENDS),
+            help='Session backend to measure; repeat for several (default: all).',
+        )
+        parser.add_argument('--role', default=roles.TEACHER, choices=roles.ROLES)
+
+    def handle(self, *args, **options):
+        engines = [settings.SESSION_BACKENDS[name] for name in options['backends'] or settings.SESSION_BACKENDS]
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            school = generate(SyntheticConfig(students=20, teachers=2))[0]
+            user = role_users(school)[options['role']]
+            results = benchmarks.run_session_flows(user.username, SYNTHETIC_PASSWORD, engines)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for result in results:
+            self.stdout.write(str(result))
@@ -0,0 +1,100 @@
+import json
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _median(samples, *keys):
+    values = []
+    for sample in samples:
+        for key in keys:
+            sample = sample.get(key, {})
+        values.append(sample or 0)
+    return round(statistics.median(values), 2)
+
+
+def summarize(settings_module, samples):
+    """Median of every timing across ``samples`` (probe results of one profile)."""
+    first = samples[0]
+    return {
+        'settings_module': settings_module,
+        'samples': len(samples),
+        'total_ms': _median(samples, 'total_ms'),
+        'phases': {phase: _median(samples, 'phases', phase) for phase in first['phases']},
+        'apps': {
+            app: {step: _median(samples, 'apps', app, step) for step in steps}
+            for app, steps in first['apps'].items()
+        },
+        'middleware': {path: _median(samples, 'middleware', path) for path in first['middleware']},
+        'first_request_status': first['first_request_status'],
+        'modules_loaded': first['modules_loaded'],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Start Django in fresh interpreters the way core/wsgi.py does and report the median '
+        'cold-start time per step, app and middleware (see school/startup.py).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--settings-module', action='append', dest='settings_modules',
+            help='Settings module to measure; repeat to compare profiles (default: core.settings).',
+        )
+        parser.add_argument('--repeat', type=int, default=10, help='Cold starts per settings module.')
+        parser.add_argument('--json', dest='json_path', help='Also write the summaries to this file.')
+        parser.add_argument(
+            '--max-total-ms', type=float,
+            help='Fail if the median total of any settings module exceeds this many milliseconds.',
+        )
+
+    def probe(self, settings_module):
+        completed = subprocess.run(
+            [sys.executable, '-m', 'school.startup', settings_module],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if completed.returncode:
+            raise CommandError(f'Startup probe for {settings_module} failed:\n{completed.stderr}')
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        settings_modules = options['settings_modules'] or ['core.settings']
+        samples = {settings_module: [] for settings_module in settings_modules}
+        # Round-robin, so machine noise during the run affects every profile alike.
+        for _ in range(max(options['repeat'], 1)):
+            for settings_module in settings_modules:
+                samples[settings_module].append(self.probe(settings_module))
+        summaries = [summarize(settings_module, samples[settings_module]) for settings_module in settings_modules]
+        for summary in summaries:
+            self.report(summary)
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as output:
+                json.dump(summaries, output, indent=2)
+
+        budget = options['max_total_ms']
+        over = [summary for summary in summaries if budget is not None and summary['total_ms'] > budget]
+        if over:
+            names = ', '.join(f'{summary["settings_module"]} ({summary["total_ms"]:.1f}ms)' for summary in over)
+            raise CommandError(f'Cold start over the {budget:.0f}ms budget: {names}')
+
+    def report(self, summary):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{summary["settings_module"]}: {summary["total_ms"]:.1f}ms median over {summary["samples"]} '
+            f'cold starts, {summary["modules_loaded"]} modules, first request {summary["first_request_status"]}'
+        ))
+        for phase, ms in summary['phases'].items():
+            self.stdout.write(f'  {phase:<16} {ms:8.1f}ms')
+        self.stdout.write('  apps (import / models / ready):')
+        for app, steps in summary['apps'].items():
+            self.stdout.write(
+                f'    {app:<44} {steps.get("import", 0):7.1f} {steps.get("models", 0):7.1f} '
+                f'{steps.get("ready", 0):7.1f}ms'
+            )
+        self.stdout.write('  middleware imports:')
+        for path, ms in summary['middleware'].items():
+            self.stdout.write(f'    {path:<60} {ms:7.1f}ms')
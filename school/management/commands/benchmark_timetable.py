@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from school import timetable
+
+
+class Command(BaseCommand):
+    help = (
+        'Solve in-memory synthetic schools of increasing size (see timetable.synthetic_problem) '
+        'and report solve times. Fails if a school has clashes or is slower than --max-seconds.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--students', type=int, action='append',
+            help='School size to solve; repeat for several (default: 500, 1500, 3000, 6000).',
+        )
+        parser.add_argument('--periods-per-day', type=int, default=8)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--max-seconds', type=float)
+
+    def handle(self, *args, **options):
+        failures = []
+        for students in options['students'] or [500, 1500, 3000, 6000]:
+            problem = timetable.synthetic_problem(
+                students, periods_per_day=options['periods_per_day'], seed=options['seed']
+            )
+            label = (f'{students:>6} students {len(problem.courses):>5} courses '
+                     f'{problem.lesson_count:>6} lessons {len(problem.rooms):>4} rooms')
+            try:
+                solution = timetable.solve(problem, seed=options['seed'])
+            except timetable.TimetableError as error:
+                failures.append(f'{students} students: {error}')
+                self.stdout.write(f'{label}  FAILED')
+                continue
+            found = timetable.clashes(problem, solution.placements)
+            self.stdout.write(f'{label}  {solution.seconds:6.2f}s  {solution.attempts} attempt(s)  {len(found)} clashes')
+            if found:
+                failures.append(f'{students} students: {len(found)} clashes')
+            elif options['max_seconds'] is not None and solution.seconds > options['max_seconds']:
+                failures.append(f'{students} students: {solution.seconds:.2f}s')
+        if failures:
+            raise CommandError('; '.join(failures))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from school import benchmarks
+from school.synthetic import SyntheticConfig, generate, role_users
+
+
+class Command(BaseCommand):
+    help = (
+        'Build a synthetic school in a throwaway test database, request every URL as every role '
+        'and report latency percentiles and query counts. Fails if a view exceeds its query budget.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2000)
+        parser.add_argument('--teachers', type=int, default=40)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            config = SyntheticConfig(
+                students=options['students'], teachers=options['teachers'], seed=options['seed']
+            )
+            school = generate(config)[0]
+            results = benchmarks.run(school, role_users(school), iterations=options['iterations'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for result in results:
+            self.stdout.write(str(result))
+        over = [result for result in results if result.over_budget]
+        if over:
+            raise CommandError(f'{len(over)} view/role combination(s) exceeded their query budget.')
+        self.stdout.write(self.style.SUCCESS('All views within their query budgets.'))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from school import assets
+
+
+class Command(BaseCommand):
+    help = (
+        'Build static/build/app.css: the Tailwind utilities and Font Awesome icons the templates use, '
+        'minified (school/assets.py). Run after changing templates, then collectstatic.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Fail if the committed stylesheet is out of date.')
+        parser.add_argument('--node', default='node', help='Node.js executable.')
+        parser.add_argument(
+            '--fontawesome',
+            help='A Font Awesome Free download (with svgs/ and metadata/) to copy missing icons from.',
+        )
+
+    def handle(self, *args, **options):
+        output = assets.base_dir() / assets.OUTPUT
+        if options['fontawesome']:
+            _, icons = assets.candidates(path.read_text() for path in assets.scanned_files())
+            icon_dir = assets.base_dir() / assets.ICON_DIR
+            wanted = [name for name in icons if not (icon_dir / f'{name}.svg').exists()]
+            missing = assets.vendor_icons(wanted, options['fontawesome'])
+            self.stdout.write(f'Copied {len(wanted) - len(missing)} icons.')
+            for name in missing:
+                self.stderr.write(f'  not a solid Font Awesome icon: fa-{name}')
+        try:
+            css, icons = assets.build(node=options['node'])
+        except (OSError, RuntimeError) as error:
+            raise CommandError(error)
+
+        if options['check']:
+            current = output.read_text() if output.exists() else ''
+            if current != css:
+                raise CommandError(f'{assets.OUTPUT} is out of date; run `python manage.py build_assets`.')
+            self.stdout.write(self.style.SUCCESS(f'{assets.OUTPUT} is up to date.'))
+            return
+
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(css)
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {assets.OUTPUT}: {len(css.encode()) / 1024:.1f} KB, {len(icons)} icons.'
+        ))
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from school.sessions import CLEANUP_BATCH_SIZE, clear_expired
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete expired sessions in batches (unlike clearsessions, which deletes them in one statement). '
+        'Signed-cookie sessions have nothing stored server-side.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=CLEANUP_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        deleted = clear_expired(batch_size=options['batch_size'])
+        if deleted is None:
+            self.stdout.write(f'{settings.SESSION_ENGINE} keeps no sessions to clear.')
+        else:
+            self.stdout.write(f'Deleted {deleted} expired session(s).')
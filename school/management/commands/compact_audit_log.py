@@ -0,0 +1,23 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from school import audit
+
+
+class Command(BaseCommand):
+    help = 'Merge old runs of audit updates and delete audit events past AUDIT_RETENTION_DAYS.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--compact-days', type=int, help='Merge updates older than this (default: AUDIT_COMPACT_DAYS).')
+        parser.add_argument('--retention-days', type=int, help='Delete events older than this (default: AUDIT_RETENTION_DAYS).')
+        parser.add_argument('--batch-size', type=int, default=audit.MAINTENANCE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        def cutoff(days):
+            return timezone.now() - datetime.timedelta(days=days) if days is not None else None
+
+        deleted = audit.prune(cutoff(options['retention_days']), options['batch_size'])
+        merged = audit.compact(cutoff(options['compact_days']), options['batch_size'])
+        self.stdout.write(f'Deleted {deleted} expired audit event(s); merged away {merged} more.')
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from school import timetable
+
+
+class Command(BaseCommand):
+    help = "Generate a school's weekly timetable and replace the saved one."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', type=int, required=True)
+        parser.add_argument(
+            '--create-periods', type=int, metavar='PER_DAY',
+            help='First give a school without periods this many periods a day, Monday to Friday.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['create_periods']:
+            created = timetable.create_default_periods(options['school'], options['create_periods'])
+            self.stdout.write(f'Created {created} period(s).')
+        try:
+            solution = timetable.generate(options['school'], seed=options['seed'])
+        except timetable.TimetableError as error:
+            raise CommandError(str(error))
+        lessons = sum(len(placed) for placed in solution.placements.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Placed {lessons} lessons of {len(solution.placements)} courses in {solution.seconds:.2f}s '
+            f'({solution.attempts} attempt(s)).'
+        ))
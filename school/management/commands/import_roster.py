@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from school.models import School
+from school.roster import DEFAULT_BATCH_SIZE, RosterError, import_roster
+
+
+class Command(BaseCommand):
+    help = 'Import (upsert) a CSV or XLSX student roster into a school.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the .csv or .xlsx roster file.')
+        parser.add_argument('--school', type=int, required=True, help='ID of the school to import into.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and count without writing.')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            school = School.objects.get(pk=options['school'])
+        except School.DoesNotExist:
+            raise CommandError(f'School {options["school"]} does not exist.')
+
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                report = import_roster(
+                    fileobj, options['path'], school,
+                    dry_run=options['dry_run'], batch_size=options['batch_size'],
+                )
+        except (OSError, RosterError) as exc:
+            raise CommandError(str(exc))
+
+        for line, message in report.errors:
+            self.stderr.write(f'Line {line}: {message}')
+        if report.error_count > len(report.errors):
+            self.stderr.write(f'... and {report.error_count - len(report.errors)} more errors.')
+        self.stdout.write(self.style.SUCCESS(str(report)))
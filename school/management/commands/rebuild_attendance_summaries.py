@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from school.attendance import rebuild_summaries
+from school.models import School
+from school.terms import current_term
+
+
+class Command(BaseCommand):
+    help = 'Recount per-term attendance summaries from the daily attendance ledger.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', type=int, help='Only rebuild this school (default: all).')
+        parser.add_argument('--term', default=None, help='Term label, e.g. "2025/2026 First Term" (default: current).')
+
+    def handle(self, *args, **options):
+        term = options['term'] or current_term()
+        schools = School.objects.all()
+        if options['school']:
+            schools = schools.filter(pk=options['school'])
+        try:
+            for school_id in schools.values_list('id', flat=True):
+                students = rebuild_summaries(school_id, term)
+                self.stdout.write(f'School {school_id}: {students} summaries rebuilt for {term}.')
+        except ValueError as exc:
+            raise CommandError(f'Invalid term "{term}": {exc}')
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from school import summaries
+from school.models import School
+
+
+class Command(BaseCommand):
+    help = 'Recount the per-school dashboard summaries from the tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', type=int, help='Only rebuild this school (default: all).')
+
+    def handle(self, *args, **options):
+        schools = School.objects.all()
+        if options['school']:
+            schools = schools.filter(pk=options['school'])
+        for school_id in schools.values_list('id', flat=True):
+            summary = summaries.rebuild(school_id)
+            self.stdout.write(
+                f'School {school_id}: {summary.student_count} students, {summary.teacher_count} teachers, '
+                f'{summary.pending_plans} pending plans.'
+            )
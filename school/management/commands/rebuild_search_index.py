@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from school.search import REBUILD_BATCH_SIZE, rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of lesson plans, assignments and students.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', type=int, help='Only reindex this school (default: all).')
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = rebuild(options['school'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {total} documents in {time.perf_counter() - started:.1f}s.'
+        ))
@@ -0,0 +1,43 @@
+import argparse
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from school import rollover
+from school.models import School
+
+
+class Command(BaseCommand):
+    help = "Close a term: archive its rows and, at year end, promote students. Safe to rerun after an interruption."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', type=int, required=True)
+        parser.add_argument('--term', help='Term label, e.g. "2025/2026 Third Term" (default: the last term that ended).')
+        parser.add_argument(
+            '--promote', action=argparse.BooleanOptionalAction, default=None,
+            help='Promote students and rebuild enrollments (default: only when closing a Third Term).',
+        )
+        parser.add_argument('--chunk-size', type=int, default=rollover.CHUNK_SIZE)
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to wait between chunks.')
+
+    def handle(self, *args, **options):
+        if not School.objects.filter(pk=options['school']).exists():
+            raise CommandError(f'School {options["school"]} does not exist.')
+        try:
+            run = rollover.start(options['school'], options['term'], options['promote'])
+        except rollover.RolloverError as error:
+            raise CommandError(str(error))
+        if run.finished_at is not None:
+            self.stdout.write(f'{run} already finished on {run.finished_at:%d %b %Y}.')
+            return
+
+        step = None
+        while run.finished_at is None:
+            if run.step != step:
+                step = run.step
+                self.stdout.write(f'{step}...')
+            run = rollover.advance(run, options['chunk_size'])
+            if options['pause']:
+                time.sleep(options['pause'])
+        counts = ', '.join(f'{key}: {count}' for key, count in run.state.get('counts', {}).items())
+        self.stdout.write(self.style.SUCCESS(f'{run} finished ({counts or "nothing to do"}).'))
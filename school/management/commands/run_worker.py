@@ -0,0 +1,68 @@
+import logging
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+
+from school import jobs
+
+logger = logging.getLogger('school.jobs')
+
+# Stale-lease sweeps run every this many polls of the first worker thread.
+REQUEUE_EVERY = 30
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs from the database queue.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', action='append', dest='queues',
+                            help=f'Queue to work (repeatable, default: {jobs.DEFAULT_QUEUE}).')
+        parser.add_argument('--concurrency', type=int, default=1, help='Worker threads in this process.')
+        parser.add_argument('--limit', type=int, default=100, help='Jobs claimed per round trip.')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to sleep when idle.')
+        parser.add_argument('--burst', action='store_true', help='Exit once no jobs are due (e.g. from cron).')
+
+    def handle(self, *args, **options):
+        queues = options['queues'] or [jobs.DEFAULT_QUEUE]
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+
+        self.total = 0
+        self.lock = threading.Lock()
+        threads = [
+            threading.Thread(target=self.loop, args=(index, queues, options, stop), daemon=True)
+            for index in range(options['concurrency'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(0.5)
+        self.stdout.write(f'Ran {self.total} job(s) from {", ".join(queues)}.')
+
+    def loop(self, index, queues, options, stop):
+        polls = 0
+        try:
+            while not stop.is_set():
+                if index == 0 and polls % REQUEUE_EVERY == 0:
+                    requeued = jobs.requeue_stale()
+                    if requeued:
+                        logger.warning('Requeued %s stale job(s)', requeued)
+                polls += 1
+                try:
+                    ran = jobs.work(queues, limit=options['limit'])
+                except DatabaseError:
+                    # e.g. "database is locked" on SQLite with several threads; try again later.
+                    logger.exception('Claiming jobs failed')
+                    ran = 0
+                with self.lock:
+                    self.total += ran
+                if not ran:
+                    if options['burst']:
+                        break
+                    stop.wait(options['poll_interval'])
+        finally:
+            connection.close()
@@ -0,0 +1,93 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.utils.functional import SimpleLazyObject
+
+from . import roles as role_cache, tenancy
+from .models import TeacherProfile, ParentProfile
+
+
+class RoleMiddleware:
+    """
+    Resolve the user's roles and profiles once per session and attach them to
+    the request as ``request.roles``, ``request.teacher_profile``,
+    ``request.parent_profile`` and ``request.school_id``.
+
+    Must come after AuthenticationMiddleware. Under ASGI the session and user
+    are loaded here, in a thread, so async views can use them freely.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.process_request(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        await sync_to_async(self.process_request)(request)
+        return await self.get_response(request)
+
+    def process_request(self, request):
+        user = request.user
+        if not user.is_authenticated:
+            request.roles = frozenset()
+            request.teacher_profile = None
+            request.parent_profile = None
+            request.school_id = None
+            return
+
+        version = role_cache.get_version(user.pk)
+        cached = request.session.get(role_cache.SESSION_KEY)
+        if not cached or cached.get('user_id') != user.pk or cached.get('version') != version:
+            cached = role_cache.cache_in_session(request.session, user)
+
+        request.roles = frozenset(cached['roles'])
+        request.school_id = cached['school_id']
+        request.teacher_profile = self._lazy_profile(TeacherProfile, cached['teacher_profile_id'])
+        request.parent_profile = self._lazy_profile(ParentProfile, cached['parent_profile_id'])
+
+    @staticmethod
+    def _lazy_profile(model, pk):
+        # Profiles are only fetched by primary key when a view touches them.
+        if pk is None:
+            return None
+        return SimpleLazyObject(lambda: model.objects.select_related('school').get(pk=pk))
+
+
+class TenantMiddleware:
+    """
+    Bind ``request.school_id`` for the rest of the request, so the default
+    managers of school models only see that school (see school/tenancy.py).
+
+    Must come after RoleMiddleware. Superusers and anonymous requests are
+    left unscoped; signed-in users without a school see nothing.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def school_for(request):
+        if not request.user.is_authenticated or request.user.is_superuser:
+            return None
+        school_id = getattr(request, 'school_id', None)
+        return tenancy.NO_SCHOOL if school_id is None else school_id
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with tenancy.scoped(self.school_for(request)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with tenancy.scoped(self.school_for(request)):
+            return await self.get_response(request)
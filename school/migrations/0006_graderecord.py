@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0005_student_admission_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradeRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=50)),
+                ('assessment', models.CharField(max_length=100)),
+                ('score', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('recorded_at', models.DateTimeField(auto_now_add=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_records', to='school.course')),
+                ('school', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='school.school')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_records', to='school.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['school', 'term', 'course', 'score'], name='grade_school_term_course_idx'), models.Index(fields=['student', 'term'], name='grade_student_term_idx')],
+                'constraints': [models.UniqueConstraint(fields=('student', 'course', 'term', 'assessment'), name='unique_grade_record')],
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations
+
+LEGACY_TERM = 'Legacy'
+LEGACY_ASSESSMENT = 'Imported'
+
+# "Mathematics: 78", "English = 64.5", "Basic Science - 80%" separated by commas,
+# semicolons or new lines. Anything else (letter grades, prose) is left in the
+# original text field untouched.
+ENTRY_SEPARATOR = re.compile(r'[,;\n]')
+ENTRY = re.compile(r'^\s*(?P<course>[^:=]+?)\s*[:=\-]\s*(?P<score>\d{1,3}(?:\.\d+)?)\s*%?\s*$')
+
+
+def parse_grades(text):
+    for chunk in ENTRY_SEPARATOR.split(text or ''):
+        match = ENTRY.match(chunk)
+        if not match:
+            continue
+        try:
+            score = Decimal(match.group('score'))
+        except InvalidOperation:
+            continue
+        if score <= 100:
+            yield match.group('course').casefold(), score
+
+
+def import_legacy_grades(apps, schema_editor):
+    Student = apps.get_model('school', 'Student')
+    Course = apps.get_model('school', 'Course')
+    GradeRecord = apps.get_model('school', 'GradeRecord')
+
+    courses = {}
+    for pk, school_id, name in Course.objects.values_list('id', 'school_id', 'name'):
+        courses.setdefault((school_id, name.casefold()), pk)
+
+    batch = []
+    students = Student.objects.exclude(grades='').values_list('id', 'school_id', 'grades')
+    for student_id, school_id, text in students.iterator(chunk_size=2000):
+        for course_name, score in parse_grades(text):
+            course_id = courses.get((school_id, course_name))
+            if course_id is None:
+                continue
+            batch.append(GradeRecord(
+                school_id=school_id, student_id=student_id, course_id=course_id,
+                term=LEGACY_TERM, assessment=LEGACY_ASSESSMENT, score=score,
+            ))
+        if len(batch) >= 2000:
+            GradeRecord.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    GradeRecord.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def remove_legacy_grades(apps, schema_editor):
+    GradeRecord = apps.get_model('school', 'GradeRecord')
+    GradeRecord.objects.filter(term=LEGACY_TERM, assessment=LEGACY_ASSESSMENT).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0006_graderecord'),
+    ]
+
+    operations = [
+        migrations.RunPython(import_legacy_grades, remove_legacy_grades),
+    ]
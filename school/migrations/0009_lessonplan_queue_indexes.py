@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0008_attendance_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lessonplan',
+            index=models.Index(fields=['school', 'approved', 'submission_date'], name='lessonplan_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lessonplan',
+            index=models.Index(fields=['teacher', 'submission_date'], name='lessonplan_teacher_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+# The index table is raw SQL because neither backend's form is a Django model:
+# an FTS5 virtual table on SQLite, a generated tsvector column on PostgreSQL.
+SQLITE_CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS school_search USING fts5("
+    "title, body, scope, school_id UNINDEXED, tokenize='porter unicode61')",
+)
+POSTGRES_CREATE = (
+    "CREATE TABLE IF NOT EXISTS school_search ("
+    "id bigint PRIMARY KEY, school_id bigint NOT NULL, doc_type varchar(20) NOT NULL, "
+    "title text NOT NULL, body text NOT NULL, "
+    "document tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', title), 'A') || "
+    "setweight(to_tsvector('english', body), 'B')) STORED)",
+    "CREATE INDEX IF NOT EXISTS school_search_document_idx ON school_search USING GIN (document)",
+    "CREATE INDEX IF NOT EXISTS school_search_school_idx ON school_search (school_id, doc_type)",
+)
+CREATE = {'sqlite': SQLITE_CREATE, 'postgresql': POSTGRES_CREATE}
+
+
+def create_search_index(apps, schema_editor):
+    for statement in CREATE.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE:
+        schema_editor.execute('DROP TABLE IF EXISTS school_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0010_sync_tracking'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
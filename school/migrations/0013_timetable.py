@@ -0,0 +1,71 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0012_job_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='lessons_per_week',
+            field=models.PositiveSmallIntegerField(default=3),
+        ),
+        migrations.CreateModel(
+            name='Period',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday')])),
+                ('index', models.PositiveSmallIntegerField(help_text='Order of the period within the day, from 1.')),
+                ('start_time', models.TimeField(blank=True, null=True)),
+                ('end_time', models.TimeField(blank=True, null=True)),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='periods', to='school.school')),
+            ],
+            options={
+                'ordering': ['day', 'index'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Room',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('capacity', models.PositiveIntegerField(default=40)),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rooms', to='school.school')),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TimetableEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timetable_entries', to='school.course')),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timetable_entries', to='school.period')),
+                ('room', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='timetable_entries', to='school.room')),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timetable_entries', to='school.school')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='period',
+            constraint=models.UniqueConstraint(fields=('school', 'day', 'index'), name='unique_school_period'),
+        ),
+        migrations.AddIndex(
+            model_name='timetableentry',
+            index=models.Index(fields=['school', 'period'], name='timetable_school_period_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timetableentry',
+            constraint=models.UniqueConstraint(fields=('course', 'period'), name='unique_course_period'),
+        ),
+        migrations.AddConstraint(
+            model_name='timetableentry',
+            constraint=models.UniqueConstraint(fields=('room', 'period'), name='unique_room_period'),
+        ),
+    ]
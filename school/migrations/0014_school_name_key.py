@@ -0,0 +1,28 @@
+import unicodedata
+
+from django.db import migrations, models
+
+
+def fill_name_keys(apps, schema_editor):
+    # Same folding as School.fold_name, which historical models do not have.
+    School = apps.get_model('school', 'School')
+    schools = list(School.objects.only('id', 'name'))
+    for school in schools:
+        school.name_key = ' '.join(unicodedata.normalize('NFKC', school.name or '').casefold().split())
+    School.objects.bulk_update(schools, ['name_key'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0013_timetable'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='school',
+            name='name_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(fill_name_keys, migrations.RunPython.noop),
+    ]
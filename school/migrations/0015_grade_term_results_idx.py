@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0014_school_name_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='graderecord',
+            index=models.Index(fields=['school', 'term', 'student', 'course', 'score'], name='grade_term_results_idx'),
+        ),
+    ]
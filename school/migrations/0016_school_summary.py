@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0015_grade_term_results_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchoolSummary',
+            fields=[
+                ('school', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='school.school')),
+                ('student_count', models.IntegerField(default=0)),
+                ('teacher_count', models.IntegerField(default=0)),
+                ('course_count', models.IntegerField(default=0)),
+                ('club_count', models.IntegerField(default=0)),
+                ('pending_plans', models.IntegerField(default=0)),
+                ('attendance_term', models.CharField(blank=True, max_length=50)),
+                ('attendance_attended', models.IntegerField(default=0)),
+                ('attendance_recorded', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
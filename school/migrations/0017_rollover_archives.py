@@ -0,0 +1,90 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0016_school_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAssignment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('due_date', models.DateField()),
+                ('updated_at', models.DateTimeField()),
+                ('term', models.CharField(max_length=50)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='school.course')),
+                ('school', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='school.school')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['school', 'term'], name='archived_assignment_term_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedAttendanceRecord',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('present', 'Present'), ('absent', 'Absent'), ('late', 'Late'), ('excused', 'Excused')], max_length=10)),
+                ('recorded_at', models.DateTimeField()),
+                ('term', models.CharField(max_length=50)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('recorded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('school', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='school.school')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_attendance_records', to='school.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['school', 'term'], name='archived_attendance_term_idx'), models.Index(fields=['student', 'date'], name='archived_attendance_day_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedLessonPlan',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('objective', models.TextField()),
+                ('materials', models.TextField()),
+                ('activities', models.TextField()),
+                ('approved', models.BooleanField(default=False)),
+                ('rejection_reason', models.TextField(blank=True)),
+                ('submission_date', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('term', models.CharField(max_length=50)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('school', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='school.school')),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['school', 'term'], name='archived_plan_term_idx'), models.Index(fields=['teacher', 'submission_date'], name='archived_plan_teacher_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RolloverRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=50)),
+                ('promote', models.BooleanField(default=False)),
+                ('step', models.CharField(blank=True, max_length=30)),
+                ('cursor', models.BigIntegerField(default=0)),
+                ('state', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollovers', to='school.school')),
+                ('started_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('school', 'term'), name='unique_rollover_per_term')],
+            },
+        ),
+    ]
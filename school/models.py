@@ -1,15 +1,34 @@
+import unicodedata
+
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .tenancy import SchoolScopedModel
 
 class School(models.Model):
     name = models.CharField(max_length=200)
+    # Case-folded copy of name for indexed prefix lookups (see school/directory.py).
+    name_key = models.CharField(max_length=200, db_index=True, editable=False, default='')
     proprietor = models.CharField(max_length=100, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return self.name
 
-class TeacherProfile(models.Model):
+    @staticmethod
+    def fold_name(name):
+        return ' '.join(unicodedata.normalize('NFKC', name or '').casefold().split())
+
+    def save(self, *args, **kwargs):
+        self.name_key = self.fold_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'name_key'}
+        super().save(*args, **kwargs)
+
+class TeacherProfile(SchoolScopedModel):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     school = models.ForeignKey(School, on_delete=models.CASCADE, null=True)
     courses_taught = models.TextField(blank=True)
@@ -17,7 +36,7 @@ class TeacherProfile(models.Model):
     def __str__(self):
         return self.user.username
 
-class ParentProfile(models.Model):
+class ParentProfile(SchoolScopedModel):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     school = models.ForeignKey(School, on_delete=models.CASCADE, null=True)
     students = models.ManyToManyField('Student', blank=True)
@@ -25,8 +44,9 @@ class ParentProfile(models.Model):
     def __str__(self):
         return self.user.username
 
-class Student(models.Model):
+class Student(SchoolScopedModel):
     school = models.ForeignKey(School, on_delete=models.CASCADE, null=True)
+    admission_number = models.CharField(max_length=50, blank=True)
     name = models.CharField(max_length=100)
     grade = models.CharField(max_length=50)
     attendance = models.IntegerField(default=0)
@@ -34,11 +54,22 @@ class Student(models.Model):
     behavior_notes = models.TextField(blank=True)
     courses = models.ManyToManyField('Course', blank=True)
     clubs = models.ManyToManyField('Club', blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            # Roster imports upsert on the admission number within a school.
+            models.UniqueConstraint(
+                fields=['school', 'admission_number'],
+                condition=~models.Q(admission_number=''),
+                name='unique_student_admission_number',
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
-class LessonPlan(models.Model):
+class LessonPlan(SchoolScopedModel):
     teacher = models.ForeignKey(User, on_delete=models.CASCADE)
     school = models.ForeignKey(School, on_delete=models.CASCADE, null=True)
     title = models.CharField(max_length=200)
@@ -48,33 +79,409 @@ class LessonPlan(models.Model):
     approved = models.BooleanField(default=False)
     rejection_reason = models.TextField(blank=True)
     submission_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Headteacher approval queue: pending plans of a school, newest first.
+            models.Index(fields=['school', 'approved', 'submission_date'], name='lessonplan_queue_idx'),
+            # Teacher dashboard: a teacher's most recent plans.
+            models.Index(fields=['teacher', 'submission_date'], name='lessonplan_teacher_recent_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
-class Club(models.Model):
+class Club(SchoolScopedModel):
     school = models.ForeignKey(School, on_delete=models.CASCADE, null=True)
     name = models.CharField(max_length=200)
     description = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
 
-class Course(models.Model):
+class Course(SchoolScopedModel):
     school = models.ForeignKey(School, on_delete=models.CASCADE, null=True)
     name = models.CharField(max_length=200)
     teacher = models.ForeignKey(User, on_delete=models.CASCADE)
     description = models.TextField()
+    # How many periods a week the timetable generator gives the course.
+    lessons_per_week = models.PositiveSmallIntegerField(default=3)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
 
-class Assignment(models.Model):
+class Assignment(SchoolScopedModel):
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     school = models.ForeignKey(School, on_delete=models.CASCADE, null=True)
     title = models.CharField(max_length=200)
     description = models.TextField()
     due_date = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return self.title
+
+
+class GradeRecord(SchoolScopedModel):
+    school = models.ForeignKey(School, on_delete=models.CASCADE, null=True)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='grade_records')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='grade_records')
+    term = models.CharField(max_length=50)
+    assessment = models.CharField(max_length=100)
+    score = models.DecimalField(max_digits=5, decimal_places=2)
+    recorded_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['student', 'course', 'term', 'assessment'],
+                name='unique_grade_record',
+            ),
+        ]
+        indexes = [
+            # Class averages: all scores for one school and term, grouped by course.
+            models.Index(fields=['school', 'term', 'course', 'score'], name='grade_school_term_course_idx'),
+            # Report cards: one student's scores for a term.
+            models.Index(fields=['student', 'term'], name='grade_student_term_idx'),
+            # Term results (school/analytics.py): per-student course averages,
+            # read from the index alone with no sort for the GROUP BY.
+            models.Index(fields=['school', 'term', 'student', 'course', 'score'], name='grade_term_results_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.student} - {self.course} ({self.term} {self.assessment}): {self.score}'
+
+class AttendanceRecord(SchoolScopedModel):
+    PRESENT = 'present'
+    ABSENT = 'absent'
+    LATE = 'late'
+    EXCUSED = 'excused'
+    STATUS_CHOICES = (
+        (PRESENT, 'Present'),
+        (ABSENT, 'Absent'),
+        (LATE, 'Late'),
+        (EXCUSED, 'Excused'),
+    )
+
+    school = models.ForeignKey(School, on_delete=models.CASCADE, null=True)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_records')
+    date = models.DateField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PRESENT)
+    recorded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    recorded_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'date'], name='unique_attendance_per_day'),
+        ]
+        indexes = [
+            models.Index(fields=['school', 'date'], name='attendance_school_date_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.student} - {self.date}: {self.status}'
+
+class AttendanceSummary(SchoolScopedModel):
+    """Per-student, per-term counts kept up to date by school.attendance."""
+    school = models.ForeignKey(School, on_delete=models.CASCADE, null=True)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_summaries')
+    term = models.CharField(max_length=50)
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+    excused = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'term'], name='unique_attendance_summary'),
+        ]
+        indexes = [
+            models.Index(fields=['school', 'term'], name='attendance_summary_term_idx'),
+        ]
+
+    @property
+    def days_recorded(self):
+        return self.present + self.absent + self.late + self.excused
+
+    @property
+    def attendance_rate(self):
+        if not self.days_recorded:
+            return None
+        return 100 * (self.present + self.late) / self.days_recorded
+
+    def __str__(self):
+        return f'{self.student} - {self.term}'
+
+class SyncTombstone(SchoolScopedModel):
+    """Records a deleted row so offline clients can drop it on their next sync."""
+    school = models.ForeignKey(School, on_delete=models.CASCADE, null=True)
+    model = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['school', 'deleted_at'], name='tombstone_school_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.model} {self.object_id} deleted {self.deleted_at}'
+
+class Job(models.Model):
+    """A unit of background work; see school/jobs.py."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    )
+
+    queue = models.CharField(max_length=50, default='default')
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField()
+    claim_token = models.CharField(max_length=32, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'queue', 'run_at'], name='job_claim_idx'),
+            models.Index(fields=['claim_token'], name='job_claim_token_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.task} #{self.pk} ({self.status})'
+
+class Notification(SchoolScopedModel):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    school = models.ForeignKey(School, on_delete=models.CASCADE, null=True)
+    message = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='notification_user_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.message}'
+
+class Room(SchoolScopedModel):
+    school = models.ForeignKey(School, on_delete=models.CASCADE, related_name='rooms')
+    name = models.CharField(max_length=100)
+    capacity = models.PositiveIntegerField(default=40)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return f'{self.name} ({self.capacity})'
+
+class Period(SchoolScopedModel):
+    DAYS = [(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday')]
+
+    school = models.ForeignKey(School, on_delete=models.CASCADE, related_name='periods')
+    day = models.PositiveSmallIntegerField(choices=DAYS)
+    index = models.PositiveSmallIntegerField(help_text='Order of the period within the day, from 1.')
+    start_time = models.TimeField(null=True, blank=True)
+    end_time = models.TimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['day', 'index']
+        constraints = [
+            models.UniqueConstraint(fields=['school', 'day', 'index'], name='unique_school_period'),
+        ]
+
+    def __str__(self):
+        return f'{self.get_day_display()} period {self.index}'
+
+class TimetableEntry(SchoolScopedModel):
+    """One lesson of a course in a period, written by school/timetable.py."""
+    school = models.ForeignKey(School, on_delete=models.CASCADE, related_name='timetable_entries')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='timetable_entries')
+    period = models.ForeignKey(Period, on_delete=models.CASCADE, related_name='timetable_entries')
+    room = models.ForeignKey(Room, on_delete=models.SET_NULL, null=True, blank=True, related_name='timetable_entries')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'period'], name='unique_course_period'),
+            models.UniqueConstraint(fields=['room', 'period'], name='unique_room_period'),
+        ]
+        indexes = [
+            models.Index(fields=['school', 'period'], name='timetable_school_period_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.course} - {self.period}'
+
+class SchoolSummary(models.Model):
+    """Per-school dashboard counts, kept up to date by school.summaries."""
+    school = models.OneToOneField(School, on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    student_count = models.IntegerField(default=0)
+    teacher_count = models.IntegerField(default=0)
+    course_count = models.IntegerField(default=0)
+    club_count = models.IntegerField(default=0)
+    pending_plans = models.IntegerField(default=0)
+    # Attendance of attendance_term only: days present or late, and all days recorded.
+    attendance_term = models.CharField(max_length=50, blank=True)
+    attendance_attended = models.IntegerField(default=0)
+    attendance_recorded = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def attendance_rate(self):
+        if not self.attendance_recorded:
+            return None
+        return 100 * self.attendance_attended / self.attendance_recorded
+
+    def __str__(self):
+        return f'Summary of {self.school}'
+
+class RolloverRun(SchoolScopedModel):
+    """An end-of-term rollover of one school, advanced a chunk at a time by school.rollover."""
+    school = models.ForeignKey(School, on_delete=models.CASCADE, related_name='rollovers')
+    term = models.CharField(max_length=50)
+    promote = models.BooleanField(default=False)
+    # The step being worked on and the last id it finished; blank once done.
+    step = models.CharField(max_length=30, blank=True)
+    cursor = models.BigIntegerField(default=0)
+    # Row counts per step, and the grade -> courses plan for re-enrollment.
+    state = models.JSONField(default=dict, blank=True)
+    started_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['school', 'term'], name='unique_rollover_per_term'),
+        ]
+
+    def __str__(self):
+        return f'{self.school} rollover of {self.term}'
+
+# Archive tables: rows moved out of the live tables by school.rollover, keeping
+# their ids, plus the term they belonged to.
+class ArchivedAssignment(SchoolScopedModel):
+    id = models.BigIntegerField(primary_key=True)
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    school = models.ForeignKey(School, on_delete=models.CASCADE, null=True)
+    title = models.CharField(max_length=200)
+    description = models.TextField()
+    due_date = models.DateField()
+    updated_at = models.DateTimeField()
+    term = models.CharField(max_length=50)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['school', 'term'], name='archived_assignment_term_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+class ArchivedLessonPlan(SchoolScopedModel):
+    id = models.BigIntegerField(primary_key=True)
+    teacher = models.ForeignKey(User, on_delete=models.CASCADE)
+    school = models.ForeignKey(School, on_delete=models.CASCADE, null=True)
+    title = models.CharField(max_length=200)
+    objective = models.TextField()
+    materials = models.TextField()
+    activities = models.TextField()
+    approved = models.BooleanField(default=False)
+    rejection_reason = models.TextField(blank=True)
+    submission_date = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    term = models.CharField(max_length=50)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['school', 'term'], name='archived_plan_term_idx'),
+            models.Index(fields=['teacher', 'submission_date'], name='archived_plan_teacher_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+class ArchivedAttendanceRecord(SchoolScopedModel):
+    id = models.BigIntegerField(primary_key=True)
+    school = models.ForeignKey(School, on_delete=models.CASCADE, null=True)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='archived_attendance_records')
+    date = models.DateField()
+    status = models.CharField(max_length=10, choices=AttendanceRecord.STATUS_CHOICES)
+    recorded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    recorded_at = models.DateTimeField()
+    term = models.CharField(max_length=50)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['school', 'term'], name='archived_attendance_term_idx'),
+            models.Index(fields=['student', 'date'], name='archived_attendance_day_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.student} - {self.date}: {self.status}'
+
+class AuditEvent(SchoolScopedModel):
+    """A create, update or delete of a school row, recorded by school.audit. Never changed once written."""
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    ACTION_CHOICES = (
+        (CREATE, 'Created'),
+        (UPDATE, 'Updated'),
+        (DELETE, 'Deleted'),
+    )
+
+    # No constraints: the history outlives the schools and users it mentions.
+    school = models.ForeignKey(School, on_delete=models.DO_NOTHING, null=True, db_constraint=False)
+    actor = models.ForeignKey(User, on_delete=models.DO_NOTHING, null=True, blank=True, db_constraint=False)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    model = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    # {field: [old, new]}; old is null for creates and new for deletes.
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    # How many consecutive updates compact_audit_log merged into this one.
+    merged = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            # Per-object history, newest first.
+            models.Index(fields=['model', 'object_id', 'created_at'], name='audit_object_history_idx'),
+            # Retention and compaction walk the log oldest first.
+            models.Index(fields=['created_at'], name='audit_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Audit events are append-only.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Audit events are append-only.')
+
+    def __str__(self):
+        return f'{self.get_action_display()} {self.model} {self.object_id}'
+
+
+class RoleVersion(models.Model):
+    """A user's role generation; sessions holding an older one re-resolve their roles (see school.roles)."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    version = models.PositiveIntegerField(default=0)
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return f'{self.user_id} v{self.version}'
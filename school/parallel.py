@@ -0,0 +1,78 @@
+"""
+Concurrent queries for the async dashboard views.
+
+Django's async ORM methods (``aget``, ``acount``...) are the sync ones run
+through ``sync_to_async``, which by default sends every call of a process to
+one thread, so awaiting several of them together still runs them one after
+another. Independent blocks of queries are therefore handed to a small pool
+of query threads instead: each thread has its own database connection, so
+``gather(a, b, c)`` takes as long as the slowest block rather than the sum.
+
+The pool is shared by every request of the process and bounded by
+``DASHBOARD_QUERY_THREADS``, which also caps the extra connections it opens
+(kept for ``CONN_MAX_AGE`` like request connections).
+
+Work is kept on the request's own thread, one block after another, when
+``DASHBOARD_PARALLEL_QUERIES`` is off or the request is inside a transaction
+(ATOMIC_REQUESTS, or a test case): other connections would not see its
+uncommitted writes.
+
+Context variables are copied into the threads, so ``replica_reads`` and the
+replica pinning of school/db_router.py apply to these queries too. Queries
+on pool threads are not seen by the opt-in profiling middleware, which only
+wraps the request thread's connections.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+_executor = None
+_executor_lock = Lock()
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'DASHBOARD_QUERY_THREADS', 8), thread_name_prefix='school-query',
+            )
+        return _executor
+
+
+def _parallel_allowed():
+    if not getattr(settings, 'DASHBOARD_PARALLEL_QUERIES', True):
+        return False
+    return not any(connection.in_atomic_block for connection in connections.all(initialized_only=True))
+
+
+def _on_query_thread(function, args):
+    # Same connection housekeeping as around a request: drop connections that
+    # are broken or older than CONN_MAX_AGE before and after.
+    close_old_connections()
+    try:
+        return function(*args)
+    finally:
+        close_old_connections()
+
+
+async def gather(*calls):
+    """
+    Run blocking ``(function, *args)`` calls concurrently and return their
+    results in order. A bare function stands for a call without arguments.
+    """
+    calls = [call if isinstance(call, tuple) else (call,) for call in calls]
+    if not await sync_to_async(_parallel_allowed)():
+        return [await sync_to_async(call[0])(*call[1:]) for call in calls]
+    run = sync_to_async(_on_query_thread, thread_sensitive=False, executor=_pool())
+    return await asyncio.gather(*(run(call[0], call[1:]) for call in calls))
+
+
+async def run(function, *args):
+    """``function(*args)`` on a query thread (see ``gather``)."""
+    [result] = await gather((function, *args))
+    return result
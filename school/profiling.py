@@ -0,0 +1,167 @@
+"""
+Opt-in request profiling.
+
+Enable with ``DJANGO_PROFILING=True``; settings then wrap the middleware stack
+with ProfilingMiddleware (outermost) and ViewTimingMiddleware (innermost).
+When disabled neither is installed, so there is no per-request cost.
+
+For every request the profile records the SQL query count and time (through
+``connection.execute_wrapper``), the view time, the template render time and
+the remaining middleware time (sessions, auth, messages, ...). These are
+returned in a ``Server-Timing`` header, which browsers show in the network
+panel, and logged as one JSON line on the ``school.profiling`` logger. Queries
+slower than ``PROFILING_SLOW_QUERY_MS`` are sampled with the project call site
+that issued them.
+"""
+import heapq
+import json
+import logging
+import os
+import time
+import traceback
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('school.profiling')
+
+PROJECT_ROOT = str(settings.BASE_DIR)
+SITE_PACKAGES = f'{os.sep}site-packages{os.sep}'
+
+
+def _call_site():
+    """The innermost stack frame that belongs to this project, not Django."""
+    for frame in reversed(traceback.extract_stack()[:-3]):
+        if frame.filename.startswith(PROJECT_ROOT) and SITE_PACKAGES not in frame.filename \
+                and not frame.filename.endswith('profiling.py'):
+            return f'{os.path.relpath(frame.filename, PROJECT_ROOT)}:{frame.lineno} in {frame.name}'
+    return 'unknown'
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.view = 0.0
+        self.template = 0.0
+        self.template_depth = 0
+        self.sql = 0.0
+        self.queries = 0
+        self.slow_queries = []
+        self.slow_threshold = getattr(settings, 'PROFILING_SLOW_QUERY_MS', 50) / 1000
+        self.slow_samples = getattr(settings, 'PROFILING_SLOW_QUERY_SAMPLES', 5)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.sql += elapsed
+            if elapsed >= self.slow_threshold:
+                # Only slow queries pay for the stack walk.
+                sample = (elapsed, self.queries, sql[:500], _call_site())
+                if len(self.slow_queries) < self.slow_samples:
+                    heapq.heappush(self.slow_queries, sample)
+                else:
+                    heapq.heappushpop(self.slow_queries, sample)
+
+    @property
+    def middleware(self):
+        return max(self.total - self.view, 0.0)
+
+    def server_timing(self):
+        metrics = (
+            ('sql', self.sql, f'{self.queries} queries'),
+            ('view', max(self.view - self.template, 0.0), 'view'),
+            ('tpl', self.template, 'templates'),
+            ('mw', self.middleware, 'middleware'),
+            ('total', self.total, 'total'),
+        )
+        return ', '.join(f'{name};dur={seconds * 1000:.1f};desc="{desc}"' for name, seconds, desc in metrics)
+
+    def as_log(self, request, response):
+        return {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': self.queries,
+            'sql_ms': round(self.sql * 1000, 2),
+            'view_ms': round(max(self.view - self.template, 0.0) * 1000, 2),
+            'template_ms': round(self.template * 1000, 2),
+            'middleware_ms': round(self.middleware * 1000, 2),
+            'total_ms': round(self.total * 1000, 2),
+            'slow_queries': [
+                {'ms': round(elapsed * 1000, 2), 'sql': sql, 'call_site': site}
+                for elapsed, _, sql, site in sorted(self.slow_queries, reverse=True)
+            ],
+        }
+
+
+def _profiled_render(render):
+    def wrapper(self, context=None, request=None):
+        profile = getattr(request, '_profile', None)
+        if profile is None:
+            return render(self, context, request)
+        # Nested renders (e.g. a template rendered from a tag) are counted once.
+        profile.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            profile.template_depth -= 1
+            if not profile.template_depth:
+                profile.template += time.perf_counter() - started
+    wrapper._profiled = True
+    return wrapper
+
+
+def _instrument_templates():
+    from django.template.backends.django import Template
+    if not getattr(Template.render, '_profiled', False):
+        Template.render = _profiled_render(Template.render)
+
+
+def _enabled():
+    if not getattr(settings, 'PROFILING_ENABLED', False):
+        raise MiddlewareNotUsed
+
+
+class ProfilingMiddleware:
+    """Outermost middleware: times the whole request and every SQL query."""
+
+    def __init__(self, get_response):
+        _enabled()
+        _instrument_templates()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = request._profile = RequestProfile()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+            response = self.get_response(request)
+        profile.total = time.perf_counter() - profile.started
+
+        response['Server-Timing'] = profile.server_timing()
+        logger.info(json.dumps(profile.as_log(request, response)))
+        return response
+
+
+class ViewTimingMiddleware:
+    """Innermost middleware: everything it wraps is the view itself."""
+
+    def __init__(self, get_response):
+        _enabled()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        profile = getattr(request, '_profile', None)
+        if profile is not None:
+            profile.view += time.perf_counter() - started
+        return response
@@ -0,0 +1,99 @@
+"""
+Role names and the per-session role cache.
+
+RoleMiddleware keeps a user's resolved roles in the session together with
+the user's role generation, a RoleVersion row bumped by ``invalidate``
+whenever their groups or profiles change. Every process reads the same row,
+so a change made by one worker reaches sessions served by all of them.
+
+With a cache shared by all processes (DJANGO_CACHE_URL), the generation is
+read through it for ROLE_VERSION_CACHE_SECONDS and a request costs no
+query; per-process local memory could not see another worker's bump, so
+without one the row is read on each request (one primary-key query, still
+cheaper than resolving the roles).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .models import TeacherProfile, ParentProfile, RoleVersion
+
+PROPRIETOR = 'Proprietor'
+HEAD_TEACHER = 'HeadTeacher'
+VICE_ADMIN = 'ViceAdmin'
+VICE_ACADEMICS = 'ViceAcademics'
+TEACHER = 'Teacher'
+PARENT = 'Parent'
+
+# Order matters: dashboard() sends users with several roles to the first match.
+ROLES = (PROPRIETOR, HEAD_TEACHER, VICE_ADMIN, VICE_ACADEMICS, TEACHER, PARENT)
+
+SESSION_KEY = '_school_roles'
+
+
+def _version_key(user_id):
+    return f'school:roles:version:{user_id}'
+
+
+def _cache_seconds():
+    return getattr(settings, 'ROLE_VERSION_CACHE_SECONDS', 0)
+
+
+def _stored_version(user_id):
+    return RoleVersion.objects.filter(user_id=user_id).values_list('version', flat=True).first() or 0
+
+
+def get_version(user_id):
+    """Return the current role generation for a user."""
+    seconds = _cache_seconds()
+    if not seconds:
+        return _stored_version(user_id)
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # A read racing an invalidate can cache the old generation, but only
+        # for ``seconds``.
+        version = _stored_version(user_id)
+        cache.set(key, version, seconds)
+    return version
+
+
+def invalidate(user_id):
+    """Force every session of this user to re-resolve its roles on the next request."""
+    if not RoleVersion.objects.filter(user_id=user_id).update(version=F('version') + 1):
+        RoleVersion.objects.get_or_create(user_id=user_id, defaults={'version': 1})
+    if _cache_seconds():
+        transaction.on_commit(lambda: cache.delete(_version_key(user_id)))
+
+
+def resolve(user):
+    """Look up a user's roles and profile ids; two queries, run once per session."""
+    roles = [name for name in user.groups.values_list('name', flat=True) if name in ROLES]
+    teacher_profile = TeacherProfile.objects.filter(user=user).values('id', 'school_id').first()
+    parent_profile = None
+    if teacher_profile is None:
+        parent_profile = ParentProfile.objects.filter(user=user).values('id', 'school_id').first()
+    profile = teacher_profile or parent_profile or {}
+    return {
+        'user_id': user.pk,
+        'roles': roles,
+        'teacher_profile_id': teacher_profile and teacher_profile['id'],
+        'parent_profile_id': parent_profile and parent_profile['id'],
+        'school_id': profile.get('school_id'),
+    }
+
+
+def cache_in_session(session, user):
+    """Resolve ``user``'s roles and keep them in the session for RoleMiddleware."""
+    cached = resolve(user)
+    cached['version'] = get_version(user.pk)
+    session[SESSION_KEY] = cached
+    return cached
+
+
+def primary_role(roles):
+    for role in ROLES:
+        if role in roles:
+            return role
+    return None
@@ -0,0 +1,250 @@
+"""
+End-of-term rollover.
+
+Closing a term moves its assignments, lesson plans and attendance records
+into the archive tables, so the live tables only hold the current term. At
+the end of the school year (closing a Third Term, unless told otherwise)
+students also move up a grade, and their course enrollments are rebuilt for
+the new grade.
+
+A rollover is a RolloverRun row worked through in steps. ``advance`` runs
+one chunk of the current step in its own short transaction and records the
+step and the last id it finished in the same transaction, so a run stopped
+at any point (a crash, a deploy, a failed job) picks up exactly where it
+left off, and other writers never wait long for the tables:
+
+* archive steps copy up to ``chunk_size`` rows with one INSERT and remove
+  them with one DELETE. Delete signals are bypassed; their work is done in
+  bulk instead (sync tombstones, search index entries, pending plan counts);
+* ``plan_enrollments`` works out which courses each grade takes, from the
+  enrollments before promotion: a course belongs to the grade with the most
+  students in it;
+* ``promote`` moves a chunk of students up with one UPDATE ... CASE on
+  grade. The last of ROLLOVER_GRADES becomes GRADUATED; other grades are left
+  alone;
+* ``enrollments`` replaces the promoted students' course enrollments with
+  their new grade's courses, with one DELETE and one INSERT on the
+  through table per chunk. Graduates also leave their clubs.
+
+Past-term attendance stays available per term in AttendanceSummary, which is
+not archived, so rebuild_attendance_summaries must not be run for an
+archived term.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Case, Count, DateTimeField, Value, When
+from django.utils import timezone
+
+from . import caching, search, summaries, sync
+from .models import (
+    ArchivedAssignment, ArchivedAttendanceRecord, ArchivedLessonPlan, Assignment, AttendanceRecord,
+    LessonPlan, RolloverRun, Student,
+)
+from .terms import TERM_NAMES, current_term, term_bounds, term_for_date
+
+CHUNK_SIZE = 500
+GRADUATED = 'Graduated'
+DEFAULT_GRADES = (
+    'Primary 1', 'Primary 2', 'Primary 3', 'Primary 4', 'Primary 5', 'Primary 6',
+    'JSS1', 'JSS2', 'JSS3', 'SS1', 'SS2', 'SS3',
+)
+
+# Step name -> (live model, archive model, date field).
+ARCHIVES = {
+    'assignments': (Assignment, ArchivedAssignment, 'due_date'),
+    'lesson_plans': (LessonPlan, ArchivedLessonPlan, 'submission_date'),
+    'attendance': (AttendanceRecord, ArchivedAttendanceRecord, 'date'),
+}
+PROMOTION_STEPS = ('plan_enrollments', 'promote', 'enrollments')
+
+
+class RolloverError(ValueError):
+    pass
+
+
+def promotions():
+    """``{grade: next grade}`` from the ROLLOVER_GRADES setting, lowest first."""
+    grades = tuple(getattr(settings, 'ROLLOVER_GRADES', DEFAULT_GRADES))
+    return dict(zip(grades, grades[1:] + (GRADUATED,)))
+
+
+def previous_term(today=None):
+    """The last term that has ended."""
+    start, _ = term_bounds(term_for_date(today or timezone.localdate()))
+    return term_for_date(start - datetime.timedelta(days=1))
+
+
+def steps(run):
+    return (*ARCHIVES, *(PROMOTION_STEPS if run.promote else ()), 'finish')
+
+
+def start(school_id, term=None, promote=None, user=None):
+    """
+    The school's rollover of ``term`` (default: the last term that ended),
+    created if needed. ``promote`` defaults to closing a Third Term.
+    """
+    term = term or previous_term()
+    try:
+        _, end = term_bounds(term)
+    except (ValueError, IndexError):
+        raise RolloverError(f'"{term}" is not a term, e.g. "{current_term()}".')
+    if end >= timezone.localdate():
+        raise RolloverError(f'{term} has not ended yet.')
+    run, _ = RolloverRun.objects.get_or_create(
+        school_id=school_id, term=term,
+        defaults={
+            'promote': term.endswith(TERM_NAMES[-1]) if promote is None else promote,
+            'step': next(iter(ARCHIVES)),
+            'started_by': user,
+        },
+    )
+    return run
+
+
+def advance(run, chunk_size=CHUNK_SIZE):
+    """
+    Run the next chunk of ``run`` in one transaction. Returns the refreshed
+    run; ``run.finished_at`` is set once every step is done.
+    """
+    with transaction.atomic():
+        # Locked so two workers never run the same chunk.
+        run = RolloverRun.objects.select_for_update().get(pk=run.pk)
+        if run.finished_at is not None:
+            return run
+        cursor = STEPS[run.step](run, chunk_size)
+        if cursor is not None:
+            run.cursor = cursor
+        else:
+            remaining = steps(run)[steps(run).index(run.step) + 1:]
+            run.cursor = 0
+            run.step = remaining[0] if remaining else ''
+            if not remaining:
+                run.finished_at = timezone.now()
+        run.save()
+    return run
+
+
+def _count(run, key, amount):
+    run.state.setdefault('counts', {})
+    run.state['counts'][key] = run.state['counts'].get(key, 0) + amount
+
+
+def _term_end(run):
+    return term_bounds(run.term)[1]
+
+
+def _archive(run, chunk_size):
+    live, archive, date_field = ARCHIVES[run.step]
+    end = _term_end(run)
+    if isinstance(live._meta.get_field(date_field), DateTimeField):
+        # Everything before midnight after the term's last day.
+        midnight = datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min)
+        cutoff = {f'{date_field}__lt': timezone.make_aware(midnight)}
+    else:
+        cutoff = {f'{date_field}__lte': end}
+    fields = [field.attname for field in live._meta.concrete_fields]
+    rows = list(
+        live.objects.filter(school_id=run.school_id, pk__gt=run.cursor, **cutoff)
+        .order_by('pk').values(*fields)[:chunk_size]
+    )
+    if not rows:
+        return None
+
+    def term(row):
+        value = row[date_field]
+        return term_for_date(timezone.localdate(value) if isinstance(value, datetime.datetime) else value)
+
+    # Archive rows keep the live ids, so a chunk can never be archived twice.
+    archive.objects.bulk_create([archive(term=term(row), **row) for row in rows], ignore_conflicts=True)
+    ids = [row['id'] for row in rows]
+    # Nothing references these rows, so a plain DELETE is safe; the delete
+    # signals' work is done below, once per chunk.
+    live.objects.filter(pk__in=ids)._raw_delete(router.db_for_write(live))
+    if live in (Assignment, LessonPlan):
+        sync.record_tombstones(live, run.school_id, ids)
+        search.remove_objects([live(pk=pk) for pk in ids])
+    if live is LessonPlan:
+        summaries.adjust(run.school_id, pending_plans=-sum(1 for row in rows if not row['approved']))
+    _count(run, run.step, len(ids))
+    return ids[-1]
+
+
+def _plan_enrollments(run, chunk_size):
+    # One GROUP BY over the through table: students per (course, grade).
+    rows = (
+        Student.courses.through.objects.filter(student__school_id=run.school_id)
+        .values('course_id', 'student__grade').annotate(students=Count('id'))
+        .order_by('course_id', '-students', 'student__grade')
+        .values_list('course_id', 'student__grade')
+    )
+    courses = {}
+    planned = set()
+    for course_id, grade in rows:
+        if course_id not in planned:
+            planned.add(course_id)
+            courses.setdefault(grade, []).append(course_id)
+    run.state['courses'] = courses
+    return None
+
+
+def _promote(run, chunk_size):
+    ids = list(
+        Student.objects.filter(school_id=run.school_id, pk__gt=run.cursor)
+        .order_by('pk').values_list('pk', flat=True)[:chunk_size]
+    )
+    if not ids:
+        return None
+    promoted = promotions()
+    chunk = Student.objects.filter(pk__in=ids, grade__in=list(promoted))
+    updated = chunk.update(
+        grade=Case(*(When(grade=grade, then=Value(next_grade)) for grade, next_grade in promoted.items())),
+        updated_at=timezone.now(),
+    )
+    # Grade is part of the search document.
+    search.index_objects(Student.objects.filter(pk__in=ids).only('id', 'school_id', 'name', 'admission_number', 'grade'))
+    _count(run, 'promoted', updated)
+    return ids[-1]
+
+
+def _enrollments(run, chunk_size):
+    promoted_to = set(promotions().values())
+    students = list(
+        Student.objects.filter(school_id=run.school_id, pk__gt=run.cursor, grade__in=promoted_to)
+        .order_by('pk').values_list('pk', 'grade')[:chunk_size]
+    )
+    if not students:
+        return None
+    ids = [pk for pk, _ in students]
+    courses = run.state.get('courses', {})
+    through = Student.courses.through
+    through.objects.filter(student_id__in=ids).delete()
+    through.objects.bulk_create(
+        [through(student_id=pk, course_id=course_id) for pk, grade in students for course_id in courses.get(grade, ())],
+        batch_size=1000,
+    )
+    graduates = [pk for pk, grade in students if grade == GRADUATED]
+    if graduates:
+        Student.clubs.through.objects.filter(student_id__in=graduates).delete()
+    # Enrollments are part of the synced student row, and teachers and
+    # parents may have lost students or courses.
+    Student.objects.filter(pk__in=ids).update(updated_at=timezone.now())
+    sync.record_scope_change(run.school_id)
+    _count(run, 'graduated', len(graduates))
+    return ids[-1]
+
+
+def _finish(run, chunk_size):
+    summaries.rebuild(run.school_id)
+    caching.bump(run.school_id)
+    return None
+
+
+STEPS = {
+    **{step: _archive for step in ARCHIVES},
+    'plan_enrollments': _plan_enrollments,
+    'promote': _promote,
+    'enrollments': _enrollments,
+    'finish': _finish,
+}
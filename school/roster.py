@@ -0,0 +1,237 @@
+"""
+Streaming student roster import.
+
+Rows are read one at a time from a CSV or XLSX file and written in batches:
+students with ``bulk_create``/``bulk_update`` and their course and club
+enrollments with bulk inserts into the ManyToMany through tables. Only one
+batch is held in memory, so large rosters import with flat memory use.
+
+Recognised columns (header names are case-insensitive):
+
+    admission_number  required, the upsert key within the school
+    name              required
+    grade             required
+    courses           optional, course names separated by ';'
+    clubs             optional, club names separated by ';'
+    behavior_notes    optional
+
+When the ``courses`` or ``clubs`` column is present, a student's enrollments
+are replaced by the listed ones; when it is absent they are left untouched.
+"""
+import csv
+import io
+import os
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import audit, caching, search, summaries, sync
+from .models import Student, Course, Club
+
+REQUIRED_COLUMNS = ('admission_number', 'name', 'grade')
+LIST_SEPARATOR = ';'
+DEFAULT_BATCH_SIZE = 1000
+# Keep the error list bounded on badly broken files; the total is still counted.
+MAX_REPORTED_ERRORS = 1000
+
+
+class RosterError(Exception):
+    pass
+
+
+class ImportReport:
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def __str__(self):
+        prefix = 'Dry run: ' if self.dry_run else ''
+        return (f'{prefix}{self.rows} rows, {self.created} created, '
+                f'{self.updated} updated, {self.error_count} errors')
+
+
+def read_rows(fileobj, filename):
+    """
+    Read a CSV or XLSX file object: yields the normalised header columns
+    first, then ``(line_number, row_dict)`` pairs.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.xlsx':
+        return _read_xlsx(fileobj)
+    if extension in ('.csv', '.txt', ''):
+        return _read_csv(fileobj)
+    raise RosterError(f'Unsupported roster format "{extension}". Use CSV or XLSX.')
+
+
+def _normalise_header(header):
+    return [str(column or '').strip().lower().replace(' ', '_') for column in header]
+
+
+def _read_csv(fileobj):
+    if isinstance(fileobj.read(0), bytes):
+        fileobj = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    reader = csv.reader(fileobj)
+    header = _normalise_header(next(reader, []))
+    yield header
+    for row in reader:
+        if any(row):
+            yield reader.line_num, dict(zip(header, row))
+
+
+def _read_xlsx(fileobj):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RosterError('XLSX rosters need the openpyxl package.')
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = _normalise_header(next(rows, ()))
+        yield header
+        for line, row in enumerate(rows, start=2):
+            if any(value not in (None, '') for value in row):
+                yield line, dict(zip(header, ('' if value is None else str(value) for value in row)))
+    finally:
+        workbook.close()
+
+
+def _name_map(model, school):
+    """One query per import: case-folded name -> id for the school's courses or clubs."""
+    return {
+        name.casefold(): pk
+        for pk, name in model.objects.filter(school=school).values_list('id', 'name')
+    }
+
+
+def _split(value):
+    return [part.strip() for part in (value or '').split(LIST_SEPARATOR) if part.strip()]
+
+
+class RosterImporter:
+    def __init__(self, school, dry_run=False, batch_size=DEFAULT_BATCH_SIZE):
+        self.school = school
+        self.batch_size = batch_size
+        self.report = ImportReport(dry_run=dry_run)
+        self.course_ids = _name_map(Course, school)
+        self.club_ids = _name_map(Club, school)
+        self.columns = None
+
+    def run(self, rows):
+        """Import ``rows`` as produced by ``read_rows``: the header, then the rows."""
+        # Checked against the header, so a file with no rows, or whose first
+        # row is short, still reports the columns it lacks.
+        self.columns = set(next(rows, ()))
+        missing = [c for c in REQUIRED_COLUMNS if c not in self.columns]
+        if missing:
+            raise RosterError(f'Missing required column(s): {", ".join(missing)}')
+        batch = []
+        for line, row in rows:
+            self.report.rows += 1
+            parsed = self._parse(line, row)
+            if parsed is not None:
+                batch.append(parsed)
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+        return self.report
+
+    def _parse(self, line, row):
+        values = {key: (row.get(key) or '').strip() for key in REQUIRED_COLUMNS}
+        for key in REQUIRED_COLUMNS:
+            if not values[key]:
+                self.report.add_error(line, f'"{key}" is empty.')
+                return None
+
+        enrollments = {}
+        for column, ids in (('courses', self.course_ids), ('clubs', self.club_ids)):
+            if column not in self.columns:
+                continue
+            names = _split(row.get(column))
+            unknown = [name for name in names if name.casefold() not in ids]
+            if unknown:
+                self.report.add_error(line, f'Unknown {column}: {", ".join(unknown)}')
+                return None
+            enrollments[column] = {ids[name.casefold()] for name in names}
+
+        values['behavior_notes'] = (row.get('behavior_notes') or '').strip()
+        return line, values, enrollments
+
+    def _flush(self, batch):
+        # Later rows win when a file repeats an admission number.
+        by_number = {}
+        for line, values, enrollments in batch:
+            by_number[values['admission_number']] = (line, values, enrollments)
+
+        existing = {
+            student.admission_number: student
+            for student in Student.objects.filter(
+                school=self.school, admission_number__in=list(by_number)
+            ).only('id', 'school', 'admission_number', 'name', 'grade', 'behavior_notes')
+        }
+        self.report.created += len(by_number) - len(existing)
+        self.report.updated += len(existing)
+        if self.report.dry_run:
+            return
+
+        now = timezone.now()
+        to_create, to_update = [], []
+        for number, (line, values, enrollments) in by_number.items():
+            student = existing.get(number)
+            if student is None:
+                to_create.append(Student(school=self.school, **values))
+                continue
+            student.name = values['name']
+            student.grade = values['grade']
+            student.updated_at = now
+            if 'behavior_notes' in self.columns:
+                student.behavior_notes = values['behavior_notes']
+            to_update.append(student)
+
+        with transaction.atomic():
+            Student.objects.bulk_create(to_create, batch_size=self.batch_size)
+            summaries.adjust(self.school.pk, student_count=len(to_create))
+            if to_update:
+                Student.objects.bulk_update(
+                    to_update, ['name', 'grade', 'behavior_notes', 'updated_at'], batch_size=self.batch_size
+                )
+            search.index_objects(to_create + to_update)
+            audit.saved(to_create, created=True)
+            audit.saved(to_update, created=False, update_fields=['name', 'grade', 'behavior_notes'])
+            student_ids = {student.admission_number: student.pk for student in to_create + to_update}
+            self._set_enrollments(Student.courses.through, 'course_id', 'courses', by_number, student_ids, existing)
+            self._set_enrollments(Student.clubs.through, 'club_id', 'clubs', by_number, student_ids, existing)
+
+    def _set_enrollments(self, through, target_field, column, by_number, student_ids, existing):
+        if column not in self.columns:
+            return
+        replaced = [student.pk for student in existing.values()]
+        if replaced:
+            through.objects.filter(student_id__in=replaced).delete()
+            sync.record_scope_change(self.school.pk)
+        links = [
+            through(student_id=student_ids[number], **{target_field: target_id})
+            for number, (line, values, enrollments) in by_number.items()
+            for target_id in enrollments[column]
+        ]
+        through.objects.bulk_create(links, batch_size=self.batch_size, ignore_conflicts=True)
+
+
+def import_roster(fileobj, filename, school, dry_run=False, batch_size=DEFAULT_BATCH_SIZE):
+    """Import a roster file into ``school`` and return an ImportReport."""
+    importer = RosterImporter(school, dry_run=dry_run, batch_size=batch_size)
+    try:
+        return importer.run(read_rows(fileobj, filename))
+    finally:
+        if not dry_run:
+            caching.bump(school.pk)
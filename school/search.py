@@ -0,0 +1,254 @@
+"""
+Full-text search over lesson plans, assignments and students.
+
+Documents live in one ``school_search`` table created by migration 0011:
+
+* SQLite: an FTS5 virtual table (porter stemming), ranked with ``bm25``.
+* PostgreSQL: a table with a stored, weighted ``tsvector`` column and a GIN
+  index, ranked with ``ts_rank_cd``.
+
+Other database vendors get no index, and searches return nothing.
+
+A document's row id encodes its type and primary key (``pk * 8 + type``), so
+an update or delete touches one row by key. On SQLite the school and type are
+stored as tokens in a ``scope`` column and matched inside the FTS query, so
+per-school filtering is served by the index, not a scan of every hit.
+
+The index follows saves and deletes through signals (school/signals.py).
+Bulk writers that skip signals call ``index_objects`` or ``rebuild``, and
+``manage.py rebuild_search_index`` reindexes from scratch.
+"""
+import re
+
+from django.db import connections, router, transaction
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import LessonPlan, Assignment, Student
+
+TABLE = 'school_search'
+
+# doc type -> (code, model, title fields, body fields)
+SOURCES = {
+    'lessonplan': (1, LessonPlan, ('title',), ('objective', 'activities', 'materials')),
+    'assignment': (2, Assignment, ('title',), ('description',)),
+    'student': (3, Student, ('name',), ('admission_number', 'grade')),
+}
+DOC_TYPES = tuple(SOURCES)
+TYPE_LABELS = {'lessonplan': 'Lesson plan', 'assignment': 'Assignment', 'student': 'Student'}
+_BY_CODE = {code: name for name, (code, *_) in SOURCES.items()}
+_ID_SHIFT = 8
+
+MAX_RESULTS = 50
+REBUILD_BATCH_SIZE = 2000
+
+TOKEN = re.compile(r'\w+')
+# Highlight markers that cannot occur in escaped text; swapped for <mark> after escaping.
+MARK_START, MARK_END = '\x02', '\x03'
+
+
+def _rowid(doc_type, pk):
+    return pk * _ID_SHIFT + SOURCES[doc_type][0]
+
+
+def _text(values):
+    return ' '.join(str(value) for value in values if value)
+
+
+class Hit:
+    def __init__(self, rowid, school_id, title, snippet, rank):
+        self.doc_type = _BY_CODE[rowid % _ID_SHIFT]
+        self.object_id = rowid // _ID_SHIFT
+        self.school_id = school_id
+        self.title = _highlighted(title)
+        self.snippet = _highlighted(snippet)
+        self.rank = rank
+
+    @property
+    def type_label(self):
+        return TYPE_LABELS[self.doc_type]
+
+
+def _highlighted(text):
+    return mark_safe(escape(text or '').replace(MARK_START, '<mark>').replace(MARK_END, '</mark>'))
+
+
+def _tokens(query):
+    return [token.lower() for token in TOKEN.findall(query or '')][:16]
+
+
+class SqliteIndex:
+    def delete(self, cursor, rowids):
+        cursor.executemany(f'DELETE FROM {TABLE} WHERE rowid = %s', [(rowid,) for rowid in rowids])
+
+    def upsert(self, cursor, rows):
+        self.delete(cursor, [row[0] for row in rows])
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, school_id, scope, title, body) VALUES (%s, %s, %s, %s, %s)',
+            [(rowid, school_id, f's{school_id} {doc_type}', title, body)
+             for rowid, school_id, doc_type, title, body in rows],
+        )
+
+    def clear(self, cursor, school_id=None):
+        if school_id is None:
+            cursor.execute(f'DELETE FROM {TABLE}')
+        else:
+            cursor.execute(
+                f'DELETE FROM {TABLE} WHERE rowid IN '
+                f'(SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s)',
+                [f'scope : s{school_id}'],
+            )
+
+    def search(self, cursor, tokens, school_id, doc_types, limit):
+        terms = [f'"{token}"' for token in tokens]
+        terms[-1] += '*'
+        match = f'{{title body}} : ({" AND ".join(terms)})'
+        scope = []
+        if school_id is not None:
+            scope.append(f's{int(school_id)}')
+        if set(doc_types) != set(DOC_TYPES):
+            scope.append(f'({" OR ".join(doc_types)})')
+        if scope:
+            match = f'scope : ({" AND ".join(scope)}) AND {match}'
+        cursor.execute(
+            f'SELECT rowid, school_id, highlight({TABLE}, 0, %s, %s), '
+            f"snippet({TABLE}, 1, %s, %s, '…', 16), bm25({TABLE}, 10.0, 1.0, 0.0) AS score "
+            f'FROM {TABLE} WHERE {TABLE} MATCH %s ORDER BY score LIMIT %s',
+            [MARK_START, MARK_END, MARK_START, MARK_END, match, limit],
+        )
+        # bm25 is lower-is-better; flip it so a higher rank is a better hit everywhere.
+        return [(rowid, school, title, snippet, -score) for rowid, school, title, snippet, score in cursor.fetchall()]
+
+
+class PostgresIndex:
+    HEADLINE = f'StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=30, MinWords=10'
+
+    def delete(self, cursor, rowids):
+        cursor.execute(f'DELETE FROM {TABLE} WHERE id = ANY(%s)', [list(rowids)])
+
+    def upsert(self, cursor, rows):
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (id, school_id, doc_type, title, body) VALUES (%s, %s, %s, %s, %s) '
+            f'ON CONFLICT (id) DO UPDATE SET school_id = EXCLUDED.school_id, '
+            f'doc_type = EXCLUDED.doc_type, title = EXCLUDED.title, body = EXCLUDED.body',
+            rows,
+        )
+
+    def clear(self, cursor, school_id=None):
+        if school_id is None:
+            cursor.execute(f'TRUNCATE {TABLE}')
+        else:
+            cursor.execute(f'DELETE FROM {TABLE} WHERE school_id = %s', [school_id])
+
+    def search(self, cursor, tokens, school_id, doc_types, limit):
+        query = ' & '.join(tokens[:-1] + [f'{tokens[-1]}:*'])
+        where, params = ['document @@ q', 'doc_type = ANY(%s)'], [query, list(doc_types)]
+        if school_id is not None:
+            where.append('school_id = %s')
+            params.append(school_id)
+        # Headlines are costly, so they are only built for the page of top hits.
+        cursor.execute(
+            f"SELECT id, school_id, ts_headline('english', title, q, %s), "
+            f"ts_headline('english', body, q, %s), rank FROM ("
+            f"SELECT id, school_id, title, body, q, ts_rank_cd(document, q) AS rank "
+            f"FROM {TABLE}, to_tsquery('english', %s) q WHERE {' AND '.join(where)} "
+            f"ORDER BY rank DESC LIMIT %s) hits ORDER BY rank DESC",
+            [self.HEADLINE, self.HEADLINE] + params + [limit],
+        )
+        return cursor.fetchall()
+
+
+BACKENDS = {'sqlite': SqliteIndex(), 'postgresql': PostgresIndex()}
+
+
+def backend(connection):
+    return BACKENDS.get(connection.vendor)
+
+
+def _write_connection():
+    return connections[router.db_for_write(LessonPlan) or 'default']
+
+
+def _row(doc_type, pk, school_id, values):
+    _, _, title_fields, _ = SOURCES[doc_type]
+    return (_rowid(doc_type, pk), school_id, doc_type,
+            _text(values[:len(title_fields)]), _text(values[len(title_fields):]))
+
+
+def document(instance):
+    doc_type = instance._meta.model_name
+    _, _, title_fields, body_fields = SOURCES[doc_type]
+    values = [getattr(instance, field) for field in title_fields + body_fields]
+    return _row(doc_type, instance.pk, instance.school_id, values)
+
+
+def index_objects(instances):
+    """Add or refresh the index entries for model instances (no queries beyond the writes)."""
+    rows = [document(instance) for instance in instances if instance.school_id is not None]
+    connection = _write_connection()
+    index = backend(connection)
+    if index is None or not rows:
+        return
+    with connection.cursor() as cursor:
+        index.upsert(cursor, rows)
+
+
+def remove_objects(instances):
+    connection = _write_connection()
+    index = backend(connection)
+    if index is None:
+        return
+    rowids = [_rowid(instance._meta.model_name, instance.pk) for instance in instances]
+    if rowids:
+        with connection.cursor() as cursor:
+            index.delete(cursor, rowids)
+
+
+def rebuild(school_id=None, batch_size=REBUILD_BATCH_SIZE):
+    """Reindex every document (of one school, or all); returns the number indexed."""
+    connection = _write_connection()
+    index = backend(connection)
+    if index is None:
+        return 0
+    total = 0
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        index.clear(cursor, school_id)
+        for doc_type, (_, model, title_fields, body_fields) in SOURCES.items():
+            queryset = model.objects.using(connection.alias).exclude(school_id=None)
+            if school_id is not None:
+                queryset = queryset.filter(school_id=school_id)
+            rows = queryset.order_by().values_list('pk', 'school_id', *title_fields, *body_fields)
+            batch = []
+            for pk, row_school_id, *values in rows.iterator(chunk_size=batch_size):
+                batch.append(_row(doc_type, pk, row_school_id, values))
+                if len(batch) >= batch_size:
+                    index.upsert(cursor, batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                index.upsert(cursor, batch)
+                total += len(batch)
+    return total
+
+
+def search(query, school_id=None, doc_types=DOC_TYPES, limit=MAX_RESULTS):
+    """
+    Ranked hits for ``query`` (best first), optionally limited to one school and
+    some document types. The last word matches as a prefix.
+    """
+    tokens = _tokens(query)
+    doc_types = [doc_type for doc_type in doc_types if doc_type in SOURCES]
+    if not tokens or not doc_types:
+        return []
+    alias = router.db_for_read(LessonPlan) or 'default'
+    index = backend(connections[alias])
+    if index is None:
+        return []
+    with connections[alias].cursor() as cursor:
+        rows = index.search(cursor, tokens, school_id, doc_types, limit)
+    return [Hit(*row) for row in rows]
+
+
+def matching_ids(doc_type, query, school_id=None, limit=1000):
+    """Primary keys of ``doc_type`` objects matching ``query``, best first."""
+    return [hit.object_id for hit in search(query, school_id, (doc_type,), limit)]
@@ -0,0 +1,100 @@
+"""
+Session storage helpers.
+
+DJANGO_SESSION_BACKEND picks the engine in settings:
+
+* ``db``: every request with a session cookie reads ``django_session``.
+* ``cached_db``: reads come from the cache and fall back to the database;
+  writes go to both. Only the default when DJANGO_CACHE_URL names a cache
+  shared by all processes; with per-process local memory another process
+  could keep serving a session that was changed or logged out elsewhere.
+* ``signed_cookies``: the session lives in the cookie and the database is
+  never touched. Logging out only clears this browser's cookie.
+
+Messages use cookie storage in every mode, so ``messages.success`` before a
+redirect never writes the session.
+
+Sessions are written by ``CompactJSONSerializer``. It shortens the keys every
+logged-in session carries (auth and the role cache), which makes signed
+cookies smaller on every request and database rows smaller to write.
+"""
+import json
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY as USER_SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore as DatabaseStore
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import roles
+
+CLEANUP_BATCH_SIZE = 1000
+
+# Short names start with "~"; session keys that really start with "~" get a second one.
+ESCAPE = '~'
+KEY_ALIASES = {
+    USER_SESSION_KEY: '~u',
+    BACKEND_SESSION_KEY: '~b',
+    HASH_SESSION_KEY: '~h',
+    roles.SESSION_KEY: '~r',
+}
+KEY_NAMES = {alias: key for key, alias in KEY_ALIASES.items()}
+# The role cache (see RoleMiddleware) is stored as a list in this order.
+ROLE_FIELDS = ('user_id', 'version', 'roles', 'school_id', 'teacher_profile_id', 'parent_profile_id')
+
+
+def _compact_value(key, value):
+    if key == BACKEND_SESSION_KEY and value in settings.AUTHENTICATION_BACKENDS:
+        return settings.AUTHENTICATION_BACKENDS.index(value)
+    if key == roles.SESSION_KEY and isinstance(value, dict) and set(value) == set(ROLE_FIELDS):
+        return [value[field] for field in ROLE_FIELDS]
+    return value
+
+
+def _expand_value(key, value):
+    if key == BACKEND_SESSION_KEY and isinstance(value, int):
+        return settings.AUTHENTICATION_BACKENDS[value]
+    if key == roles.SESSION_KEY and isinstance(value, list):
+        return dict(zip(ROLE_FIELDS, value))
+    return value
+
+
+class CompactJSONSerializer:
+    """Drop-in for ``django.core.signing.JSONSerializer`` with shorter session keys."""
+
+    def dumps(self, obj):
+        compact = {}
+        for key, value in obj.items():
+            alias = KEY_ALIASES.get(key) or (ESCAPE + key if key.startswith(ESCAPE) else key)
+            compact[alias] = _compact_value(key, value)
+        return json.dumps(compact, separators=(',', ':')).encode('latin-1')
+
+    def loads(self, data):
+        obj = {}
+        for alias, value in json.loads(data.decode('latin-1')).items():
+            key = KEY_NAMES.get(alias) or (alias[1:] if alias.startswith(ESCAPE) else alias)
+            obj[key] = _expand_value(key, value)
+        return obj
+
+
+def clear_expired(batch_size=CLEANUP_BATCH_SIZE):
+    """
+    Delete expired sessions of the configured engine; returns the number
+    deleted, or None for engines without server-side storage to clean.
+
+    Database-backed sessions are deleted ``batch_size`` rows per statement, each
+    in its own transaction, so the write lock is only held briefly between
+    requests instead of for one long DELETE.
+    """
+    store = import_string(f'{settings.SESSION_ENGINE}.SessionStore')
+    if not issubclass(store, DatabaseStore):
+        store.clear_expired()
+        return None
+    sessions = store.get_model_class().objects
+    now = timezone.now()
+    deleted = 0
+    while True:
+        keys = list(sessions.filter(expire_date__lt=now).values_list('session_key', flat=True)[:batch_size])
+        if not keys:
+            return deleted
+        deleted += sessions.filter(session_key__in=keys).delete()[0]
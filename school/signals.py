@@ -0,0 +1,197 @@
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import audit, caching, directory, jobs, roles, search, summaries, sync
+from .models import (
+    School, TeacherProfile, ParentProfile, Student, LessonPlan, Club, Course,
+    Assignment, GradeRecord,
+)
+
+
+@receiver(user_logged_in)
+def cache_roles_on_login(sender, request, user, **kwargs):
+    # login() already writes the session; resolving roles now saves the next
+    # request from writing it again.
+    if hasattr(request, 'session'):
+        roles.cache_in_session(request.session, user)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_roles_on_group_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            roles.invalidate(instance.pk)
+    elif action == 'pre_clear':
+        # group.user_set.clear() does not pass pk_set, so remember the members.
+        instance._role_members = list(instance.user_set.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        for user_id in getattr(instance, '_role_members', ()):
+            roles.invalidate(user_id)
+    elif action in ('post_add', 'post_remove'):
+        for user_id in pk_set or ():
+            roles.invalidate(user_id)
+
+
+@receiver([post_save, post_delete], sender=TeacherProfile)
+@receiver([post_save, post_delete], sender=ParentProfile)
+def invalidate_roles_on_profile_change(sender, instance, **kwargs):
+    roles.invalidate(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=TeacherProfile)
+@receiver([post_save, post_delete], sender=ParentProfile)
+@receiver([post_save, post_delete], sender=Student)
+@receiver([post_save, post_delete], sender=LessonPlan)
+@receiver([post_save, post_delete], sender=Club)
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Assignment)
+@receiver([post_save, post_delete], sender=GradeRecord)
+def bump_school_cache_version(sender, instance, **kwargs):
+    caching.bump(instance.school_id)
+
+
+@receiver([post_save, post_delete], sender=School)
+def bump_school_cache_version_on_school(sender, instance, **kwargs):
+    caching.bump(instance.pk)
+    directory.bump()
+
+
+@receiver(m2m_changed, sender=Student.courses.through)
+@receiver(m2m_changed, sender=Student.clubs.through)
+def bump_school_cache_version_on_enrollment(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        caching.bump(instance.school_id)
+
+
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=LessonPlan)
+@receiver(post_delete, sender=Club)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Assignment)
+def record_sync_tombstone(sender, instance, **kwargs):
+    sync.record_tombstone(instance)
+
+
+@receiver(pre_save, sender=Student)
+@receiver(pre_save, sender=LessonPlan)
+@receiver(pre_save, sender=Club)
+@receiver(pre_save, sender=Course)
+@receiver(pre_save, sender=Assignment)
+def remember_sync_scope(sender, instance, update_fields=None, **kwargs):
+    if not instance._state.adding:
+        instance._sync_previous = sync.previous_scope(sender, instance, update_fields)
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=LessonPlan)
+@receiver(post_save, sender=Club)
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Assignment)
+def record_sync_scope_change(sender, instance, created, **kwargs):
+    previous = instance.__dict__.pop('_sync_previous', None)
+    if not created and previous:
+        sync.saved(sender, instance, previous)
+
+
+@receiver(m2m_changed, sender=Student.courses.through)
+@receiver(m2m_changed, sender=Student.clubs.through)
+@receiver(m2m_changed, sender=ParentProfile.students.through)
+def record_sync_scope_change_on_unlink(sender, instance, action, **kwargs):
+    # Unlinked rows leave a teacher's or parent's scope without being deleted.
+    if action in ('post_remove', 'post_clear'):
+        sync.record_scope_change(instance.school_id, instance.pk)
+
+
+@receiver(post_delete, sender=Course)
+def record_sync_scope_change_on_course_delete(sender, instance, **kwargs):
+    # Its enrollments go with it, and with them the teacher's students.
+    sync.record_scope_change(instance.school_id, instance.pk)
+
+
+@receiver(m2m_changed, sender=Student.courses.through)
+@receiver(m2m_changed, sender=Student.clubs.through)
+def touch_student_on_enrollment(sender, instance, action, reverse, pk_set, **kwargs):
+    # Enrollments are part of the synced student row.
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        Student.objects.filter(pk=instance.pk).update(updated_at=timezone.now())
+    elif pk_set:
+        Student.objects.filter(pk__in=pk_set).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=LessonPlan)
+@receiver(post_save, sender=Assignment)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None:
+        _, _, title_fields, body_fields = search.SOURCES[sender._meta.model_name]
+        if not set(update_fields) & set(title_fields + body_fields + ('school',)):
+            return
+    search.index_objects([instance])
+
+
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=LessonPlan)
+@receiver(post_delete, sender=Assignment)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_objects([instance])
+
+
+@receiver(post_save, sender=Assignment)
+def queue_assignment_notifications(sender, instance, created, **kwargs):
+    if created:
+        jobs.enqueue('assignment_posted', {'assignment_id': instance.pk})
+
+
+@receiver(pre_save, sender=Student)
+@receiver(pre_save, sender=TeacherProfile)
+@receiver(pre_save, sender=Course)
+@receiver(pre_save, sender=Club)
+@receiver(pre_save, sender=LessonPlan)
+def remember_summary_state(sender, instance, update_fields=None, **kwargs):
+    # Updates only: what the row counted for before, to move it between schools
+    # or in and out of the pending plans.
+    instance._summary_previous = summaries.previous_state(sender, instance, update_fields)
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=TeacherProfile)
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Club)
+@receiver(post_save, sender=LessonPlan)
+def update_school_summary(sender, instance, created, **kwargs):
+    summaries.saved(sender, instance, created, instance.__dict__.pop('_summary_previous', None))
+
+
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=TeacherProfile)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Club)
+@receiver(post_delete, sender=LessonPlan)
+def update_school_summary_on_delete(sender, instance, **kwargs):
+    summaries.deleted(sender, instance)
+
+
+def take_audit_snapshot(sender, instance, **kwargs):
+    audit.snapshot(instance)
+
+
+def record_audit_save(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if not raw:
+        audit.saved([instance], created, update_fields)
+
+
+def record_audit_delete(sender, instance, **kwargs):
+    audit.deleted(instance)
+
+
+# Connected per model: a receiver for every sender would make Django run
+# post_init for every instance of every model.
+for model in audit.AUDITED:
+    post_init.connect(take_audit_snapshot, sender=model)
+    post_save.connect(record_audit_save, sender=model)
+    post_delete.connect(record_audit_delete, sender=model)
@@ -0,0 +1,144 @@
+"""
+Cold-start timing for the WSGI entry point (core/wsgi.py).
+
+A serverless function pays for imports and ``django.setup()`` on every cold
+start, and a process can only start cold once, so each sample runs in a fresh
+interpreter: ``python -m school.startup [settings module]`` prints one JSON
+object, and ``manage.py benchmark_startup`` runs it repeatedly and reports
+medians.
+
+The probe follows ``get_wsgi_application()`` step by step and records:
+
+* ``settings``: importing the settings module;
+* ``apps``: the app registry, split per app into importing the app module,
+  its models and running ``ready()``;
+* ``middleware``: building the WSGI handler, split per middleware import;
+* ``urls``: importing the URLconf (and with it the views);
+* ``first_request``: serving the landing page, which compiles its templates.
+"""
+import json
+import os
+import sys
+import time
+
+FIRST_REQUEST_PATH = '/'
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+class _Timer:
+    def __init__(self):
+        self.started = time.perf_counter()
+
+    def lap(self):
+        now = time.perf_counter()
+        elapsed, self.started = now - self.started, now
+        return _ms(elapsed)
+
+
+def _timed(func, record, key):
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record[key] = record.get(key, 0) + _ms(time.perf_counter() - started)
+    return wrapper
+
+
+def _instrument_apps(apps_timings):
+    """Time each app's module import, ``import_models()`` and ``ready()``."""
+    from django.apps import AppConfig
+
+    create = AppConfig.create.__func__
+
+    def timed_create(cls, entry):
+        record = apps_timings.setdefault(entry, {})
+        app_config = _timed(create, record, 'import')(cls, entry)
+        app_config.import_models = _timed(app_config.import_models, record, 'models')
+        app_config.ready = _timed(app_config.ready, record, 'ready')
+        return app_config
+
+    AppConfig.create = classmethod(timed_create)
+    return lambda: setattr(AppConfig, 'create', classmethod(create))
+
+
+def _instrument_middleware(middleware_timings):
+    from django.core.handlers import base
+
+    import_string = base.import_string
+
+    def timed_import(path):
+        return _timed(import_string, middleware_timings, path)(path)
+
+    base.import_string = timed_import
+    return lambda: setattr(base, 'import_string', import_string)
+
+
+def _first_request(application):
+    from wsgiref.util import setup_testing_defaults
+
+    environ = {'PATH_INFO': FIRST_REQUEST_PATH, 'REQUEST_METHOD': 'GET'}
+    setup_testing_defaults(environ)
+    status = []
+    body = application(environ, lambda code, headers, exc_info=None: status.append(code))
+    try:
+        for _ in body:
+            pass
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return int(status[0].split()[0])
+
+
+def probe(settings_module):
+    """Start Django the way core/wsgi.py does and time each step."""
+    os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+    phases, apps_timings, middleware_timings = {}, {}, {}
+    timer = _Timer()
+
+    import django
+    from django.conf import settings
+    from django.core.handlers.wsgi import WSGIHandler
+    phases['django'] = timer.lap()
+
+    settings.INSTALLED_APPS  # imports the settings module
+    phases['settings'] = timer.lap()
+
+    restore = _instrument_apps(apps_timings)
+    try:
+        django.setup(set_prefix=False)
+    finally:
+        restore()
+    phases['apps'] = timer.lap()
+
+    restore = _instrument_middleware(middleware_timings)
+    try:
+        application = WSGIHandler()
+    finally:
+        restore()
+    phases['middleware'] = timer.lap()
+
+    from django.urls import get_resolver
+    get_resolver().url_patterns  # imports the URLconf and views
+    phases['urls'] = timer.lap()
+
+    status = _first_request(application)
+    phases['first_request'] = timer.lap()
+
+    return {
+        'settings_module': settings_module,
+        'total_ms': round(sum(phases.values()), 2),
+        'phases': phases,
+        'apps': apps_timings,
+        # The handler loads middleware bottom-up; report them in settings order.
+        'middleware': {path: middleware_timings[path] for path in settings.MIDDLEWARE if path in middleware_timings},
+        'first_request_status': status,
+        'modules_loaded': len(sys.modules),
+    }
+
+
+if __name__ == '__main__':
+    sys.stdout.write(json.dumps(probe(sys.argv[1] if len(sys.argv) > 1 else 'core.settings')) + '\n')
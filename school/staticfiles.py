@@ -0,0 +1,161 @@
+"""
+Static files for production: content-hashed names, precompressed copies and
+far-future caching.
+
+``collectstatic`` with ``CompressedManifestStaticFilesStorage`` copies each
+file to STATIC_ROOT under a name containing a hash of its contents
+(``build/app.3f2a9c1d0b7e.css``), which ``{% static %}`` then links to, and
+writes ``.gz`` and ``.br`` files next to the hashed copies. A changed file
+gets a new name, so browsers and CDNs may cache hashed names forever.
+
+``StaticFilesMiddleware`` serves STATIC_ROOT when no web server or CDN does:
+the smallest encoding the client accepts, ``immutable`` for hashed names and a
+short max-age for the rest, and 304s for revalidation. runserver's own static
+handler is used in DEBUG instead.
+"""
+import gzip
+import mimetypes
+import os
+import re
+from urllib.parse import urlparse
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only .gz copies are written and served.
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.xml', '.html', '.ico')
+MIN_COMPRESS_SIZE = 256
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+MUTABLE_MAX_AGE = 300
+# ManifestStaticFilesStorage inserts the first 12 hex digits of the MD5.
+_HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+# Preferred first.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def compress(data):
+    """``{extension: bytes}`` of the encodings that actually shrink ``data``."""
+    versions = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        versions['.br'] = brotli.compress(data, quality=11)
+    return {extension: body for extension, body in versions.items() if len(body) < len(data) * 0.95}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage that also writes compressed copies of the hashed files."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for hashed_name in sorted(set(self.hashed_files.values())):
+            if not hashed_name.endswith(COMPRESSIBLE_EXTENSIONS) or not self.exists(hashed_name):
+                continue
+            with self.open(hashed_name) as file:
+                data = file.read()
+            if len(data) < MIN_COMPRESS_SIZE:
+                continue
+            for extension, body in compress(data).items():
+                with open(self.path(hashed_name + extension), 'wb') as file:
+                    file.write(body)
+                yield hashed_name + extension, hashed_name + extension, True
+
+    def stored_name(self, name):
+        # Before the first collectstatic (development, tests) there is no
+        # manifest; link to the unhashed names instead of failing.
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+
+def accepted_encodings(header):
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticFilesMiddleware:
+    """Serve collected files under STATIC_URL from STATIC_ROOT (see module docstring)."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.DEBUG or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.prefix = urlparse(settings.STATIC_URL).path
+        if not self.prefix.startswith('/'):
+            self.prefix = '/' + self.prefix
+
+    def _name(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix):
+            return request.path_info[len(self.prefix):]
+        return None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        name = self._name(request)
+        response = self.serve(request, name) if name is not None else None
+        return response if response is not None else self.get_response(request)
+
+    async def __acall__(self, request):
+        name = self._name(request)
+        # Read whole in a worker thread: ASGI can only stream async iterators.
+        response = await sync_to_async(self.serve, thread_sensitive=False)(request, name, False) if name is not None else None
+        return response if response is not None else await self.get_response(request)
+
+    def serve(self, request, name, stream=True):
+        """A response for ``name`` under STATIC_ROOT, or None to fall through to a 404."""
+        try:
+            path = safe_join(settings.STATIC_ROOT, name)
+        except (SuspiciousFileOperation, ValueError):
+            return None
+        if not name or not os.path.isfile(path):
+            return None
+
+        modified = os.stat(path).st_mtime
+        encoding = None
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        for coding, extension in ENCODINGS:
+            if coding in accepted and os.path.isfile(path + extension):
+                encoding, path = coding, path + extension
+                break
+
+        if not was_modified_since(request.headers.get('If-Modified-Since'), modified):
+            response = HttpResponseNotModified()
+        else:
+            content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+            if stream:
+                response = FileResponse(open(path, 'rb'), content_type=content_type)
+                # FileResponse names the file being sent, which may be the .br/.gz copy.
+                del response['Content-Disposition']
+            else:
+                with open(path, 'rb') as file:
+                    response = HttpResponse(file.read(), content_type=content_type)
+            response['Content-Length'] = os.path.getsize(path)
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(modified)
+        if _HASHED_NAME.search(name):
+            response['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            response['Cache-Control'] = f'public, max-age={MUTABLE_MAX_AGE}'
+        if name.endswith(COMPRESSIBLE_EXTENSIONS):
+            response['Vary'] = 'Accept-Encoding'
+        return response
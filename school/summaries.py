@@ -0,0 +1,145 @@
+"""
+Per-school dashboard counts: one SchoolSummary row per school.
+
+Dashboards read the row instead of counting a school's students, teachers,
+courses, clubs, pending lesson plans and attendance. Writes keep it current
+with ``UPDATE ... SET n = n + delta`` in the writer's own transaction:
+
+* signals (school/signals.py) for single-row saves and deletes, including a
+  row moving school and a plan being approved or reopened;
+* explicit calls from the bulk paths that bypass signals: roster imports,
+  review_plans and roll calls.
+
+Deltas never create the row. ``get`` builds it with one COUNT per figure the
+first time a school's summary is read, and again once the term changes,
+since the attendance figures cover the current term only.
+``rebuild_school_summaries`` recounts from scratch, for repairs.
+"""
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import AttendanceSummary, Club, Course, LessonPlan, SchoolSummary, Student, TeacherProfile
+from .terms import current_term
+
+COUNTED = {
+    Student: 'student_count',
+    TeacherProfile: 'teacher_count',
+    Course: 'course_count',
+    Club: 'club_count',
+}
+TRACKED_MODELS = (*COUNTED, LessonPlan)
+
+
+def adjust(school_id, **deltas):
+    """Add ``deltas`` (``field=change``) to a school's summary, if it has one."""
+    deltas = {field: change for field, change in deltas.items() if change}
+    if school_id is None or not deltas:
+        return
+    SchoolSummary.objects.filter(school_id=school_id).update(
+        updated_at=timezone.now(), **{field: F(field) + change for field, change in deltas.items()}
+    )
+
+
+def adjust_attendance(school_id, term, attended, recorded):
+    """Add roll-call changes to the attendance figures, if they are for the summary's term."""
+    if school_id is None or not (attended or recorded):
+        return
+    SchoolSummary.objects.filter(school_id=school_id, attendance_term=term).update(
+        updated_at=timezone.now(),
+        attendance_attended=F('attendance_attended') + attended,
+        attendance_recorded=F('attendance_recorded') + recorded,
+    )
+
+
+def _contribution(model, school_id, approved):
+    """``{field: 1}`` for what one row adds to its school's summary."""
+    if school_id is None:
+        return {}
+    contribution = {}
+    if model in COUNTED:
+        contribution[COUNTED[model]] = 1
+    if model is LessonPlan and not approved:
+        contribution['pending_plans'] = 1
+    return contribution
+
+
+def _state(instance):
+    return instance.school_id, getattr(instance, 'approved', None)
+
+
+def previous_state(model, instance, update_fields=None):
+    """
+    What a row about to be updated contributed before (read with one query),
+    or ``None`` when the save is an insert or cannot change the summary.
+    """
+    if instance._state.adding or instance.pk is None:
+        return None
+    fields = ['school_id'] + (['approved'] if model is LessonPlan else [])
+    if update_fields is not None and not {'school', 'approved'} & {field.removesuffix('_id') for field in update_fields}:
+        return None
+    row = model._base_manager.filter(pk=instance.pk).values_list(*fields).first()
+    if row is None:
+        return None
+    return (row[0], row[1]) if model is LessonPlan else (row[0], None)
+
+
+def saved(model, instance, created, previous=None):
+    if created:
+        adjust(instance.school_id, **_contribution(model, *_state(instance)))
+    elif previous is not None and previous != _state(instance):
+        before, after = _contribution(model, *previous), _contribution(model, *_state(instance))
+        if previous[0] == instance.school_id:
+            adjust(instance.school_id, **{field: after.get(field, 0) - before.get(field, 0) for field in {*before, *after}})
+        else:
+            adjust(previous[0], **{field: -change for field, change in before.items()})
+            adjust(instance.school_id, **after)
+
+
+def deleted(model, instance):
+    # Queryset and cascade deletes load the rows they delete, so the instance
+    # reflects the stored school and approval.
+    adjust(instance.school_id, **{field: -change for field, change in _contribution(model, *_state(instance)).items()})
+
+
+def counts(school_id, term, using='default'):
+    """Every summary figure counted from the tables (on the primary by default)."""
+    attendance = AttendanceSummary.all_schools.using(using).filter(school_id=school_id, term=term).aggregate(
+        present=Sum('present'), late=Sum('late'), absent=Sum('absent'), excused=Sum('excused'),
+    )
+    attended = (attendance['present'] or 0) + (attendance['late'] or 0)
+    values = {
+        field: model.all_schools.using(using).filter(school_id=school_id).count() for model, field in COUNTED.items()
+    }
+    values['pending_plans'] = LessonPlan.all_schools.using(using).filter(school_id=school_id, approved=False).count()
+    values.update(
+        attendance_term=term,
+        attendance_attended=attended,
+        attendance_recorded=attended + (attendance['absent'] or 0) + (attendance['excused'] or 0),
+    )
+    return values
+
+
+def rebuild(school_id):
+    """
+    Recount the school's summary on the primary, never a replica, holding
+    the row's lock: a delta committed while counting waits for the lock and
+    is applied on top of the new counts instead of being overwritten.
+    """
+    # Created first, in its own transaction, so writers already have a row
+    # to lock and update while the counts run.
+    SchoolSummary.objects.using('default').bulk_create([SchoolSummary(school_id=school_id)], ignore_conflicts=True)
+    with transaction.atomic(using='default'):
+        summary = SchoolSummary.objects.using('default').select_for_update().get(school_id=school_id)
+        for field, value in counts(school_id, current_term()).items():
+            setattr(summary, field, value)
+        summary.save(using='default')
+    return summary
+
+
+def get(school_id):
+    """The school's SchoolSummary: one primary-key read once it exists."""
+    summary = SchoolSummary.objects.filter(school_id=school_id).first()
+    if summary is None or summary.attendance_term != current_term():
+        summary = rebuild(school_id)
+    return summary
@@ -0,0 +1,243 @@
+"""
+Delta sync for offline-first clients.
+
+A client keeps the opaque ``cursor`` from its last response and sends it
+back; the response then contains only rows whose ``updated_at`` is newer,
+plus tombstones for rows deleted since. Rows are sent as positional arrays
+under a per-type ``fields`` header to keep payloads small. The next cursor is
+the newest change in the response (or the same cursor when nothing changed),
+so an unchanged dataset produces an identical body and the view can answer
+``304 Not Modified`` from the ETag.
+
+``updated_at`` and ``deleted_at`` are stamped before their transaction
+commits, so a write can become visible after a client has already synced
+past its timestamp. Each sync therefore re-sends what changed in the
+``SYNC_OVERLAP_SECONDS`` before the cursor; clients apply rows and
+tombstones by id, so repeats are harmless.
+
+Tombstones are kept for ``SYNC_TOMBSTONE_DAYS``; a client whose cursor is
+older gets a full payload flagged ``"reset": true``.
+
+Rows can also leave a user's scope without being deleted. A row moved to
+another school gets a tombstone in its old school. Teachers and parents see
+rows through course, club and parent links, so when one of those is removed
+or repointed a ``scope`` marker is written to the school (a SyncTombstone
+that is never sent to clients), and their next sync is a reset. Staff see
+the whole school, so markers do not concern them.
+"""
+import datetime
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from . import audit, roles
+from .models import Student, Assignment, LessonPlan, Course, Club, SyncTombstone
+
+API_VERSION = 1
+
+FIELDS = {
+    'students': ('id', 'name', 'grade', 'admission_number', 'behavior_notes'),
+    'courses': ('id', 'name', 'description', 'teacher_id'),
+    'clubs': ('id', 'name', 'description'),
+    'assignments': ('id', 'course_id', 'title', 'description', 'due_date'),
+    'lesson_plans': ('id', 'title', 'objective', 'materials', 'activities', 'approved',
+                     'rejection_reason', 'submission_date'),
+}
+
+# SyncTombstone.model values for each payload type.
+TOMBSTONE_MODELS = {
+    'students': 'student',
+    'courses': 'course',
+    'clubs': 'club',
+    'assignments': 'assignment',
+    'lesson_plans': 'lessonplan',
+}
+
+STAFF_ROLES = (roles.PROPRIETOR, roles.HEAD_TEACHER, roles.VICE_ADMIN, roles.VICE_ACADEMICS)
+
+# SyncTombstone.model of the markers written when scope memberships change.
+SCOPE_CHANGE = 'scope'
+# Foreign keys that decide who else (besides school staff) sees a row.
+SCOPE_FIELDS = {
+    Course: ('teacher_id',),
+    Assignment: ('course_id',),
+    LessonPlan: ('teacher_id',),
+}
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(moment):
+    if moment is None:
+        return ''
+    # Integer arithmetic: float seconds can round across a microsecond.
+    delta = moment - EPOCH
+    return str((delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds)
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        micros = int(cursor)
+    except ValueError:
+        raise InvalidCursor(f'Invalid sync cursor "{cursor}".')
+    try:
+        return EPOCH + datetime.timedelta(microseconds=micros)
+    except OverflowError:
+        raise InvalidCursor(f'Invalid sync cursor "{cursor}".')
+
+
+def scoped_querysets(request):
+    """The rows this user may sync, keyed by payload type."""
+    school_id = request.school_id
+    if school_id is None:
+        return {}
+    if roles.primary_role(request.roles) in STAFF_ROLES:
+        return {
+            'students': Student.objects.filter(school_id=school_id),
+            'courses': Course.objects.filter(school_id=school_id),
+            'clubs': Club.objects.filter(school_id=school_id),
+            'assignments': Assignment.objects.filter(school_id=school_id),
+            'lesson_plans': LessonPlan.objects.filter(school_id=school_id),
+        }
+    if roles.TEACHER in request.roles:
+        courses = Course.objects.filter(teacher=request.user)
+        return {
+            'students': Student.objects.filter(courses__in=courses.values('id')).distinct(),
+            'courses': courses,
+            'clubs': Club.objects.filter(school_id=school_id),
+            'assignments': Assignment.objects.filter(course__in=courses.values('id')),
+            'lesson_plans': LessonPlan.objects.filter(teacher=request.user),
+        }
+    if roles.PARENT in request.roles and request.parent_profile is not None:
+        children = request.parent_profile.students.values('id')
+        courses = Course.objects.filter(student__in=children).values('id')
+        return {
+            'students': Student.objects.filter(id__in=children),
+            'courses': Course.objects.filter(id__in=courses),
+            'clubs': Club.objects.filter(student__in=children).distinct(),
+            'assignments': Assignment.objects.filter(course__in=courses),
+        }
+    return {}
+
+
+def _enrollments(through, target, student_ids):
+    links = {}
+    rows = through.objects.filter(student_id__in=student_ids).values_list('student_id', f'{target}_id')
+    for student_id, target_id in rows:
+        links.setdefault(student_id, []).append(target_id)
+    return links
+
+
+def overlap():
+    return datetime.timedelta(seconds=getattr(settings, 'SYNC_OVERLAP_SECONDS', 60))
+
+
+def retention_start():
+    return timezone.now() - datetime.timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_DAYS', 90))
+
+
+def changes_since(request, cursor=None):
+    """Build the sync payload for ``request.user`` after ``cursor``."""
+    since = decode_cursor(cursor)
+    payload = {'v': API_VERSION, 'changes': {}, 'deleted': {}}
+    if since is not None and (since < retention_start() or _scope_changed(request, since)):
+        # Tombstones this old are pruned, or rows may have left the user's
+        # scope without one: the client must replace its data.
+        since = None
+        payload['reset'] = True
+    querysets = scoped_querysets(request)
+    newest = since
+    # Also look back over writes that may have committed after the last sync.
+    window = since - overlap() if since is not None else None
+
+    for name, queryset in querysets.items():
+        if window is not None:
+            queryset = queryset.filter(updated_at__gt=window)
+        fields = FIELDS[name]
+        rows = list(queryset.order_by('updated_at', 'id').values_list(*fields, 'updated_at'))
+        if not rows:
+            continue
+        newest = max(newest or rows[-1][-1], rows[-1][-1])
+        entry = {'fields': list(fields), 'rows': [list(row[:-1]) for row in rows]}
+        if name == 'students':
+            student_ids = [row[0] for row in rows]
+            courses = _enrollments(Student.courses.through, 'course', student_ids)
+            clubs = _enrollments(Student.clubs.through, 'club', student_ids)
+            entry['fields'] += ['course_ids', 'club_ids']
+            for row in entry['rows']:
+                row += [courses.get(row[0], []), clubs.get(row[0], [])]
+        payload['changes'][name] = entry
+
+    if since is not None and request.school_id is not None:
+        models = {TOMBSTONE_MODELS[name]: name for name in querysets}
+        tombstones = SyncTombstone.objects.filter(
+            school_id=request.school_id, model__in=list(models), deleted_at__gt=window
+        )
+        latest = tombstones.aggregate(latest=Max('deleted_at'))['latest']
+        if latest is not None:
+            newest = max(newest, latest)
+            for model, object_id in tombstones.values_list('model', 'object_id'):
+                payload['deleted'].setdefault(models[model], []).append(object_id)
+
+    payload['cursor'] = encode_cursor(newest)
+    return payload
+
+
+def _scope_changed(request, since):
+    if request.school_id is None or roles.primary_role(request.roles) in STAFF_ROLES:
+        return False
+    return SyncTombstone.objects.filter(
+        school_id=request.school_id, model=SCOPE_CHANGE, deleted_at__gt=since - overlap()
+    ).exists()
+
+
+def record_tombstone(instance, school_id=None):
+    SyncTombstone.objects.create(
+        school_id=instance.school_id if school_id is None else school_id,
+        model=instance._meta.model_name,
+        object_id=instance.pk,
+    )
+
+
+def record_scope_change(school_id, object_id=0):
+    """Make the school's teachers and parents resync from scratch."""
+    if school_id is not None:
+        SyncTombstone.objects.create(school_id=school_id, model=SCOPE_CHANGE, object_id=object_id)
+
+
+def previous_scope(model, instance, update_fields=None):
+    """The school and SCOPE_FIELDS values ``instance`` was loaded with."""
+    loaded = audit.loaded(instance)
+    names = ('school_id', *SCOPE_FIELDS.get(model, ()))
+    if update_fields is not None:
+        names = [name for name in names if name.removesuffix('_id') in update_fields or name in update_fields]
+    return {name: loaded[name] for name in names if name in loaded}
+
+
+def saved(model, instance, previous):
+    """Record what an update of a synced row took out of someone's scope."""
+    old_school = previous.get('school_id', instance.school_id)
+    if old_school != instance.school_id and old_school is not None:
+        record_tombstone(instance, school_id=old_school)
+    if any(previous[name] != getattr(instance, name) for name in SCOPE_FIELDS.get(model, ()) if name in previous):
+        record_scope_change(old_school, instance.pk)
+
+
+def record_tombstones(model, school_id, object_ids):
+    """Tombstones for rows deleted in bulk, without delete signals."""
+    SyncTombstone.objects.bulk_create(
+        [SyncTombstone(school_id=school_id, model=model._meta.model_name, object_id=pk) for pk in object_ids],
+        batch_size=1000,
+    )
+
+
+def prune_tombstones():
+    """Delete tombstones past the retention window; returns the number removed."""
+    deleted, _ = SyncTombstone.objects.filter(deleted_at__lt=retention_start()).delete()
+    return deleted
@@ -0,0 +1,218 @@
+"""
+Seeded synthetic schools for benchmarks and query-budget tests.
+
+Everything is written with ``bulk_create`` (including ManyToMany through
+rows), so a school with thousands of students builds in seconds. The same
+seed always produces the same data.
+"""
+import datetime
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+
+from . import attendance, roles, search
+from .models import (
+    School, TeacherProfile, ParentProfile, Student, LessonPlan, Club, Course,
+    Assignment, GradeRecord, AttendanceRecord,
+)
+from .terms import current_term, term_for_date
+
+SYNTHETIC_PASSWORD = 'synthetic-pass'
+
+FIRST_NAMES = (
+    'Adaeze', 'Chinedu', 'Fatima', 'Ibrahim', 'Kemi', 'Musa', 'Ngozi', 'Oluwaseun',
+    'Tunde', 'Zainab', 'Emeka', 'Halima', 'Segun', 'Amaka', 'Yusuf', 'Titi',
+)
+LAST_NAMES = (
+    'Adeyemi', 'Okafor', 'Bello', 'Eze', 'Abubakar', 'Ogunleye', 'Nwosu', 'Danjuma',
+    'Afolabi', 'Ibe', 'Lawal', 'Obi',
+)
+SUBJECTS = (
+    'Mathematics', 'English Language', 'Basic Science', 'Social Studies', 'Civic Education',
+    'Agricultural Science', 'Computer Studies', 'French', 'Yoruba', 'Igbo', 'Hausa',
+    'Physical Education', 'Fine Art', 'Music', 'Home Economics', 'Business Studies',
+)
+CLUBS = ('Chess', 'Debate', 'Robotics', 'Drama', 'Football', 'Press', 'Red Cross', 'JETS')
+GRADES = ('JSS1', 'JSS2', 'JSS3', 'SS1', 'SS2', 'SS3')
+
+
+class SyntheticConfig:
+    def __init__(self, schools=1, students=500, teachers=20, courses_per_teacher=2,
+                 clubs=6, courses_per_student=6, assignments_per_course=10,
+                 lesson_plans_per_teacher=15, attendance_days=10, seed=42):
+        self.schools = schools
+        self.students = students
+        self.teachers = teachers
+        self.courses_per_teacher = courses_per_teacher
+        self.clubs = clubs
+        self.courses_per_student = courses_per_student
+        self.assignments_per_course = assignments_per_course
+        self.lesson_plans_per_teacher = lesson_plans_per_teacher
+        self.attendance_days = attendance_days
+        self.seed = seed
+
+
+def _person(rng):
+    return f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+
+
+def _create_users(prefix, count, group, password):
+    users = User.objects.bulk_create(
+        [User(username=f'{prefix}-{i}', password=password) for i in range(count)],
+        batch_size=1000,
+    )
+    User.groups.through.objects.bulk_create(
+        [User.groups.through(user_id=user.pk, group_id=group.pk) for user in users],
+        batch_size=1000,
+    )
+    return users
+
+
+def build_school(index, config, rng, groups, password):
+    """Create one synthetic school and return it."""
+    school = School.objects.create(name=f'Synthetic School {index}', proprietor=_person(rng))
+    prefix = f'synth{school.pk}'
+
+    staff = _create_users(f'{prefix}-proprietor', 1, groups[roles.PROPRIETOR], password)
+    staff += _create_users(f'{prefix}-viceadmin', 1, groups[roles.VICE_ADMIN], password)
+    staff += _create_users(f'{prefix}-viceacademics', 1, groups[roles.VICE_ACADEMICS], password)
+    staff += _create_users(f'{prefix}-head', 1, groups[roles.HEAD_TEACHER], password)
+    teachers = _create_users(f'{prefix}-teacher', config.teachers, groups[roles.TEACHER], password)
+    parent_count = max(1, config.students * 2 // 3)
+    parents = _create_users(f'{prefix}-parent', parent_count, groups[roles.PARENT], password)
+
+    # Staff belong to the school through a TeacherProfile, as registration does.
+    TeacherProfile.objects.bulk_create(
+        [TeacherProfile(user=user, school=school) for user in staff + teachers],
+        batch_size=1000,
+    )
+    parent_profiles = ParentProfile.objects.bulk_create(
+        [ParentProfile(user=user, school=school) for user in parents], batch_size=1000
+    )
+
+    courses = Course.objects.bulk_create([
+        Course(
+            school=school, teacher=teacher, description='Synthetic course',
+            name=f'{SUBJECTS[(t * config.courses_per_teacher + c) % len(SUBJECTS)]} {t * config.courses_per_teacher + c}',
+        )
+        for t, teacher in enumerate(teachers) for c in range(config.courses_per_teacher)
+    ])
+    clubs = Club.objects.bulk_create([
+        Club(school=school, name=f'{CLUBS[c % len(CLUBS)]} {c}', description='Synthetic club')
+        for c in range(config.clubs)
+    ])
+
+    students = Student.objects.bulk_create(
+        [
+            Student(
+                school=school, admission_number=f'{prefix}-{i:06d}', name=_person(rng),
+                grade=rng.choice(GRADES),
+            )
+            for i in range(config.students)
+        ],
+        batch_size=1000,
+    )
+
+    per_student = min(config.courses_per_student, len(courses))
+    enrollments = {student.pk: rng.sample(courses, per_student) for student in students}
+    Student.courses.through.objects.bulk_create(
+        [
+            Student.courses.through(student_id=student_id, course_id=course.pk)
+            for student_id, enrolled in enrollments.items() for course in enrolled
+        ],
+        batch_size=5000,
+    )
+    Student.clubs.through.objects.bulk_create(
+        [
+            Student.clubs.through(student_id=student.pk, club_id=club.pk)
+            for student in students for club in rng.sample(clubs, min(2, len(clubs)))
+        ],
+        batch_size=5000,
+    )
+    # Every student has one parent; some parents have siblings.
+    ParentProfile.students.through.objects.bulk_create(
+        [
+            ParentProfile.students.through(
+                parentprofile_id=parent_profiles[i % len(parent_profiles)].pk, student_id=student.pk
+            )
+            for i, student in enumerate(students)
+        ],
+        batch_size=5000,
+    )
+
+    today = datetime.date.today()
+    Assignment.objects.bulk_create(
+        [
+            Assignment(
+                course=course, school=school, title=f'{course.name} assignment {a}',
+                description='Synthetic assignment', due_date=today + datetime.timedelta(days=a - 5),
+            )
+            for course in courses for a in range(config.assignments_per_course)
+        ],
+        batch_size=5000,
+    )
+    LessonPlan.objects.bulk_create(
+        [
+            LessonPlan(
+                teacher=teacher, school=school, title=f'Week {p} plan', objective='Synthetic objective',
+                materials='Synthetic materials', activities='Synthetic activities',
+                approved=rng.random() < 0.6,
+            )
+            for teacher in teachers for p in range(config.lesson_plans_per_teacher)
+        ],
+        batch_size=5000,
+    )
+
+    term = current_term()
+    GradeRecord.objects.bulk_create(
+        [
+            GradeRecord(
+                school=school, student_id=student_id, course=course, term=term,
+                assessment=assessment, score=rng.randint(20, 100),
+            )
+            for student_id, enrolled in enrollments.items()
+            for course in enrolled for assessment in ('Test 1', 'Exam')
+        ],
+        batch_size=5000,
+    )
+
+    # Attendance for the most recent school days of the current term.
+    days = [today - datetime.timedelta(days=d) for d in range(config.attendance_days * 2)]
+    days = [day for day in days if day.weekday() < 5 and term_for_date(day) == term]
+    AttendanceRecord.objects.bulk_create(
+        [
+            AttendanceRecord(
+                school=school, student=student, date=day,
+                status=rng.choices(attendance.STATUSES, weights=(85, 8, 5, 2))[0],
+            )
+            for day in days[:config.attendance_days] for student in students
+        ],
+        batch_size=5000,
+    )
+    attendance.rebuild_summaries(school.pk, term)
+    search.rebuild(school.pk)
+    return school
+
+
+def generate(config):
+    """Build ``config.schools`` synthetic schools and return them."""
+    rng = random.Random(config.seed)
+    password = make_password(SYNTHETIC_PASSWORD)
+    groups = {name: Group.objects.get_or_create(name=name)[0] for name in roles.ROLES}
+    schools = []
+    for index in range(config.schools):
+        with transaction.atomic():
+            schools.append(build_school(index + 1, config, rng, groups, password))
+    return schools
+
+
+def role_users(school):
+    """One ``{role: user}`` sample from a synthetic school, for benchmarks."""
+    users = {}
+    for role in roles.ROLES:
+        user = User.objects.filter(groups__name=role, username__startswith=f'synth{school.pk}-').order_by('pk').first()
+        if user is not None:
+            users[role] = user
+    return users
@@ -0,0 +1,103 @@
+"""
+Background tasks run by ``manage.py run_worker`` (see school/jobs.py).
+
+Events enqueue one small job each (inside the request's transaction); the
+job works out who to tell and fans out ``notify_users`` jobs of at most
+``NOTIFY_CHUNK`` recipients, which workers run in batches.
+"""
+from django.contrib.auth.models import User
+
+from . import jobs, roles
+from .models import LessonPlan, Assignment, Notification, ParentProfile, RolloverRun
+
+NOTIFY_CHUNK = 500
+
+
+def notify(user_ids, school_id, message):
+    """Queue notifications for ``user_ids`` in chunked jobs."""
+    user_ids = sorted(set(user_ids))
+    jobs.enqueue_many('notify_users', [
+        {'user_ids': user_ids[start:start + NOTIFY_CHUNK], 'school_id': school_id, 'message': message[:255]}
+        for start in range(0, len(user_ids), NOTIFY_CHUNK)
+    ])
+
+
+@jobs.task(batch_size=20)
+def notify_users(payloads):
+    Notification.objects.bulk_create(
+        [
+            Notification(user_id=user_id, school_id=payload['school_id'], message=payload['message'])
+            for payload in payloads
+            for user_id in payload['user_ids']
+        ],
+        batch_size=1000,
+    )
+
+
+@jobs.task()
+def lesson_plans_reviewed(payload):
+    approved = payload['approved']
+    verb = 'approved' if approved else 'rejected'
+    plans = LessonPlan.objects.filter(id__in=payload['plan_ids']).values_list('teacher_id', 'school_id', 'title')
+    # One recipient per plan, so there is nothing to fan out.
+    Notification.objects.bulk_create([
+        Notification(user_id=teacher_id, school_id=school_id, message=f'Your lesson plan "{title}" was {verb}.'[:255])
+        for teacher_id, school_id, title in plans
+    ])
+
+
+@jobs.task()
+def lesson_plan_submitted(payload):
+    plan = LessonPlan.objects.filter(pk=payload['plan_id']).values('school_id', 'title', 'teacher__username').first()
+    if plan is None or plan['school_id'] is None:
+        return
+    reviewers = User.objects.filter(
+        groups__name__in=(roles.HEAD_TEACHER, roles.VICE_ACADEMICS),
+        teacherprofile__school_id=plan['school_id'],
+    ).values_list('id', flat=True)
+    notify(reviewers, plan['school_id'],
+           f'{plan["teacher__username"]} submitted the lesson plan "{plan["title"]}" for approval.')
+
+
+@jobs.task()
+def assignment_posted(payload):
+    assignment = Assignment.objects.filter(pk=payload['assignment_id']).values(
+        'course_id', 'course__name', 'school_id', 'title', 'due_date'
+    ).first()
+    if assignment is None:
+        return
+    parents = ParentProfile.objects.filter(
+        students__courses=assignment['course_id']
+    ).values_list('user_id', flat=True)
+    notify(parents, assignment['school_id'],
+           f'New {assignment["course__name"]} assignment "{assignment["title"]}" is due {assignment["due_date"]:%d %b %Y}.')
+
+
+@jobs.task(max_attempts=1, concurrency=2)
+def generate_timetable(payload):
+    # Imported here so web processes that never solve do not load the solver.
+    from . import timetable
+
+    try:
+        solution = timetable.generate(payload['school_id'], seed=payload.get('seed', 0))
+    except timetable.TimetableError as error:
+        message = f'The timetable could not be generated: {error}'
+    else:
+        lessons = sum(len(placed) for placed in solution.placements.values())
+        message = f'The new timetable is ready: {lessons} lessons placed in {solution.seconds:.1f}s.'
+    Notification.objects.create(user_id=payload['user_id'], school_id=payload['school_id'], message=message[:255])
+
+
+@jobs.task(concurrency=1)
+def rollover_term(payload):
+    # One chunk per job (each job is one transaction), then queue the next,
+    # so the worker never holds the tables for long and a retry resumes.
+    from . import rollover
+
+    run = rollover.advance(RolloverRun.objects.get(pk=payload['run_id']))
+    if run.finished_at is None:
+        jobs.enqueue('rollover_term', payload)
+    elif run.started_by_id is not None:
+        Notification.objects.create(
+            user_id=run.started_by_id, school_id=run.school_id, message=f'The rollover of {run.term} has finished.',
+        )
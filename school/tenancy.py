@@ -0,0 +1,66 @@
+"""
+Tenant scoping: every per-school model's default manager only sees the
+school bound to the current request.
+
+TenantMiddleware binds ``request.school_id`` (resolved by RoleMiddleware) for
+the rest of the request, in a context variable, so it also reaches the
+threads of school/parallel.py. While a school is bound, ``Model.objects``
+of the models using ``SchoolScopedManager`` adds ``school_id = <school>`` to
+every query, including related managers, prefetches, ModelChoiceFields and
+the admin. Views still filter by school explicitly; the scope is the safety
+net for the queries that forget to.
+
+Nothing is bound outside requests (management commands, jobs, migrations,
+tests' own queries), for anonymous requests, or for superusers, who
+administer every school. Signed-in users without a school get NO_SCHOOL
+bound and see no school's rows: the scope fails closed.
+``Model.all_schools`` and ``unscoped()`` read across schools on purpose. Deletion cascades and foreign key access use Django's
+base manager and are never scoped.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.db import models
+
+# Never a primary key: nothing matches it.
+NO_SCHOOL = 0
+
+_current_school = contextvars.ContextVar('current_school', default=None)
+
+
+def current_school_id():
+    """The school bound to the current request (maybe NO_SCHOOL), or ``None``."""
+    return _current_school.get()
+
+
+@contextmanager
+def scoped(school_id):
+    token = _current_school.set(school_id)
+    try:
+        yield
+    finally:
+        _current_school.reset(token)
+
+
+def unscoped():
+    return scoped(None)
+
+
+class SchoolScopedManager(models.Manager):
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        school_id = _current_school.get()
+        if school_id == NO_SCHOOL:
+            return queryset.none()
+        if school_id is not None:
+            queryset = queryset.filter(school_id=school_id)
+        return queryset
+
+
+class SchoolScopedModel(models.Model):
+    """Base of the models that belong to a school (through their ``school`` field)."""
+    objects = SchoolScopedManager()
+    all_schools = models.Manager()
+
+    class Meta:
+        abstract = True
@@ -0,0 +1,39 @@
+"""
+Academic term labels.
+
+Nigerian schools run three terms a year starting in September, so a term is
+derived from a date rather than stored: September-December is the first
+term, January-April the second and May-August the third, e.g.
+"2025/2026 First Term".
+"""
+import datetime
+
+from django.utils import timezone
+
+TERM_NAMES = ('First Term', 'Second Term', 'Third Term')
+
+
+def term_for_date(date):
+    if date.month >= 9:
+        start_year, index = date.year, 0
+    elif date.month >= 5:
+        start_year, index = date.year - 1, 2
+    else:
+        start_year, index = date.year - 1, 1
+    return f'{start_year}/{start_year + 1} {TERM_NAMES[index]}'
+
+
+def current_term():
+    return term_for_date(timezone.localdate())
+
+
+def term_bounds(term):
+    """Return the first and last date covered by a term label."""
+    years, name = term.split(' ', 1)
+    start_year = int(years.split('/')[0])
+    index = TERM_NAMES.index(name)
+    if index == 0:
+        return datetime.date(start_year, 9, 1), datetime.date(start_year, 12, 31)
+    if index == 1:
+        return datetime.date(start_year + 1, 1, 1), datetime.date(start_year + 1, 4, 30)
+    return datetime.date(start_year + 1, 5, 1), datetime.date(start_year + 1, 8, 31)
@@ -1,3 +1,1260 @@
-from django.test import TestCase
+import csv
+import datetime
+import gzip
+import importlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+from array import array
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.contrib.sessions.models import Session
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, modify_settings, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    admin as school_admin, analytics, approvals, assets, attendance, audit, benchmarks, caching, db_router, directory,
+    gradebook, jobs, parallel, rollover, roles, search, sessions, summaries, sync, tenancy, timetable,
+)
+from .approvals import review_plans
+from .forms import CustomUserCreationForm
+from .models import (
+    School, TeacherProfile, ParentProfile, Student, LessonPlan, Course,
+    Assignment, AttendanceRecord, AttendanceSummary, Club, GradeRecord, Job, Notification, Room, Period, SchoolSummary,
+    TimetableEntry, ArchivedAssignment, ArchivedAttendanceRecord, ArchivedLessonPlan, AuditEvent, RolloverRun,
+    SyncTombstone,
+)
+from .roster import RosterError, import_roster
+from .synthetic import SyntheticConfig, generate, role_users
+from .terms import term_for_date
+
+
+def make_user(username, role, school=None, profile=None):
+    user = User.objects.create_user(username, password='pass')
+    user.groups.add(Group.objects.get_or_create(name=role)[0])
+    if profile is not None:
+        profile.objects.create(user=user, school=school)
+    return user
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        config = SyntheticConfig(students=60, teachers=4, assignments_per_course=5,
+                                 lesson_plans_per_teacher=5, attendance_days=3)
+        cls.school = generate(config)[0]
+
+    def test_every_url_as_every_role_within_budget(self):
+        results = benchmarks.run(self.school, role_users(self.school), iterations=1)
+        self.assertEqual(len(results), len(benchmarks.url_cases(self.school)) * (len(roles.ROLES) + 1))
+        for result in results:
+            with self.subTest(url=result.url_name, role=result.role):
+                self.assertLess(result.status_code, 400)
+                self.assertLessEqual(result.queries, result.budget)
+
+
+class ParentViewTests(TestCase):
+    def setUp(self):
+        self.school = School.objects.create(name='Test School')
+        teacher = make_user('teacher', roles.TEACHER, self.school, TeacherProfile)
+        self.parent = make_user('parent', roles.PARENT, self.school, ParentProfile)
+        course = Course.objects.create(school=self.school, name='Maths', teacher=teacher, description='')
+        profile = self.parent.parentprofile
+        for name in ('Ada', 'Obi'):
+            student = Student.objects.create(school=self.school, name=name, grade='JSS1')
+            student.courses.add(course)
+            profile.students.add(student)
+        for i in range(25):
+            Assignment.objects.create(course=course, school=self.school, title=f'A{i}',
+                                      description='', due_date=datetime.date(2025, 1, 1))
+
+    def test_siblings_sharing_a_course_get_distinct_paginated_assignments(self):
+        self.client.force_login(self.parent)
+        response = self.client.get(reverse('parent_view'))
+        page = response.context['assignments']
+        self.assertEqual(page.paginator.count, 25)
+        self.assertEqual(len({a.pk for a in page}), len(page))
+        for student in response.context['students']:
+            self.assertEqual(len(student.assignment_list), len(page))
+
+        response = self.client.get(reverse('parent_dashboard'))
+        self.assertEqual(len(response.context['recent_assignments']), 5)
+
+    def test_queries_do_not_grow_with_children_or_assignments(self):
+        self.client.force_login(self.parent)
+        self.client.get(reverse('dashboard'))
+        counts = []
+        for extra in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse('parent_view'))
+                self.client.get(reverse('parent_dashboard'))
+            counts.append(len(queries))
+            course = Course.objects.create(school=self.school, name=f'Art {extra}',
+                                           teacher=User.objects.get(username='teacher'), description='')
+            student = Student.objects.create(school=self.school, name=f'Child {extra}', grade='JSS1')
+            student.courses.add(course, *Course.objects.filter(name='Maths'))
+            student.clubs.add(Club.objects.create(school=self.school, name=f'Club {extra}', description=''))
+            self.parent.parentprofile.students.add(student)
+            Assignment.objects.create(course=course, school=self.school, title='Extra',
+                                      description='', due_date=datetime.date(2025, 1, 2))
+        self.assertEqual(counts[0], counts[1])
+
+
+class RoleCacheTests(TestCase):
+    def test_group_change_invalidates_cached_roles(self):
+        school = School.objects.create(name='Test School')
+        user = make_user('teacher', roles.TEACHER, school, TeacherProfile)
+        self.client.force_login(user)
+        self.assertRedirects(self.client.get(reverse('dashboard')), reverse('teacher_dashboard'))
+        self.assertRedirects(self.client.get(reverse('headteacher_dashboard')), reverse('dashboard'),
+                             fetch_redirect_response=False)
+
+        Group.objects.get_or_create(name=roles.HEAD_TEACHER)[0].user_set.add(user)
+        self.assertEqual(self.client.get(reverse('headteacher_dashboard')).status_code, 200)
+
+    def test_role_required_reads_roles_once_per_session(self):
+        school = School.objects.create(name='Test School')
+        head = make_user('head', roles.HEAD_TEACHER, school, TeacherProfile)
+        self.assertRedirects(self.client.get(reverse('headteacher_dashboard')),
+                             f"{reverse('login')}?next={reverse('headteacher_dashboard')}", fetch_redirect_response=False)
+
+        self.client.force_login(head)
+        self.client.get(reverse('dashboard'))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse('headteacher_dashboard')).status_code, 200)
+            response = self.client.get(reverse('parent_dashboard'))
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertFalse([query for query in queries if 'auth_group' in query['sql']])
+
+    def test_role_generation_is_shared_by_every_process(self):
+        user = make_user('teacher', roles.TEACHER, School.objects.create(name='Test School'), TeacherProfile)
+        before = roles.get_version(user.pk)
+        with override_settings(ROLE_VERSION_CACHE_SECONDS=300):
+            roles.get_version(user.pk)
+            with self.assertNumQueries(0):
+                roles.get_version(user.pk)
+            with self.captureOnCommitCallbacks(execute=True):
+                Group.objects.get_or_create(name=roles.HEAD_TEACHER)[0].user_set.add(user)
+            self.assertEqual(roles.get_version(user.pk), before + 1)
+        # Another worker, with nothing cached, reads the same generation.
+        cache.clear()
+        self.assertEqual(roles.get_version(user.pk), before + 1)
+
+
+class RosterImportTests(TestCase):
+    def setUp(self):
+        self.school = School.objects.create(name='Test School')
+        teacher = make_user('teacher', roles.TEACHER, self.school, TeacherProfile)
+        Course.objects.create(school=self.school, name='Maths', teacher=teacher, description='')
+        Course.objects.create(school=self.school, name='English', teacher=teacher, description='')
+
+    def run_import(self, text, **kwargs):
+        return import_roster(io.BytesIO(text.encode()), 'roster.csv', self.school, **kwargs)
+
+    def test_upsert_dry_run_and_row_errors(self):
+        roster = 'admission_number,name,grade,courses\nA1,Ada,JSS1,Maths;English\nA2,,JSS1,\nA3,Obi,JSS2,Art\n'
+        report = self.run_import(roster, dry_run=True)
+        self.assertEqual((report.created, report.error_count), (1, 2))
+        self.assertFalse(Student.objects.exists())
+
+        self.run_import(roster)
+        report = self.run_import('admission_number,name,grade,courses\nA1,Ada N.,JSS2,english\n')
+        self.assertEqual((report.created, report.updated), (0, 1))
+        student = Student.objects.get()
+        self.assertEqual((student.name, student.grade), ('Ada N.', 'JSS2'))
+        self.assertEqual(list(student.courses.values_list('name', flat=True)), ['English'])
+
+    def test_columns_come_from_the_header(self):
+        with self.assertRaisesMessage(RosterError, 'Missing required column(s): grade'):
+            self.run_import('admission_number,name\n')
+        self.assertEqual(self.run_import('admission_number,name,grade\n').rows, 0)
+        # A short first row is a row error, not a missing column.
+        report = self.run_import('admission_number,name,grade\nA1,Ada\nA2,Obi,JSS1\n')
+        self.assertEqual((report.created, report.errors), (1, [(2, '"grade" is empty.')]))
+
+    def test_command_imports_xlsx_in_batches(self):
+        from openpyxl import Workbook
+
+        Club.objects.create(school=self.school, name='Chess', description='')
+        workbook = Workbook()
+        workbook.active.append(['Admission Number', 'Name', 'Grade', 'Courses', 'Clubs'])
+        for i in range(5):
+            workbook.active.append([f'X{i}', f'Student {i}', 'SS1', 'Maths; English', 'Chess'])
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'roster.xlsx')
+        workbook.save(path)
+
+        out = io.StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('import_roster', path, school=self.school.pk, stdout=out)
+        self.assertIn('5 rows, 5 created, 0 updated, 0 errors', out.getvalue())
+        # One batch: a single insert into the students and into each through table.
+        for table in ('"school_student"', '"school_student_courses"', '"school_student_clubs"'):
+            inserts = [query for query in queries if query['sql'].startswith('INSERT') and table in query['sql'].split('(')[0]]
+            self.assertEqual(len(inserts), 1, table)
+        self.assertEqual(Student.courses.through.objects.count(), 10)
+        self.assertEqual(Student.clubs.through.objects.filter(club__name='Chess').count(), 5)
+
+    def test_upload_view(self):
+        head = make_user('head', roles.HEAD_TEACHER, self.school, TeacherProfile)
+        self.client.force_login(head)
+        upload = SimpleUploadedFile('roster.csv', b'admission_number,name,grade\nB1,Bola,SS1\n')
+        response = self.client.post(reverse('import_students'), {'roster': upload})
+        self.assertEqual(response.context['report'].created, 1)
+        self.assertTrue(Student.objects.filter(admission_number='B1', school=self.school).exists())
+
+
+class AttendanceTests(TestCase):
+    def test_roll_call_upserts_and_keeps_summary_in_step(self):
+        school = School.objects.create(name='Test School')
+        teacher = make_user('teacher', roles.TEACHER, school, TeacherProfile)
+        course = Course.objects.create(school=school, name='Maths', teacher=teacher, description='')
+        students = [Student.objects.create(school=school, name=f'S{i}', grade='JSS1') for i in range(3)]
+        for student in students:
+            student.courses.add(course)
+        day = datetime.date(2025, 10, 6)
+
+        self.client.force_login(teacher)
+        data = {'date': day.isoformat()}
+        data.update({f'status_{student.pk}': 'present' for student in students})
+        data[f'status_{students[0].pk}'] = 'absent'
+        self.client.post(reverse('roll_call', args=[course.pk]), data)
+        data[f'status_{students[0].pk}'] = 'late'
+        self.client.post(reverse('roll_call', args=[course.pk]), data)
+
+        summary = AttendanceSummary.objects.get(student=students[0], term=term_for_date(day))
+        self.assertEqual((summary.present, summary.absent, summary.late), (0, 0, 1))
+        self.assertEqual(attendance.school_attendance_rate(school.pk, term_for_date(day)), 100)
+
+    def test_roll_call_cost_does_not_grow_with_class_size(self):
+        school = School.objects.create(name='Test School')
+        day = datetime.date(2025, 10, 6)
+        counts = []
+        for size in (3, 30):
+            students = Student.objects.bulk_create([Student(school=school, name=f'S{i}', grade='JSS1') for i in range(size)])
+            statuses = {student.pk: 'present' for student in students}
+            with CaptureQueriesContext(connection) as queries:
+                attendance.record_roll_call(school.pk, day, statuses)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(AttendanceRecord.objects.filter(date=day).count(), 33)
+        with self.assertRaisesMessage(ValueError, 'Unknown attendance status: sick'):
+            attendance.record_roll_call(school.pk, day, {students[0].pk: 'sick'})
+
+
+class ApprovalQueueTests(TestCase):
+    def setUp(self):
+        self.school = School.objects.create(name='Test School')
+        self.head = make_user('head', roles.HEAD_TEACHER, self.school, TeacherProfile)
+        teacher = make_user('teacher', roles.TEACHER, self.school, TeacherProfile)
+        self.plans = LessonPlan.objects.bulk_create([
+            LessonPlan(teacher=teacher, school=self.school, title=f'Plan {i}',
+                       objective='', materials='', activities='')
+            for i in range(60)
+        ])
+        self.client.force_login(self.head)
+
+    def test_keyset_pages_cover_queue_once(self):
+        seen, params = [], {}
+        while True:
+            response = self.client.get(reverse('approve_lesson_plan'), params)
+            seen += [plan.pk for plan in response.context['lesson_plans']]
+            if not response.context['next_cursor']:
+                break
+            params = {'after': response.context['next_cursor']}
+        self.assertEqual(sorted(seen), sorted(plan.pk for plan in self.plans))
+
+    def test_queue_pages_without_counting(self):
+        self.client.get(reverse('approve_lesson_plan'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('approve_lesson_plan'), {'after': 'not-a-cursor'})
+        self.assertEqual(len(response.context['lesson_plans']), approvals.PAGE_SIZE)
+        self.assertTrue(response.context['next_cursor'])
+        self.assertFalse([query for query in queries if 'COUNT(' in query['sql']])
+        newest = LessonPlan.objects.order_by('-submission_date', '-id').first()
+        self.assertEqual(response.context['lesson_plans'][0].pk, newest.pk)
+
+    def test_bulk_approve(self):
+        ids = [plan.pk for plan in self.plans[:40]]
+        LessonPlan.objects.filter(pk__in=ids[:10]).update(approved=True)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('approve_lesson_plan'), {'plan_ids': ids, 'action': 'approve'})
+        updates = [query for query in queries if query['sql'].startswith('UPDATE "school_lessonplan"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(LessonPlan.objects.filter(approved=True).count(), 40)
+
+    def test_only_changed_plans_are_notified(self):
+        ids = [plan.pk for plan in self.plans[:3]]
+        LessonPlan.objects.filter(pk=ids[0]).update(approved=True)
+        self.client.post(reverse('approve_lesson_plan'), {'plan_ids': ids, 'action': 'approve'})
+        self.assertEqual(sorted(Job.objects.get(task='lesson_plans_reviewed').payload['plan_ids']), ids[1:])
+
+    def test_unchanged_review_writes_nothing(self):
+        ids = [plan.pk for plan in self.plans[:3]]
+        self.assertEqual(review_plans(self.school.pk, ids, True), 3)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(review_plans(self.school.pk, ids, True), 0)
+        self.assertEqual([query['sql'].split()[0] for query in queries if 'SAVEPOINT' not in query['sql']], ['SELECT'])
+        self.assertEqual(Job.objects.filter(task='lesson_plans_reviewed').count(), 1)
+
+    def test_single_review_takes_the_bulk_path(self):
+        plan = self.plans[0]
+        summaries.rebuild(self.school.pk)
+        # Audit events are written after commit, which a TestCase never reaches.
+        with mock.patch.object(audit, 'add', wraps=audit.add) as add:
+            response = self.client.post(reverse('approve_lesson_plan'),
+                                        {'plan_id': plan.pk, 'approved': 'True', 'rejection_reason': ''})
+        self.assertRedirects(response, reverse('approve_lesson_plan'), fetch_redirect_response=False)
+        self.assertEqual(SchoolSummary.objects.get(school=self.school).pending_plans, 59)
+        self.assertEqual([event.changes for event in add.call_args.args[0]], [{'approved': [False, True]}])
+        self.assertEqual(Job.objects.get(task='lesson_plans_reviewed').payload, {'plan_ids': [plan.pk], 'approved': True})
+
+
+class GradebookTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = generate(SyntheticConfig(students=30, teachers=3, attendance_days=0))[0]
+
+    def test_class_averages_match_raw_scores(self):
+        term = gradebook.terms(self.school.pk)[0]
+        with self.assertNumQueries(1):
+            averages = list(gradebook.class_averages(self.school.pk, term))
+        course = Course.objects.get(pk=averages[0]['course_id'])
+        scores = list(course.grade_records.filter(term=term).values_list('score', flat=True))
+        self.assertAlmostEqual(float(averages[0]['average']), float(sum(scores) / len(scores)), places=2)
+
+    def test_report_cards_are_one_aggregate_query(self):
+        student_ids = list(Student.objects.filter(school=self.school).values_list('id', flat=True)[:5])
+        term = gradebook.terms(self.school.pk)[0]
+        with self.assertNumQueries(1):
+            cards = list(gradebook.report_cards(student_ids, term))
+        self.assertEqual({card['student_id'] for card in cards}, set(student_ids))
+        record = GradeRecord.objects.filter(student_id=cards[0]['student_id'], term=term,
+                                            course__name=cards[0]['course__name'])
+        self.assertEqual(cards[0]['assessments'], record.count())
+
+    def test_legacy_grade_text_parsing(self):
+        legacy = importlib.import_module('school.migrations.0007_import_legacy_grades')
+        text = 'Mathematics: 78, English = 64.5; Basic Science - 80%\nArt: A\nMusic: 140'
+        self.assertEqual(list(legacy.parse_grades(text)), [
+            ('mathematics', Decimal('78')), ('english', Decimal('64.5')), ('basic science', Decimal('80')),
+        ])
+
+
+
+@override_settings(DASHBOARD_CACHE_SECONDS=3600)
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        # Versions only move on commit, which these tests never do.
+        cache.clear()
+
+    def test_headteacher_dashboard_is_cached_until_school_data_changes(self):
+        school = School.objects.create(name='Test School')
+        head = make_user('head', roles.HEAD_TEACHER, school, TeacherProfile)
+        teacher = make_user('teacher', roles.TEACHER, school, TeacherProfile)
+        self.client.force_login(head)
+        self.client.get(reverse('headteacher_dashboard'))
+
+        with self.assertNumQueries(3):  # session, user and role generation only
+            response = self.client.get(reverse('headteacher_dashboard'))
+        self.assertEqual(response.context['pending_approvals'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            LessonPlan.objects.create(teacher=teacher, school=school, title='New', objective='',
+                                      materials='', activities='')
+            # Until the write commits, readers keep the cached version.
+            self.assertEqual(self.client.get(reverse('headteacher_dashboard')).context['pending_approvals'], 0)
+        response = self.client.get(reverse('headteacher_dashboard'))
+        self.assertEqual(response.context['pending_approvals'], 1)
+        self.assertContains(response, 'New')
+
+    def test_schools_on_the_same_version_do_not_share_fragments(self):
+        schools = [School.objects.create(name=name) for name in ('Test School', 'Other School')]
+        heads = []
+        for school in schools:
+            head = make_user(f'head{school.pk}', roles.HEAD_TEACHER, school, TeacherProfile)
+            LessonPlan.objects.create(teacher=head, school=school, title=f'Plan of {school.name}', objective='',
+                                      materials='', activities='')
+            heads.append(head)
+        # Version counters are seeded from the clock, so two schools can share one.
+        cache.set(caching._version_key(schools[1].pk), caching.get_version(schools[0].pk), None)
+
+        for school, head in zip(schools, heads):
+            self.client.force_login(head)
+            response = self.client.get(reverse('headteacher_dashboard'))
+            self.assertContains(response, f'Plan of {school.name}')
+        self.assertNotContains(response, 'Plan of Test School')
+
+
+class SyncTests(TestCase):
+    @override_settings(SYNC_OVERLAP_SECONDS=0)
+    def test_delta_sync_with_tombstones_and_etag(self):
+        school = School.objects.create(name='Test School')
+        teacher = make_user('teacher', roles.TEACHER, school, TeacherProfile)
+        course = Course.objects.create(school=school, name='Maths', teacher=teacher, description='')
+        student = Student.objects.create(school=school, name='Ada', grade='JSS1')
+        student.courses.add(course)
+        self.client.force_login(teacher)
+
+        payload = self.client.get(reverse('sync_changes')).json()
+        self.assertEqual(payload['changes']['students']['rows'][0][-2], [course.pk])
+        cursor = payload['cursor']
+
+        response = self.client.get(reverse('sync_changes'), {'cursor': cursor})
+        self.assertEqual(response.json()['changes'], {})
+        response = self.client.get(reverse('sync_changes'), {'cursor': cursor},
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        assignment = Assignment.objects.create(course=course, school=school, title='Essay',
+                                               description='', due_date=datetime.date(2025, 1, 1))
+        student_id = student.pk
+        student.delete()
+        payload = self.client.get(reverse('sync_changes'), {'cursor': cursor}).json()
+        self.assertEqual(payload['changes']['assignments']['rows'][0][0], assignment.pk)
+        self.assertEqual(payload['deleted'], {'students': [student_id]})
+        self.assertNotIn('students', payload['changes'])
+
+    def test_rows_leaving_scope_without_a_delete(self):
+        school, other = School.objects.create(name='Test School'), School.objects.create(name='Other School')
+        teacher = make_user('teacher', roles.TEACHER, school, TeacherProfile)
+        parent = make_user('parent', roles.PARENT, school, ParentProfile)
+        head = make_user('head', roles.HEAD_TEACHER, school, TeacherProfile)
+        course = Course.objects.create(school=school, name='Maths', teacher=teacher, description='')
+        ada, obi = (Student.objects.create(school=school, name=name, grade='JSS1') for name in ('Ada', 'Obi'))
+        for student in (ada, obi):
+            student.courses.add(course)
+            parent.parentprofile.students.add(student)
+
+        def sync_as(user, cursor=None):
+            self.client.force_login(user)
+            return self.client.get(reverse('sync_changes'), {'cursor': cursor} if cursor else {}).json()
+
+        cursors = {user: sync_as(user)['cursor'] for user in (teacher, parent, head)}
+        ada.courses.remove(course)
+        parent.parentprofile.students.remove(obi)
+        for user, names in ((teacher, ['Obi']), (parent, ['Ada'])):
+            payload = sync_as(user, cursors[user])
+            self.assertTrue(payload['reset'])
+            self.assertEqual([row[1] for row in payload['changes']['students']['rows']], names)
+
+        # Staff see the whole school: no reset, but a move is a removal.
+        obi.school = other
+        obi.save()
+        payload = sync_as(head, cursors[head])
+        self.assertNotIn('reset', payload)
+        self.assertEqual(payload['deleted'], {'students': [obi.pk]})
+
+    def test_overlap_catches_rows_committed_after_the_cursor(self):
+        school = School.objects.create(name='Test School')
+        head = make_user('head', roles.HEAD_TEACHER, school, TeacherProfile)
+        Student.objects.create(school=school, name='Ada', grade='JSS1')
+        self.client.force_login(head)
+        cursor = self.client.get(reverse('sync_changes')).json()['cursor']
+
+        # Stamped before the cursor, but committed after that sync.
+        late = Student.objects.create(school=school, name='Obi', grade='JSS1')
+        Student.objects.filter(pk=late.pk).update(updated_at=sync.decode_cursor(cursor) - datetime.timedelta(seconds=1))
+        rows = self.client.get(reverse('sync_changes'), {'cursor': cursor}).json()['changes']['students']['rows']
+        self.assertIn(late.pk, [row[0] for row in rows])
+
+    def test_cursor_round_trips_every_microsecond(self):
+        moment = datetime.datetime(2025, 10, 6, 8, 30, tzinfo=datetime.timezone.utc)
+        for micros in (0, 1, 7, 500_000, 999_999):
+            moment = moment.replace(microsecond=micros)
+            self.assertEqual(sync.decode_cursor(sync.encode_cursor(moment)), moment)
+        with self.assertRaises(sync.InvalidCursor):
+            sync.decode_cursor('9' * 40)
+
+class SearchTests(TestCase):
+    def test_index_follows_saves_and_is_scoped_per_school(self):
+        school, other = School.objects.create(name='Test School'), School.objects.create(name='Other')
+        head = make_user('head', roles.HEAD_TEACHER, school, TeacherProfile)
+        plan = LessonPlan.objects.create(teacher=head, school=school, title='Fractions',
+                                         objective='Add <b>fractions</b> with unlike denominators',
+                                         materials='', activities='Pizza slicing')
+        LessonPlan.objects.create(teacher=head, school=other, title='Fractions', objective='',
+                                  materials='', activities='')
+        Student.objects.create(school=school, name='Ada Fraction', grade='JSS1')
+
+        hits = search.search('fractions denominators', school.pk)
+        self.assertEqual([(hit.doc_type, hit.object_id) for hit in hits], [('lessonplan', plan.pk)])
+        self.assertIn('<mark>', hits[0].snippet)
+        self.assertNotIn('<b>', hits[0].snippet)
+        self.assertEqual(len(search.search('fract', school.pk)), 2)
+        self.assertEqual(len(search.search('fract', doc_types=['lessonplan'])), 2)
+
+        plan.activities = 'Sharing oranges'
+        plan.save()
+        self.assertEqual(len(search.search('oranges', school.pk)), 1)
+        plan.delete()
+        self.assertEqual(search.search('oranges', school.pk), [])
+        self.assertEqual(search.rebuild(), 2)
+
+        self.client.force_login(head)
+        response = self.client.get(reverse('search'), {'q': 'ada'})
+        self.assertEqual([hit.doc_type for hit in response.context['hits']], ['student'])
+
+
+class JobQueueTests(TestCase):
+    def test_assignment_fans_out_parent_notifications_in_batches(self):
+        school = School.objects.create(name='Test School')
+        teacher = make_user('teacher', roles.TEACHER, school, TeacherProfile)
+        course = Course.objects.create(school=school, name='Maths', teacher=teacher, description='')
+        for i in range(3):
+            parent = make_user(f'parent{i}', roles.PARENT, school, ParentProfile)
+            student = Student.objects.create(school=school, name=f'S{i}', grade='JSS1')
+            student.courses.add(course)
+            parent.parentprofile.students.add(student)
+
+        Assignment.objects.create(course=course, school=school, title='Essay', description='',
+                                  due_date=datetime.date(2025, 1, 1))
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(jobs.work(), 2)  # assignment_posted, then one notify_users chunk
+        self.assertEqual(Notification.objects.filter(message__contains='Essay').count(), 3)
+        self.assertFalse(Job.objects.exists())
+
+    def test_failures_retry_with_backoff_then_stop(self):
+        calls = []
+
+        @jobs.task(name='test_flaky', max_attempts=2)
+        def flaky(payload):
+            calls.append(payload)
+            raise RuntimeError('boom')
+
+        try:
+            job = jobs.enqueue('test_flaky', {'n': 1})
+            self.assertEqual(jobs.work(), 1)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+            self.assertGreater(job.run_at, job.created_at)
+            self.assertEqual(jobs.work(), 0)  # not due yet
+
+            Job.objects.update(run_at=job.created_at)
+            with self.assertLogs('school.jobs', 'ERROR'):
+                jobs.work()
+            job.refresh_from_db()
+            self.assertEqual(job.status, Job.FAILED)
+            self.assertIn('RuntimeError: boom', job.last_error)
+            self.assertEqual(len(calls), 2)
+        finally:
+            del jobs.TASKS['test_flaky']
+
+    def test_concurrency_limit_and_lease_restarts_per_batch(self):
+        calls = []
+
+        @jobs.task(name='test_slow', concurrency=2)
+        def slow(payload):
+            calls.append(payload['n'])
+            # Another worker's sweep while this job runs.
+            self.assertEqual(jobs.requeue_stale(), 1)
+
+        try:
+            jobs.enqueue_many('test_slow', [{'n': n} for n in range(3)])
+            claimed = jobs.claim()
+            self.assertEqual(len(claimed), 2)
+            self.assertEqual(jobs.claim(), [])  # both slots taken
+
+            # The second job waited past its lease behind the first one.
+            Job.objects.filter(status=Job.RUNNING).update(locked_at=timezone.now() - datetime.timedelta(hours=1))
+            self.assertEqual(jobs.execute(claimed), 1)
+            self.assertEqual(calls, [0])
+            self.assertEqual(sorted(Job.objects.values_list('payload__n', 'status')), [(1, Job.QUEUED), (2, Job.QUEUED)])
+        finally:
+            del jobs.TASKS['test_slow']
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.school = School.objects.create(name='Test School')
+        teacher = make_user('teacher', roles.TEACHER, self.school, TeacherProfile)
+        maths = Course.objects.create(school=self.school, name='Maths', teacher=teacher, description='')
+        english = Course.objects.create(school=self.school, name='English', teacher=teacher, description='')
+        chess = Club.objects.create(school=self.school, name='Chess', description='')
+        for i in range(5):
+            student = Student.objects.create(school=self.school, name=f'Student {i}', grade='JSS1',
+                                             admission_number=f'A{i}')
+            student.courses.add(maths, english)
+            student.clubs.add(chess)
+        self.client.force_login(make_user('owner', roles.PROPRIETOR, self.school, TeacherProfile))
+
+    def test_streamed_csv_prefetches_enrollments_per_chunk(self):
+        response = self.client.get(reverse('export_data', args=['students']))
+        self.assertTrue(response.streaming)
+        self.assertFalse(response.is_async)
+        # Course and club names, students, then one enrollment query per M2M field per chunk.
+        with self.assertNumQueries(5):
+            body = b''.join(response.streaming_content).decode('utf-8-sig')
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1], ['A0', 'Student 0', 'JSS1', 'English; Maths', 'Chess'])
+
+    def test_streamed_xlsx_opens_in_openpyxl(self):
+        from openpyxl import load_workbook
+
+        response = self.client.get(reverse('export_data', args=['courses']), {'format': 'xlsx'})
+        workbook = load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)
+        rows = list(workbook.active.iter_rows(values_only=True))
+        self.assertEqual(rows[0], ('Course', 'Teacher', 'Students', 'Description'))
+        self.assertEqual(rows[1][:3], ('English', 'teacher', 5))
+
+    def test_csv_cells_cannot_start_a_formula(self):
+        Student.objects.filter(admission_number='A0').update(name='=HYPERLINK("http://x")', grade='-1+2')
+        response = self.client.get(reverse('export_data', args=['students']))
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        self.assertEqual(rows[1][1:3], ["'=HYPERLINK(\"http://x\")", "'-1+2"])
+
+    async def test_streams_asynchronously_under_asgi(self):
+        await self.async_client.aforce_login(await User.objects.aget(username='owner'))
+        response = await self.async_client.get(reverse('export_data', args=['students']))
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode('utf-8-sig')
+        self.assertEqual(len(list(csv.reader(io.StringIO(body)))), 6)
+
+
+class TimetableTests(TestCase):
+    def test_synthetic_school_has_no_clashes(self):
+        problem = timetable.synthetic_problem(300)
+        solution = timetable.solve(problem)
+        self.assertEqual(timetable.clashes(problem, solution.placements), [])
+        for course in problem.courses:
+            self.assertEqual(len(solution.placements[course.course_id]), course.lessons)
+
+    def test_overloaded_teacher_is_reported(self):
+        slots = [timetable.Slot(period, period // 4) for period in range(8)]
+        courses = [timetable.CourseLoad(1, 7, [1], 5), timetable.CourseLoad(2, 7, [2], 4)]
+        with self.assertRaisesMessage(timetable.TimetableError, 'teacher'):
+            timetable.solve(timetable.Problem(courses, slots))
+
+    def test_generate_from_view_through_job_queue(self):
+        school = School.objects.create(name='Test School')
+        head = make_user('head', roles.HEAD_TEACHER, school, TeacherProfile)
+        teacher = make_user('teacher', roles.TEACHER, school, TeacherProfile)
+        maths = Course.objects.create(school=school, name='Maths', teacher=teacher, description='', lessons_per_week=3)
+        english = Course.objects.create(school=school, name='English', teacher=head, description='', lessons_per_week=3)
+        student = Student.objects.create(school=school, name='Ada', grade='JSS1')
+        student.courses.add(maths, english)
+        Room.objects.create(school=school, name='Room 1', capacity=30)
+        self.client.force_login(head)
+
+        self.client.post(reverse('timetable'), {'action': 'create_periods'})
+        self.assertEqual(Period.objects.filter(school=school).count(), 40)
+        self.client.post(reverse('timetable'))
+        self.assertEqual(jobs.work(), 1)
+
+        entries = TimetableEntry.objects.filter(school=school)
+        self.assertEqual(entries.count(), 6)
+        # Ada takes both courses and there is one room, so no period holds two lessons.
+        self.assertEqual(len(set(entries.values_list('period_id', flat=True))), 6)
+        response = self.client.get(reverse('timetable'))
+        self.assertContains(response, 'Maths')
+        self.assertContains(response, 'The new timetable is ready: 6 lessons placed')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class SessionTests(TestCase):
+    def test_compact_serializer_round_trips(self):
+        serializer = sessions.CompactJSONSerializer()
+        data = {
+            '_auth_user_id': '7',
+            '_auth_user_backend': 'django.contrib.auth.backends.ModelBackend',
+            '_auth_user_hash': 'abc',
+            roles.SESSION_KEY: {'user_id': 7, 'version': 'v1', 'roles': [roles.TEACHER], 'school_id': 1,
+                                'teacher_profile_id': 3, 'parent_profile_id': None},
+            '~u': 'not an alias',
+        }
+        encoded = serializer.dumps(data)
+        self.assertEqual(serializer.loads(encoded), data)
+        self.assertLess(len(encoded), len(json.dumps(data, separators=(',', ':'))) * 2 // 3)
+
+    def test_clear_expired_deletes_in_batches(self):
+        now = timezone.now()
+        for index in range(5):
+            Session.objects.create(session_key=f'expired{index}', session_data='', expire_date=now - datetime.timedelta(days=1))
+        Session.objects.create(session_key='live', session_data='', expire_date=now + datetime.timedelta(days=1))
+        with self.assertNumQueries(3 * 2 + 1):  # select + delete per batch of two, then an empty select
+            self.assertEqual(sessions.clear_expired(batch_size=2), 5)
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+
+    def test_login_flow_writes(self):
+        make_user('teacher', roles.TEACHER, School.objects.create(name='Test School'), TeacherProfile)
+        by_backend = dict(zip(settings.SESSION_BACKENDS, benchmarks.run_session_flows('teacher', 'pass')))
+        for result in by_backend.values():
+            self.assertEqual([step[1] for step in result.steps], [302, 302, 200])
+            # Roles are cached in the session at login, so only the login writes.
+            self.assertEqual([step[3] for step in result.steps][1:], [0, 0])
+        self.assertEqual(by_backend['signed_cookies'].writes, 1)  # last_login only
+        self.assertEqual(by_backend['signed_cookies'].session_queries, 0)
+        self.assertEqual(by_backend['cached_db'].steps[-1][4], 0)
+
+
+class StartupTests(TestCase):
+    def test_summary_takes_the_median_of_each_timing(self):
+        from .management.commands.benchmark_startup import summarize
+
+        samples = [
+            {'total_ms': total, 'phases': {'apps': total / 2}, 'apps': {'school': {'ready': total / 10}},
+             'middleware': {'m': 1.0}, 'first_request_status': 200, 'modules_loaded': 600}
+            for total in (300.0, 100.0, 200.0)
+        ]
+        summary = summarize('core.settings_lean', samples)
+        self.assertEqual(summary['total_ms'], 200.0)
+        self.assertEqual(summary['phases'], {'apps': 100.0})
+        self.assertEqual(summary['apps'], {'school': {'ready': 20.0}})
+
+    def test_admin_link_only_shown_when_admin_installed(self):
+        self.client.force_login(make_user('owner', roles.PROPRIETOR))
+        with modify_settings(INSTALLED_APPS={'append': 'django.contrib.admin'}):
+            self.assertContains(self.client.get(reverse('proprietor_dashboard')), 'href="/admin/"')
+        with modify_settings(INSTALLED_APPS={'remove': 'django.contrib.admin'}):
+            self.assertNotContains(self.client.get(reverse('proprietor_dashboard')), 'href="/admin/"')
+
+
+class SchoolLookupTests(TestCase):
+    def test_prefix_lookup_is_case_folded_capped_and_ordered(self):
+        School.objects.create(name='  Royal   Academy ')
+        School.objects.bulk_create([School(name=f'Star College {i:02}', name_key=f'star college {i:02}') for i in range(15)])
+        School.objects.create(name='STAR Academy')
+
+        self.assertEqual([s['name'] for s in directory.lookup('royal a')], ['  Royal   Academy '])
+        results = directory.lookup('sTaR')
+        self.assertEqual(len(results), directory.MAX_RESULTS)
+        self.assertEqual(results[0]['name'], 'STAR Academy')
+        self.assertEqual(directory.lookup('star college 1')[0]['name'], 'Star College 10')
+        self.assertEqual(directory.lookup('   '), [])
+
+    def test_hot_prefixes_are_cached_until_a_school_changes(self):
+        School.objects.create(name='Unity School')
+        self.assertEqual(len(directory.lookup('un')), 1)
+        with self.assertNumQueries(0):
+            directory.lookup('UN')
+        School.objects.create(name='Unique Academy')
+        self.assertEqual([s['name'] for s in directory.lookup('un')], ['Unique Academy', 'Unity School'])
+
+    def test_registration_validates_only_the_submitted_school(self):
+        school = School.objects.create(name='Test School')
+        response = self.client.get(reverse('school_lookup'), {'q': 'test'})
+        self.assertEqual(response.json(), {'results': [{'id': school.pk, 'name': 'Test School'}]})
+
+        response = self.client.get(reverse('register'))
+        self.assertNotContains(response, '<option value="%d"' % school.pk)
+        data = {
+            'username': 'newteacher', 'email': 'new@example.com', 'role': 'Teacher',
+            'password1': 'a-long-Passw0rd', 'password2': 'a-long-Passw0rd', 'school': school.pk + 100,
+        }
+        response = self.client.post(reverse('register'), data)
+        self.assertTrue(response.context['form'].has_error('school'))
+        data['school'] = school.pk
+        response = self.client.post(reverse('register'), data)
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertEqual(TeacherProfile.objects.get(user__username='newteacher').school, school)
+
+
+class AdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school, cls.other = School.objects.create(name='Test School'), School.objects.create(name='Other School')
+        cls.teacher = make_user('teacher', roles.TEACHER, cls.school, TeacherProfile)
+        for school in (cls.school, cls.other):
+            for i in range(3):
+                LessonPlan.objects.create(teacher=cls.teacher, school=school, title=f'Plan {i}', objective='o', materials='m', activities='a')
+        cls.admin = User.objects.create_superuser('root', 'root@example.com', 'pass')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def changelist_queries(self, model, **params):
+        url = reverse(f'admin:school_{model._meta.model_name}_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_changelists_do_not_query_per_row(self):
+        for model in (LessonPlan, TeacherProfile, Course, Assignment, GradeRecord, Student, TimetableEntry, School):
+            with self.subTest(model=model.__name__):
+                self.changelist_queries(model)
+        _, before = self.changelist_queries(LessonPlan)
+        LessonPlan.objects.create(teacher=make_user('t2', roles.TEACHER), school=self.other, title='x', objective='o', materials='m', activities='a')
+        _, after = self.changelist_queries(LessonPlan)
+        self.assertEqual(before, after)
+
+    def test_school_filter_searches_instead_of_listing_every_school(self):
+        response, _ = self.changelist_queries(LessonPlan)
+        self.assertNotContains(response, '?school=%d' % self.other.pk)
+        response, _ = self.changelist_queries(LessonPlan, school_q='oth', school=self.other.pk)
+        self.assertContains(response, 'Other School')
+        self.assertEqual(response.context['cl'].result_count, 3)
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'school', 'model_name': 'lessonplan', 'field_name': 'school', 'term': 'OTH',
+        })
+        self.assertEqual([r['text'] for r in response.json()['results']], ['Other School'])
+
+    def test_bulk_approve_updates_each_school(self):
+        url = reverse('admin:school_lessonplan_changelist')
+        ids = list(LessonPlan.objects.values_list('pk', flat=True))
+        self.client.post(url, {'action': 'approve_selected', '_selected_action': ids})
+        self.assertFalse(LessonPlan.objects.filter(approved=False).exists())
+
+    def test_estimated_count_for_large_unfiltered_tables(self):
+        self.assertIsNone(school_admin.estimated_count(LessonPlan, 'default'))
+        with mock.patch.object(school_admin, 'ESTIMATE_COUNT_THRESHOLD', 1):
+            # No statistics yet: deleted rows must not inflate the count.
+            LessonPlan.objects.filter(pk=LessonPlan.objects.filter(school=self.other).earliest('pk').pk).delete()
+            self.assertEqual(school_admin.EstimatedCountPaginator(LessonPlan.objects.order_by('pk'), 10).count, 5)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.assertEqual(school_admin.estimated_count(LessonPlan, 'default'), 5)
+        with mock.patch.object(school_admin, 'ESTIMATE_COUNT_THRESHOLD', 5):
+            LessonPlan.objects.filter(school=self.other).delete()
+            self.assertEqual(school_admin.EstimatedCountPaginator(LessonPlan.objects.order_by('pk'), 10).count, 5)
+            self.assertEqual(school_admin.EstimatedCountPaginator(LessonPlan.objects.filter(school=self.school).order_by('pk'), 10).count, 3)
+
+
+class AnalyticsTests(TestCase):
+    def test_statistics_and_rankings(self):
+        stats = analytics.describe(array('d', [35.0, 50.0, 60.0, 70.0, 75.0]))
+        self.assertEqual((stats['mean'], stats['median'], stats['p25'], stats['p90']), (58.0, 60.0, 50.0, 73.0))
+        self.assertEqual(stats['pass_rate'], 80.0)
+        self.assertEqual([band['count'] for band in stats['distribution']], [2, 1, 1, 0, 0, 1])
+        self.assertEqual(analytics.rank({1: 80, 2: 70, 3: 70, 4: 60}), [(1, 1, 80), (2, 2, 70), (2, 3, 70), (4, 4, 60)])
+
+    @override_settings(DASHBOARD_CACHE_SECONDS=3600)
+    def test_term_results_are_cached_until_a_grade_changes(self):
+        school = School.objects.create(name='Test School')
+        teacher = make_user('head', roles.HEAD_TEACHER, school, TeacherProfile)
+        maths, english = (Course.objects.create(school=school, name=name, teacher=teacher, description='') for name in ('Maths', 'English'))
+        ada, bola, chi = (Student.objects.create(school=school, name=name, grade='JSS1') for name in ('Ada', 'Bola', 'Chi'))
+        for student, scores in ((ada, (90, 70)), (bola, (60, 40)), (chi, (55, 45))):
+            GradeRecord.objects.create(school=school, student=student, course=maths, term='T1', assessment='Exam', score=scores[0])
+            GradeRecord.objects.create(school=school, student=student, course=english, term='T1', assessment='Exam', score=scores[1])
+
+        terms, results = analytics.dashboard(school.pk)
+        self.assertEqual((terms, results['term']), (['T1'], 'T1'))
+        self.assertEqual([row[2:] for row in results['classes'][0]['ranking']], [('Ada', 80.0), ('Bola', 50.0), ('Chi', 50.0)])
+        self.assertEqual([row[0] for row in results['classes'][0]['ranking']], [1, 2, 2])
+        self.assertEqual([course['name'] for course in results['courses']], ['English', 'Maths'])
+        self.assertEqual(results['school']['median'], 50.0)
+        with self.assertNumQueries(0):
+            analytics.dashboard(school.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            GradeRecord.objects.create(school=school, student=chi, course=maths, term='T1', assessment='Test', score=95)
+        ranking = analytics.dashboard(school.pk)[1]['classes'][0]['ranking']
+        self.assertEqual([row[2] for row in ranking], ['Ada', 'Chi', 'Bola'])
+
+        self.client.force_login(teacher)
+        self.assertContains(self.client.get(reverse('headteacher_dashboard')), '1. Ada (80.0)')
+
+
+class StaticAssetTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.static_root)
+        cls.enterClassContext(override_settings(STATIC_ROOT=cls.static_root))
+        call_command('collectstatic', interactive=False, verbosity=0)
+        cls.css_name = staticfiles_storage.stored_name('build/app.css')
+
+    def test_scan_and_minify(self):
+        classes, icons = assets.candidates(['<i class="fas {% if ok %}fa-check-circle{% endif %} mr-3">', '--fa-icon:x'])
+        self.assertIn('mr-3', classes)
+        self.assertEqual(icons, ['check-circle'])
+        css = assets.minify('/*! keep */\n/* drop */ .a  >  .b {\n  content: "a  ;  }";\n  margin: 0 auto ;\n}\n')
+        self.assertEqual(css, '/*! keep */\n.a>.b{content:"a  ;  }";margin:0 auto}\n')
+        # Every icon the templates use is in the committed stylesheet.
+        built = (assets.base_dir() / assets.OUTPUT).read_text()
+        _, used = assets.candidates(path.read_text() for path in assets.scanned_files())
+        self.assertEqual([name for name in used if f'.fa-{name}{{' not in built], [])
+
+    def test_collectstatic_writes_hashed_compressed_files(self):
+        self.assertRegex(self.css_name, r'^build/app\.[0-9a-f]{12}\.css$')
+        path = os.path.join(self.static_root, self.css_name)
+        with open(path, 'rb') as original, open(path + '.gz', 'rb') as compressed:
+            self.assertEqual(gzip.decompress(compressed.read()), original.read())
+        self.assertIn(f'/static/{self.css_name}', self.client.get(reverse('login')).content.decode())
+
+    def test_middleware_serves_encodings_and_cache_headers(self):
+        response = self.client.get(f'/static/{self.css_name}', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content))[:2], b'/*')
+
+        response = self.client.get('/static/build/app.css', HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=300')
+        self.assertEqual(
+            self.client.get('/static/build/app.css', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304,
+        )
+        self.assertEqual(self.client.get('/static/../manage.py').status_code, 404)
+
+
+class AsyncDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='Test School')
+        cls.head = make_user('head', roles.HEAD_TEACHER, cls.school, TeacherProfile)
+        LessonPlan.objects.create(school=cls.school, teacher=cls.head, title='Fractions', objective='o', activities='a')
+
+    async def test_dashboards_under_asgi(self):
+        response = await self.async_client.get(reverse('headteacher_dashboard'))
+        self.assertRedirects(response, f'{settings.LOGIN_URL}?next={reverse("headteacher_dashboard")}', fetch_redirect_response=False)
+
+        await self.async_client.aforce_login(self.head)
+        response = await self.async_client.get(reverse('headteacher_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['pending_approvals'], 1)
+        self.assertEqual([plan.title for plan in response.context['recent_pending']], ['Fractions'])
+        self.assertRedirects(await self.async_client.get(reverse('teacher_dashboard')), reverse('dashboard'), fetch_redirect_response=False)
+
+    def test_gather_runs_blocks_concurrently(self):
+        # Each block waits for the other, so they only finish if run at the same time.
+        barrier = threading.Barrier(2, timeout=5)
+
+        def block(value):
+            barrier.wait()
+            return value, threading.current_thread().name
+
+        with mock.patch.object(parallel, '_parallel_allowed', return_value=True):
+            results = async_to_sync(parallel.gather)((block, 'a'), (block, 'b'))
+        self.assertEqual([value for value, _ in results], ['a', 'b'])
+        self.assertTrue(all(name.startswith('school-query') for _, name in results))
+
+        # Inside this test's transaction, blocks share the request thread's connection.
+        results = async_to_sync(parallel.gather)(lambda: threading.current_thread().name, lambda: Student.objects.count())
+        self.assertEqual(results, [threading.current_thread().name, 0])
+
+
+class TenancyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='Test School')
+        cls.other = School.objects.create(name='Other School')
+        cls.ada = Student.objects.create(school=cls.school, name='Ada', admission_number='A1', grade='JSS1')
+        Student.objects.create(school=cls.other, name='Bola', admission_number='B1', grade='JSS1')
+
+    def test_bound_school_hides_other_schools(self):
+        self.assertEqual(Student.objects.count(), 2)
+        with tenancy.scoped(self.school.pk):
+            self.assertEqual(list(Student.objects.values_list('name', flat=True)), ['Ada'])
+            self.assertEqual(Student.all_schools.count(), 2)
+            form = CustomUserCreationForm(data={
+                'username': 'new', 'password1': 'S3cure-pass!', 'password2': 'S3cure-pass!',
+                'role': 'Teacher', 'school': self.other.pk,
+            })
+            self.assertIn('school', form.errors)
+            with tenancy.unscoped():
+                self.assertEqual(Student.objects.count(), 2)
+
+    def test_middleware_binds_school_except_for_superusers(self):
+        seen = []
+
+        def view(request):
+            seen.append(list(Student.objects.values_list('name', flat=True)))
+            return HttpResponse()
+
+        from .middleware import TenantMiddleware
+        middleware = TenantMiddleware(view)
+        request = RequestFactory().get('/')
+        request.user, request.school_id = make_user('head', roles.HEAD_TEACHER), self.school.pk
+        middleware(request)
+        request.user, request.school_id = make_user('proprietor', roles.PROPRIETOR), None
+        middleware(request)
+        request.user = User.objects.create_superuser('root', password='pass')
+        middleware(request)
+        self.assertEqual(seen, [['Ada'], [], ['Ada', 'Bola']])
+        self.assertIsNone(tenancy.current_school_id())
+
+
+class SchoolSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='Test School')
+        cls.other = School.objects.create(name='Other School')
+        cls.teacher = make_user('teacher', roles.TEACHER, cls.school, TeacherProfile)
+
+    def assertMatchesCounts(self, school):
+        summary = SchoolSummary.objects.get(school=school)
+        expected = summaries.counts(school.pk, summary.attendance_term)
+        self.assertEqual({field: getattr(summary, field) for field in expected}, expected)
+
+    def test_signals_and_bulk_paths_keep_counts(self):
+        summary = summaries.get(self.school.pk)
+        summaries.get(self.other.pk)
+        self.assertEqual((summary.student_count, summary.teacher_count), (0, 1))
+
+        student = Student.objects.create(school=self.school, name='Ada', admission_number='A1', grade='JSS1')
+        Course.objects.create(school=self.school, name='Maths', teacher=self.teacher, description='')
+        Club.objects.create(school=self.school, name='Chess', description='')
+        plans = [
+            LessonPlan.objects.create(school=self.school, teacher=self.teacher, title=title, objective='o', activities='a')
+            for title in ('One', 'Two', 'Three')
+        ]
+        import_roster(io.BytesIO(b'name,admission_number,grade\nBola,B1,JSS2\n'), 'roster.csv', self.school)
+        attendance.record_roll_call(self.school.pk, timezone.localdate(), {student.pk: 'present'})
+        attendance.record_roll_call(self.school.pk, timezone.localdate(), {student.pk: 'absent'})
+        self.assertMatchesCounts(self.school)
+
+        self.assertEqual(review_plans(self.school.pk, [plans[0].pk, plans[1].pk], True), 2)
+        plans[2].approved = True
+        plans[2].save(update_fields=['approved'])
+        review_plans(self.school.pk, [plans[0].pk], False, 'Redo')
+        self.assertEqual(SchoolSummary.objects.get(school=self.school).pending_plans, 1)
+
+        student.school = self.other
+        student.save()
+        LessonPlan.objects.get(pk=plans[1].pk).delete()
+        self.assertMatchesCounts(self.school)
+        self.assertMatchesCounts(self.other)
+        summary = SchoolSummary.objects.get(school=self.school)
+        self.assertEqual((summary.student_count, summary.attendance_rate), (1, 0))
+
+    def test_dashboards_read_the_summary(self):
+        Student.objects.create(school=self.school, name='Ada', admission_number='A1', grade='JSS1')
+        Student.objects.create(school=self.other, name='Bola', admission_number='B1', grade='JSS1')
+        # Registered the way real proprietors are, which must tie them to the school.
+        self.client.post(reverse('register'), {
+            'username': 'proprietor', 'password1': 'S3cure-pass!', 'password2': 'S3cure-pass!',
+            'role': roles.PROPRIETOR, 'school': self.school.pk,
+        })
+        response = self.client.get(reverse('proprietor_dashboard'))
+        self.assertEqual(response.context['summary'].student_count, 1)
+        self.assertContains(response, 'Pending plans')
+
+        SchoolSummary.objects.filter(school=self.school).update(student_count=7)
+        call_command('rebuild_school_summaries', school=self.school.pk, stdout=io.StringIO())
+        self.assertEqual(SchoolSummary.objects.get(school=self.school).student_count, 1)
+
+    def test_rebuild_counts_on_the_primary(self):
+        Student.objects.create(school=self.school, name='Ada', admission_number='A1', grade='JSS1')
+        # Any read routed to the (unconfigured) replica would fail.
+        with mock.patch.object(db_router.PrimaryReplicaRouter, 'db_for_read', return_value='replica_0'):
+            summary = summaries.rebuild(self.school.pk)
+        self.assertEqual((summary.student_count, summary.teacher_count), (1, 1))
+
+
+class RolloverTests(TestCase):
+    term = '2024/2025 Third Term'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='Test School')
+        cls.head = make_user('head', roles.HEAD_TEACHER, cls.school, TeacherProfile)
+        cls.courses = {
+            grade: Course.objects.create(school=cls.school, name=grade, teacher=cls.head, description='')
+            for grade in ('JSS1', 'JSS2', 'SS3')
+        }
+        cls.club = Club.objects.create(school=cls.school, name='Chess', description='')
+        cls.students = {}
+        for grade in ('JSS1', 'JSS1', 'JSS2', 'SS3', 'Nursery'):
+            student = Student.objects.create(school=cls.school, name=f'{grade} student', grade=grade)
+            if grade in cls.courses:
+                student.courses.add(cls.courses[grade])
+            student.clubs.add(cls.club)
+            cls.students.setdefault(grade, student)
+        in_term = datetime.date(2025, 6, 2)
+        cls.old = Assignment.objects.create(course=cls.courses['JSS1'], school=cls.school, title='Old', description='', due_date=in_term)
+        Assignment.objects.create(course=cls.courses['JSS1'], school=cls.school, title='New', description='', due_date=timezone.localdate())
+        plan = LessonPlan.objects.create(school=cls.school, teacher=cls.head, title='Old plan', objective='o', activities='a')
+        LessonPlan.objects.filter(pk=plan.pk).update(submission_date=timezone.make_aware(datetime.datetime(2025, 6, 2, 9)))
+        AttendanceRecord.objects.create(school=cls.school, student=cls.students['JSS1'], date=in_term)
+
+    def test_interrupted_rollover_resumes(self):
+        summaries.get(self.school.pk)
+        with self.assertRaises(rollover.RolloverError):
+            rollover.start(self.school.pk, term_for_date(timezone.localdate()))
+
+        run = rollover.start(self.school.pk, self.term)
+        self.assertTrue(run.promote)
+        for _ in range(3):
+            run = rollover.advance(run, chunk_size=1)
+        self.assertEqual(run.step, 'lesson_plans')
+        # A second start (after a crash, say) carries on from the saved step.
+        self.assertEqual(rollover.start(self.school.pk, self.term).pk, run.pk)
+        call_command('rollover_term', school=self.school.pk, term=self.term, chunk_size=2, stdout=io.StringIO())
+
+        run.refresh_from_db()
+        self.assertIsNotNone(run.finished_at)
+        self.assertEqual(run.state['counts'], {'assignments': 1, 'lesson_plans': 1, 'attendance': 1, 'promoted': 4, 'graduated': 1})
+        self.assertEqual(list(Assignment.objects.values_list('title', flat=True)), ['New'])
+        self.assertEqual(ArchivedAssignment.objects.get().pk, self.old.pk)
+        self.assertEqual(ArchivedLessonPlan.objects.get().term, self.term)
+        self.assertEqual((LessonPlan.objects.count(), AttendanceRecord.objects.count(), ArchivedAttendanceRecord.objects.count()), (0, 0, 1))
+        self.assertEqual(SyncTombstone.objects.filter(model='assignment', object_id=self.old.pk).count(), 1)
+        self.assertEqual(SchoolSummary.objects.get(school=self.school).pending_plans, 0)
+
+        grades = {grade: Student.objects.get(pk=student.pk) for grade, student in self.students.items()}
+        self.assertEqual({old: student.grade for old, student in grades.items()},
+                         {'JSS1': 'JSS2', 'JSS2': 'JSS3', 'SS3': rollover.GRADUATED, 'Nursery': 'Nursery'})
+        # New JSS2 students take the course the JSS2 class took; JSS3 had none.
+        self.assertEqual(list(grades['JSS1'].courses.all()), [self.courses['JSS2']])
+        self.assertEqual(list(grades['JSS2'].courses.all()), [])
+        self.assertEqual((grades['SS3'].courses.count(), grades['SS3'].clubs.count()), (0, 0))
+        self.assertEqual(list(grades['Nursery'].clubs.all()), [self.club])
+
+    def test_view_runs_rollover_in_background_jobs(self):
+        self.client.force_login(self.head)
+        response = self.client.post(reverse('rollover'), {'term': self.term, 'promote': 'no'})
+        self.assertRedirects(response, reverse('rollover'))
+        jobs.work()
+        run = RolloverRun.objects.get(school=self.school, term=self.term)
+        self.assertFalse(run.promote)
+        self.assertIsNotNone(run.finished_at)
+        self.assertEqual(Student.objects.get(pk=self.students['JSS1'].pk).grade, 'JSS1')
+        self.assertTrue(self.head.notifications.filter(message__contains='rollover').exists())
+        self.assertContains(self.client.get(reverse('rollover')), 'Finished')
+
+
+class AuditLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name='Test School')
+        cls.head = make_user('head', roles.HEAD_TEACHER, cls.school, TeacherProfile)
+
+    def history(self, instance):
+        return [
+            (event.action, event.changes, event.actor_id)
+            for event in reversed(audit.history(instance._meta.model_name, instance.pk, self.school.pk))
+        ]
+
+    def test_signals_and_bulk_paths_record_diffs(self):
+        with audit.collecting(self.head.pk), self.captureOnCommitCallbacks(execute=True):
+            plan = LessonPlan.objects.create(school=self.school, teacher=self.head, title='Fractions', objective='o', activities='a')
+            review_plans(self.school.pk, [plan.pk], False, 'Add homework')
+            review_plans(self.school.pk, [plan.pk], True)
+            student = Student.objects.create(school=self.school, name='Ada', grade='JSS1')
+            student = Student.objects.get(pk=student.pk)
+            student.grade = 'JSS2'
+            student.save()
+            student.save()
+            attendance.record_roll_call(self.school.pk, timezone.localdate(), {student.pk: 'present'})
+            attendance.record_roll_call(self.school.pk, timezone.localdate(), {student.pk: 'late'})
+            club = Club.objects.create(school=self.school, name='Chess', description='')
+            club.delete()
+        self.assertEqual(AuditEvent.objects.count(), 9)
+
+        plan_history = self.history(plan)
+        self.assertEqual([action for action, _, _ in plan_history], ['create', 'update', 'update'])
+        self.assertEqual(plan_history[1][1], {'rejection_reason': ['', 'Add homework']})
+        self.assertEqual(plan_history[2][1], {'approved': [False, True], 'rejection_reason': ['Add homework', '']})
+        self.assertEqual(self.history(student)[1:], [('update', {'grade': ['JSS1', 'JSS2']}, self.head.pk)])
+        record = AttendanceRecord.objects.get()
+        self.assertEqual([changes.get('status') for _, changes, _ in self.history(record)], [[None, 'present'], ['present', 'late']])
+        self.assertEqual(AuditEvent.objects.filter(model='club').latest('id').changes['name'], ['Chess', None])
+
+        event = AuditEvent.objects.first()
+        with self.assertRaises(ValueError):
+            event.save()
+
+    def test_history_view(self):
+        plan = LessonPlan.objects.create(school=self.school, teacher=self.head, title='Fractions', objective='o', activities='a')
+        audit.write([audit.event(LessonPlan, self.school.pk, plan.pk, AuditEvent.UPDATE, {'approved': [False, True]})])
+        self.client.force_login(self.head)
+        response = self.client.get(reverse('object_history', args=['lessonplan', plan.pk]))
+        self.assertContains(response, 'approved')
+        self.assertContains(self.client.get(reverse('approve_lesson_plan')), reverse('object_history', args=['lessonplan', plan.pk]))
+        self.assertEqual(self.client.get(reverse('object_history', args=['job', 1])).status_code, 404)
+
+    def test_compaction_and_retention(self):
+        now = timezone.now()
+        old = now - datetime.timedelta(days=200)
+        audit.write([
+            AuditEvent(school=self.school, actor=self.head, action=AuditEvent.UPDATE, model='student', object_id=1,
+                       changes={'grade': [before, after]}, created_at=old + datetime.timedelta(minutes=minutes))
+            for minutes, before, after in ((0, 'JSS1', 'JSS2'), (1, 'JSS2', 'JSS3'), (2, 'JSS3', 'SS1'))
+        ] + [
+            AuditEvent(school=self.school, action=AuditEvent.UPDATE, model='student', object_id=1,
+                       changes={'name': ['A', 'B']}, created_at=now),
+            AuditEvent(school=self.school, action=AuditEvent.CREATE, model='student', object_id=2,
+                       changes={}, created_at=now - datetime.timedelta(days=4000)),
+        ])
+        out = io.StringIO()
+        call_command('compact_audit_log', stdout=out)
+        self.assertIn('Deleted 1 expired audit event(s); merged away 2 more.', out.getvalue())
+        merged, recent = AuditEvent.objects.order_by('created_at')
+        self.assertEqual((merged.changes, merged.merged), ({'grade': ['JSS1', 'SS1']}, 3))
+        self.assertEqual(recent.changes, {'name': ['A', 'B']})
+
+
+class AuditMiddlewareTests(TransactionTestCase):
+    def test_request_events_written_in_one_insert(self):
+        school = School.objects.create(name='Test School')
+        head = make_user('head', roles.HEAD_TEACHER, school, TeacherProfile)
+        plans = [
+            LessonPlan.objects.create(school=school, teacher=head, title=title, objective='o', activities='a')
+            for title in ('One', 'Two')
+        ]
+        self.client.force_login(head)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('approve_lesson_plan'), {'plan_ids': [plan.pk for plan in plans], 'action': 'approve'})
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "school_auditevent"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            list(AuditEvent.objects.filter(action=AuditEvent.UPDATE).values_list('object_id', 'actor_id').order_by('object_id')),
+            [(plans[0].pk, head.pk), (plans[1].pk, head.pk)],
+        )
+
+
+@override_settings(REPLICA_DATABASES=['replica_0'])
+class ReplicaRouterTests(SimpleTestCase):
+    def test_replica_reads_until_the_client_writes(self):
+        router = db_router.PrimaryReplicaRouter()
+
+        @db_router.replica_reads
+        def view(request):
+            before = router.db_for_read(Student)
+            if 'write' in request.GET:
+                router.db_for_write(Student)
+            return HttpResponse(f'{before} {router.db_for_read(Student)}')
+
+        middleware = db_router.ReplicaMiddleware(view)
+        factory = RequestFactory()
+        response = middleware(factory.get('/'))
+        self.assertEqual(response.content, b'replica_0 replica_0')
+        self.assertNotIn(db_router.PIN_COOKIE, response.cookies)
+
+        response = middleware(factory.get('/', {'write': 1}))
+        self.assertEqual(response.content, b'replica_0 None')
+        self.assertIn(db_router.PIN_COOKIE, response.cookies)
+
+        request = factory.get('/')
+        request.COOKIES[db_router.PIN_COOKIE] = '1'
+        self.assertEqual(middleware(request).content, b'None None')
+        self.assertEqual(middleware(factory.post('/')).content, b'None None')
+        self.assertIsNone(router.db_for_read(Student))
+
+
+@override_settings(
+    PROFILING_ENABLED=True,
+    PROFILING_SLOW_QUERY_MS=0,
+    MIDDLEWARE=['school.profiling.ProfilingMiddleware'] + settings.MIDDLEWARE + ['school.profiling.ViewTimingMiddleware'],
+)
+class ProfilingMiddlewareTests(TestCase):
+    def test_server_timing_header_and_log_line(self):
+        school = School.objects.create(name='Test School')
+        self.client.force_login(make_user('teacher', roles.TEACHER, school, TeacherProfile))
+        with self.assertLogs('school.profiling', 'INFO') as logs:
+            response = self.client.get(reverse('teacher_dashboard'))
+        timing = response['Server-Timing']
+        for metric in ('sql;', 'view;', 'tpl;', 'mw;', 'total;'):
+            self.assertIn(metric, timing)
+        self.assertIn('"call_site": "school/', logs.output[0])
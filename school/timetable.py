@@ -0,0 +1,510 @@
+"""
+Weekly timetable generation.
+
+A school's timetable places every course ``Course.lessons_per_week`` times
+into its teaching periods so that no teacher and no student has two lessons
+in the same period, and no period has more lessons than rooms to hold them.
+
+The solver is a min-conflicts local search with incremental conflict checks:
+
+* Two courses conflict when they share a teacher or any student. The
+  conflict graph is built once from the enrollments, in time proportional to
+  the enrollments rather than to every pair of courses.
+* For every course and period the search keeps how many lessons of
+  conflicting courses sit there. Moving a lesson updates only its course's
+  neighbours, so the clashes of any candidate move are read off a counter
+  instead of rescanning the timetable.
+* A greedy pass places the most connected courses first, each lesson in its
+  least-clashing period. Clashing lessons are then moved, one at a time, to
+  their best period, with a tabu list against moving straight back. When no
+  single move helps, the lesson's Kempe chain (the lessons that would have to
+  trade places with it) is swapped with another period.
+* Ties go to days the course does not meet yet, which spreads a course over
+  the week.
+* Rooms are grouped into capacity tiers; a period takes another lesson only
+  while, for every tier, the lessons needing at least that tier fit in the
+  rooms offering it. Rooms are assigned per period once the search succeeds.
+
+A search that stalls restarts from a new greedy pass; ``TimetableError`` is
+raised once the restarts or the time limit are used up.
+"""
+import bisect
+import random
+import string
+import time
+
+from django.db import transaction
+
+from .models import Course, Period, Room, Student, TimetableEntry
+
+MAX_RESTARTS = 5
+TIME_LIMIT_SECONDS = 60
+# Repair moves per attempt before restarting, as a multiple of the lessons to place.
+MOVES_PER_LESSON = 50
+
+
+class TimetableError(Exception):
+    pass
+
+
+class CourseLoad:
+    """One course to schedule: who teaches it, who takes it and how often it meets."""
+
+    def __init__(self, course_id, teacher_id, student_ids, lessons, label=''):
+        self.course_id = course_id
+        self.teacher_id = teacher_id
+        self.student_ids = frozenset(student_ids)
+        self.lessons = lessons
+        self.label = label or str(course_id)
+
+
+class Slot:
+    def __init__(self, period_id, day):
+        self.period_id = period_id
+        self.day = day
+
+
+class Problem:
+    def __init__(self, courses, slots, rooms=None):
+        """
+        ``rooms`` is a list of ``(room id, capacity)``, or None for no room
+        limit (lessons are then left without a room).
+        """
+        self.courses = [course for course in courses if course.lessons > 0]
+        self.slots = list(slots)
+        self.rooms = None if rooms is None else sorted(rooms, key=lambda room: -room[1])
+
+    @property
+    def lesson_count(self):
+        return sum(course.lessons for course in self.courses)
+
+
+class Solution:
+    def __init__(self, problem, placements, attempts, seconds):
+        self.problem = problem
+        # course id -> [(period id, room id or None)]
+        self.placements = placements
+        self.attempts = attempts
+        self.seconds = seconds
+
+
+def conflict_graph(courses):
+    """Neighbour index lists: courses sharing a teacher or a student."""
+    neighbours = [set() for _ in courses]
+    groups = {}
+    for index, course in enumerate(courses):
+        groups.setdefault(('teacher', course.teacher_id), []).append(index)
+        for student_id in course.student_ids:
+            groups.setdefault(student_id, []).append(index)
+    seen = set()
+    for members in groups.values():
+        key = tuple(members)
+        if len(members) < 2 or key in seen:
+            continue
+        # Students with the same courses add the same edges; do them once.
+        seen.add(key)
+        for index in members:
+            neighbours[index].update(members)
+    for index, linked in enumerate(neighbours):
+        linked.discard(index)
+    return [sorted(linked) for linked in neighbours]
+
+
+class _Search:
+    """
+    Lessons and their periods, with per-period counters kept up to date on
+    every move so a move's effect is known without rescanning the timetable.
+    """
+
+    def __init__(self, problem, neighbours, rng):
+        self.courses = problem.courses
+        self.slots = problem.slots
+        self.neighbours = neighbours
+        self.rng = rng
+        slot_count = len(self.slots)
+        # count[c][p]: lessons of course c in period p.
+        self.count = [[0] * slot_count for _ in self.courses]
+        # clash[c][p]: lessons of c's neighbours in period p, i.e. the clashes
+        # a lesson of c would have there.
+        self.clash = [[0] * slot_count for _ in self.courses]
+        self.lessons = []  # [course index, period]
+        self.by_course = [[] for _ in self.courses]
+        self.conflicted = set()
+        self.total = 0
+        self._init_rooms(problem.rooms)
+
+    def _init_rooms(self, rooms):
+        self.tier_of = None
+        if rooms is None:
+            return
+        capacities = sorted({capacity for _, capacity in rooms})
+        # available[t]: rooms with at least the capacity of tier t.
+        self.available = [sum(1 for _, capacity in rooms if capacity >= tier) for tier in capacities]
+        self.used = [[0] * len(capacities) for _ in self.slots]
+        self.tier_of = []
+        for course in self.courses:
+            tier = bisect.bisect_left(capacities, len(course.student_ids))
+            if tier == len(capacities):
+                raise TimetableError(f'No room is large enough for {course.label} ({len(course.student_ids)} students).')
+            self.tier_of.append(tier)
+
+    def _room_free(self, index, slot):
+        if self.tier_of is None:
+            return True
+        used = self.used[slot]
+        return all(used[tier] < self.available[tier] for tier in range(self.tier_of[index] + 1))
+
+    def _use_room(self, index, slot, delta):
+        if self.tier_of is not None:
+            used = self.used[slot]
+            for tier in range(self.tier_of[index] + 1):
+                used[tier] += delta
+
+    def _cost(self, index, slot):
+        """Clashes a lesson of course ``index`` has (or would have) in ``slot``."""
+        return self.clash[index][slot] + self.count[index][slot]
+
+    def _refresh(self, lesson):
+        index, slot = self.lessons[lesson]
+        if self._cost(index, slot) > 1:
+            self.conflicted.add(lesson)
+        else:
+            self.conflicted.discard(lesson)
+
+    def _add(self, index, slot):
+        self.total += self._cost(index, slot)
+        self.count[index][slot] += 1
+        for other in self.neighbours[index]:
+            self.clash[other][slot] += 1
+        self._use_room(index, slot, 1)
+
+    def _remove(self, index, slot):
+        self.count[index][slot] -= 1
+        for other in self.neighbours[index]:
+            self.clash[other][slot] -= 1
+        self.total -= self._cost(index, slot)
+        self._use_room(index, slot, -1)
+
+    def _touch(self, index, slots):
+        """Re-check the lessons of ``index`` and its neighbours that sit in ``slots``."""
+        for course in [index] + self.neighbours[index]:
+            for lesson in self.by_course[course]:
+                if self.lessons[lesson][1] in slots:
+                    self._refresh(lesson)
+
+    def _best_slot(self, index, current=None, tabu=None, iteration=0):
+        """The room-free period with the fewest clashes, preferring days the course does not meet yet."""
+        days = {self.slots[self.lessons[lesson][1]].day for lesson in self.by_course[index]
+                if self.lessons[lesson][1] != current}
+        best, best_key = None, None
+        clash, count = self.clash[index], self.count[index]
+        for slot in range(len(self.slots)):
+            if slot == current or not self._room_free(index, slot):
+                continue
+            cost = clash[slot] + count[slot]
+            if tabu is not None and tabu.get((index, slot), -1) >= iteration and cost:
+                continue
+            key = (cost, self.slots[slot].day in days, self.rng.random())
+            if best_key is None or key < best_key:
+                best, best_key = slot, key
+        return best
+
+    def start(self):
+        """Greedy first placement: busiest courses first, each lesson where it clashes least."""
+        order = sorted(range(len(self.courses)),
+                       key=lambda index: (-len(self.neighbours[index]) * self.courses[index].lessons, self.rng.random()))
+        for index in order:
+            for _ in range(self.courses[index].lessons):
+                slot = self._best_slot(index)
+                if slot is None:
+                    raise TimetableError('There are more lessons than rooms across the week.')
+                self.by_course[index].append(len(self.lessons))
+                self.lessons.append([index, slot])
+                self._add(index, slot)
+        for lesson in range(len(self.lessons)):
+            self._refresh(lesson)
+
+    def repair(self, max_moves, deadline):
+        """
+        Min-conflicts search: move a clashing lesson to its least-clashing
+        period. When no single move helps, try swapping the lesson's Kempe
+        chain with another period, which can untangle clashes one move at a
+        time cannot; otherwise make the best move anyway, and keep lessons from
+        moving straight back with a tabu list. True once nothing clashes.
+        """
+        tabu = {}
+        for iteration in range(max_moves):
+            if not self.conflicted:
+                return True
+            if not iteration % 256 and time.perf_counter() > deadline:
+                return False
+            lesson = self.rng.choice(tuple(self.conflicted))
+            index, current = self.lessons[lesson]
+            slot = self._best_slot(index, current, tabu, iteration)
+            if slot is not None and self._cost(index, slot) >= self._cost(index, current) - 1:
+                other = self.rng.randrange(len(self.slots))
+                if other != current and self._try_chain(lesson, current, other):
+                    continue
+            if slot is None:
+                continue
+            self._remove(index, current)
+            self.lessons[lesson][1] = slot
+            self._add(index, slot)
+            tabu[(index, current)] = iteration + self.rng.randint(5, 15)
+            self._touch(index, (current, slot))
+        return not self.conflicted
+
+    def _try_chain(self, lesson, first, other):
+        """Swap ``lesson``'s Kempe chain into ``other`` if that lowers the clashes; True if it did."""
+        chain = self._chain(lesson, other)
+        before = self.total
+        if self._swap(chain, first, other) and self.total < before:
+            for changed in chain:
+                self._touch(self.lessons[changed][0], (first, other))
+            return True
+        self._swap(chain, first, other)
+        return False
+
+    def _chain(self, lesson, other):
+        """
+        The Kempe chain of ``lesson`` between its period and ``other``: the
+        lessons that must swap periods along with it to keep clashes from
+        spreading.
+        """
+        first = self.lessons[lesson][1]
+        chain, queue = {lesson}, [lesson]
+        while queue:
+            index, slot = self.lessons[queue.pop()]
+            target = other if slot == first else first
+            for course in [index] + self.neighbours[index]:
+                if not self.count[course][target]:
+                    continue
+                for linked in self.by_course[course]:
+                    if self.lessons[linked][1] == target and linked not in chain:
+                        chain.add(linked)
+                        queue.append(linked)
+        return chain
+
+    def _swap(self, chain, first, other):
+        """Move every lesson of ``chain`` to the other of the two periods; False if rooms run out."""
+        for lesson in chain:
+            self._remove(*self.lessons[lesson])
+        for lesson in chain:
+            index, slot = self.lessons[lesson]
+            self.lessons[lesson][1] = other if slot == first else first
+            self._add(index, self.lessons[lesson][1])
+        return self.tier_of is None or all(
+            used <= available
+            for slot in (first, other) for used, available in zip(self.used[slot], self.available)
+        )
+
+    def placed(self):
+        slots = [[] for _ in self.courses]
+        for index, slot in self.lessons:
+            slots[index].append(slot)
+        return slots
+
+
+def _assign_rooms(problem, search):
+    """Pair each period's lessons with rooms, largest class to largest room."""
+    by_slot = {}
+    for index, slots in enumerate(search.placed()):
+        for slot in slots:
+            by_slot.setdefault(slot, []).append(index)
+    placements = {course.course_id: [] for course in problem.courses}
+    for slot, indexes in by_slot.items():
+        indexes.sort(key=lambda index: -len(problem.courses[index].student_ids))
+        for position, index in enumerate(indexes):
+            room_id = None if problem.rooms is None else problem.rooms[position][0]
+            placements[problem.courses[index].course_id].append((problem.slots[slot].period_id, room_id))
+    return placements
+
+
+def _check_loads(problem):
+    """Fail fast on loads no timetable can hold."""
+    if not problem.slots:
+        raise TimetableError('There are no periods to schedule into.')
+    limit = len(problem.slots)
+    teachers, students = {}, {}
+    for course in problem.courses:
+        teachers[course.teacher_id] = teachers.get(course.teacher_id, 0) + course.lessons
+        for student_id in course.student_ids:
+            students[student_id] = students.get(student_id, 0) + course.lessons
+    if problem.rooms is not None and problem.lesson_count > limit * len(problem.rooms):
+        raise TimetableError(f'{problem.lesson_count} lessons do not fit in {len(problem.rooms)} rooms over {limit} periods.')
+    for kind, loads in (('teacher', teachers), ('student', students)):
+        over = [key for key, load in loads.items() if load > limit]
+        if over:
+            raise TimetableError(f'{len(over)} {kind}(s) have more lessons than the {limit} periods in a week.')
+
+
+def solve(problem, seed=0, max_restarts=MAX_RESTARTS, time_limit=TIME_LIMIT_SECONDS):
+    """Find a clash-free placement of every lesson in ``problem``."""
+    started = time.perf_counter()
+    _check_loads(problem)
+    neighbours = conflict_graph(problem.courses)
+    rng = random.Random(seed)
+    max_moves = max(problem.lesson_count * MOVES_PER_LESSON, 1000)
+    deadline = started + time_limit
+    for attempt in range(1, max_restarts + 1):
+        search = _Search(problem, neighbours, rng)
+        search.start()
+        if search.repair(max_moves, deadline):
+            return Solution(problem, _assign_rooms(problem, search), attempt, time.perf_counter() - started)
+        if time.perf_counter() > deadline:
+            break
+    raise TimetableError(
+        f'No clash-free timetable found in {attempt} attempt(s); '
+        'add periods or rooms, or reduce lessons per week.'
+    )
+
+
+def clashes(problem, placements):
+    """Double-booked (period id, kind, id) triples in a solution; empty when it is valid."""
+    courses = {course.course_id: course for course in problem.courses}
+    busy, found = set(), []
+    for course_id, lessons in placements.items():
+        course = courses[course_id]
+        for period_id, room_id in lessons:
+            keys = [('teacher', course.teacher_id), ('course', course_id)]
+            keys += [('student', student_id) for student_id in course.student_ids]
+            if room_id is not None:
+                keys.append(('room', room_id))
+            for kind, key in keys:
+                if (period_id, kind, key) in busy:
+                    found.append((period_id, kind, key))
+                busy.add((period_id, kind, key))
+    return found
+
+
+def load_problem(school_id):
+    """The timetabling problem for one school, read in four queries."""
+    enrolled = {}
+    rows = Student.courses.through.objects.filter(course__school_id=school_id).values_list('course_id', 'student_id')
+    for course_id, student_id in rows.iterator(chunk_size=5000):
+        enrolled.setdefault(course_id, []).append(student_id)
+    courses = [
+        CourseLoad(course_id, teacher_id, enrolled.get(course_id, ()), lessons, name)
+        for course_id, teacher_id, lessons, name in Course.objects.filter(school_id=school_id)
+        .order_by('pk').values_list('pk', 'teacher_id', 'lessons_per_week', 'name')
+    ]
+    slots = [
+        Slot(period_id, day)
+        for period_id, day in Period.objects.filter(school_id=school_id).order_by('day', 'index')
+        .values_list('pk', 'day')
+    ]
+    rooms = list(Room.objects.filter(school_id=school_id).values_list('pk', 'capacity'))
+    return Problem(courses, slots, rooms or None)
+
+
+def generate(school_id, seed=0):
+    """Solve the school's timetable and replace its saved entries with the result."""
+    problem = load_problem(school_id)
+    solution = solve(problem, seed=seed)
+    with transaction.atomic():
+        TimetableEntry.objects.filter(school_id=school_id).delete()
+        TimetableEntry.objects.bulk_create(
+            [
+                TimetableEntry(school_id=school_id, course_id=course_id, period_id=period_id, room_id=room_id)
+                for course_id, lessons in solution.placements.items()
+                for period_id, room_id in lessons
+            ],
+            batch_size=2000,
+        )
+    return solution
+
+
+def create_default_periods(school_id, per_day=8):
+    """Give a school without periods ``per_day`` numbered periods Monday to Friday."""
+    if Period.objects.filter(school_id=school_id).exists():
+        return 0
+    Period.objects.bulk_create([
+        Period(school_id=school_id, day=day, index=index)
+        for day, _ in Period.DAYS for index in range(1, per_day + 1)
+    ])
+    return len(Period.DAYS) * per_day
+
+
+def week(school_id, teacher_id=None):
+    """
+    The saved timetable as ``(day names, rows)`` for display: one row per
+    period number, holding ``(period, entries)`` for each day.
+    """
+    periods = list(Period.objects.filter(school_id=school_id).order_by('day', 'index'))
+    entries = TimetableEntry.objects.filter(school_id=school_id).select_related(
+        'course__teacher', 'room'
+    ).order_by('course__name')
+    if teacher_id is not None:
+        entries = entries.filter(course__teacher_id=teacher_id)
+    by_period = {}
+    for entry in entries:
+        by_period.setdefault(entry.period_id, []).append(entry)
+    days = sorted({period.day for period in periods})
+    cells = {(period.day, period.index): period for period in periods}
+    rows = []
+    for index in sorted({period.index for period in periods}):
+        row = []
+        for day in days:
+            period = cells.get((day, index))
+            row.append((period, by_period.get(period.pk, []) if period else []))
+        rows.append((index, row))
+    return [dict(Period.DAYS)[day] for day in days], rows
+
+
+def synthetic_problem(students, periods_per_day=8, days=5, class_size=40, seed=0):
+    """
+    An in-memory school shaped like a Nigerian secondary school: six grades
+    split into arms of ``class_size``, each arm taking the core subjects
+    together, plus per-grade language and religion options that mix arms.
+    Teachers carry up to ~27 lessons a week.
+    """
+    rng = random.Random(seed)
+    core = (('Mathematics', 5), ('English Language', 5), ('Basic Science', 4), ('Social Studies', 3),
+            ('Civic Education', 2), ('Agricultural Science', 2), ('Computer Studies', 3),
+            ('Physical Education', 2), ('Business Studies', 3))
+    options = ((('French', 'Yoruba', 'Igbo', 'Hausa'), 3), (('CRS', 'IRS'), 2))
+    grades = ('JSS1', 'JSS2', 'JSS3', 'SS1', 'SS2', 'SS3')
+    per_grade = [students // len(grades) + (g < students % len(grades)) for g in range(len(grades))]
+
+    courses, next_student = [], 0
+    pools = {}  # subject -> [[teacher id, lessons a week]]
+
+    def teacher_for(subject, lessons):
+        pool = pools.setdefault(subject, [])
+        for entry in pool:
+            if entry[1] + lessons <= 27:
+                entry[1] += lessons
+                return entry[0]
+        teacher_id = sum(len(taken) for taken in pools.values()) + 1
+        pool.append([teacher_id, lessons])
+        return teacher_id
+
+    def add(subject, members, lessons, label):
+        courses.append(CourseLoad(len(courses) + 1, teacher_for(subject, lessons), members, lessons, label))
+
+    for grade, count in zip(grades, per_grade):
+        ids = list(range(next_student, next_student + count))
+        next_student += count
+        arms = max(1, -(-count // class_size))
+        for arm in range(arms):
+            members = ids[arm::arms]
+            for subject, lessons in core:
+                add(subject, members, lessons, f'{grade}{string.ascii_uppercase[arm % 26]} {subject}')
+        for subjects, lessons in options:
+            chosen = {}
+            for student_id in ids:
+                chosen.setdefault(rng.choice(subjects), []).append(student_id)
+            for subject, members in chosen.items():
+                # Sections take neighbouring arms together, as a school would.
+                members.sort(key=lambda student_id: (student_id - ids[0]) % arms)
+                sections = max(1, -(-len(members) // class_size))
+                size = -(-len(members) // sections)
+                for section in range(sections):
+                    add(subject, members[section * size:(section + 1) * size], lessons,
+                        f'{grade} {subject} {section + 1}')
+
+    slots = [Slot(day * periods_per_day + period, day) for day in range(days) for period in range(periods_per_day)]
+    # A classroom per arm plus about a quarter spare for option sections.
+    classrooms = sum(max(1, -(-count // class_size)) for count in per_grade)
+    rooms = [(room, class_size) for room in range(classrooms + classrooms // 4 + 2)]
+    return Problem(courses, slots, rooms)
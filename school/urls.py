@@ -5,12 +5,23 @@ urlpatterns = [
     path('', views.landing, name='landing'),
     path('dashboard/', views.dashboard, name='dashboard'),
     path('register/', views.register, name='register'),
+    path('schools/lookup/', views.school_lookup, name='school_lookup'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('profile/', views.teacher_profile, name='teacher_profile'),
     path('lesson-plan/', views.submit_lesson_plan, name='lesson_plan'),
     path('parent-view/', views.parent_view_student, name='parent_view'),
     path('approve-lesson-plan/', views.approve_lesson_plan, name='approve_lesson_plan'),
+    path('students/import/', views.import_students, name='import_students'),
+    path('gradebook/averages/', views.class_averages, name='class_averages'),
+    path('attendance/<int:course_id>/', views.roll_call, name='roll_call'),
+    path('api/v1/sync/', views.sync_changes, name='sync_changes'),
+    path('search/', views.search_view, name='search'),
+    path('timetable/', views.timetable_view, name='timetable'),
+    path('rollover/', views.rollover_view, name='rollover'),
+    path('history/<slug:model>/<int:object_id>/', views.object_history, name='object_history'),
+    path('exports/', views.export_index, name='export_index'),
+    path('exports/<slug:dataset>/', views.export_data, name='export_data'),
     
     # Add these dashboard-specific URLs for better routing
     path('teacher-dashboard/', views.teacher_dashboard, name='teacher_dashboard'),
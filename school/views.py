@@ -1,30 +1,41 @@
-from django.shortcuts import render, redirect
+import asyncio
+import hashlib
+import json
+
+from django.apps import apps
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
-from django.contrib.auth.forms import UserCreationForm
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import Group
-from .models import School, TeacherProfile, ParentProfile, Student, LessonPlan, Club, Course, Assignment
-from django import forms
-from django.contrib.auth.models import User
-
-class CustomUserCreationForm(UserCreationForm):
-    ROLE_CHOICES = (
-        ('Proprietor', 'Proprietor'),
-        ('HeadTeacher', 'HeadTeacher'),
-        ('ViceAdmin', 'Vice Admin'),
-        ('ViceAcademics', 'Vice Academics'),
-        ('Teacher', 'Teacher'),
-        ('Parent', 'Parent'),
-    )
-    role = forms.ChoiceField(choices=ROLE_CHOICES)
-    school = forms.ModelChoiceField(queryset=School.objects.all(), required=False)
+from django.core.handlers.asgi import ASGIRequest
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import router, transaction
+from django.db.models import Count, Prefetch, Q
+from .models import School, TeacherProfile, ParentProfile, Student, LessonPlan, Club, Course, Assignment, AttendanceRecord, Job
+from .decorators import role_required
+from .db_router import replica_reads
+from . import roles
+from . import attendance
+from . import caching
+from . import sync
+from . import search
+from . import jobs
+from . import parallel
+from . import summaries
+from .terms import current_term
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
 
-    class Meta:
-        model = User
-        fields = ('username', 'email', 'password1', 'password2', 'role', 'school')
+ASSIGNMENTS_PER_PAGE = 20
 
 def register(request):
+    from .forms import CustomUserCreationForm
+
     if request.method == 'POST':
         form = CustomUserCreationForm(request.POST)
         if form.is_valid():
@@ -39,11 +50,12 @@ def register(request):
             group, created = Group.objects.get_or_create(name=role)
             user.groups.add(group)
             
-            # Create appropriate profile
-            if role == 'Teacher':
-                TeacherProfile.objects.create(user=user, school=school)
-            elif role == 'Parent':
+            # Create appropriate profile. Staff belong to their school through
+            # a TeacherProfile too; without one they would have no school.
+            if role == 'Parent':
                 ParentProfile.objects.create(user=user, school=school)
+            else:
+                TeacherProfile.objects.create(user=user, school=school)
             
             messages.success(request, f'Account created successfully! Welcome, {user.username}!')
             login(request, user)
@@ -52,9 +64,18 @@ def register(request):
             messages.error(request, 'Please correct the errors below.')
     else:
         form = CustomUserCreationForm()
-    
+
     return render(request, 'register.html', {'form': form})
 
+@require_GET
+def school_lookup(request):
+    from . import directory
+
+    response = JsonResponse({'results': directory.lookup(request.GET.get('q', ''))})
+    # Public and identical for everyone; a new school is at most a minute late.
+    patch_cache_control(response, public=True, max_age=60)
+    return response
+
 def login_view(request):
     if request.user.is_authenticated:
         return redirect('dashboard')
@@ -70,7 +91,7 @@ def login_view(request):
             return redirect('dashboard')
         else:
             messages.error(request, 'Invalid username or password. Please try again.')
-    
+
     return render(request, 'login.html')
 
 def logout_view(request):
@@ -87,113 +108,157 @@ def landing(request):
 @login_required
 def dashboard(request):
     """Main dashboard that redirects to role-specific dashboards"""
-    user_groups = request.user.groups.values_list('name', flat=True)
-    
-    if 'Proprietor' in user_groups:
+    role = roles.primary_role(request.roles)
+
+    if role == roles.PROPRIETOR:
         return redirect('proprietor_dashboard')
-    elif 'HeadTeacher' in user_groups:
+    elif role == roles.HEAD_TEACHER:
         return redirect('headteacher_dashboard')
-    elif 'ViceAdmin' in user_groups:
+    elif role in (roles.VICE_ADMIN, roles.VICE_ACADEMICS):
         return redirect('vice_dashboard')
-    elif 'ViceAcademics' in user_groups:
-        return redirect('vice_dashboard')
-    elif 'Teacher' in user_groups:
+    elif role == roles.TEACHER:
         return redirect('teacher_dashboard')
-    elif 'Parent' in user_groups:
+    elif role == roles.PARENT:
         return redirect('parent_dashboard')
-    
+
     # Fallback for users without specific roles
     return render(request, 'home.html', {'user': request.user})
 
-# Role-specific dashboard views
-@login_required
-def proprietor_dashboard(request):
-    if not request.user.groups.filter(name='Proprietor').exists():
-        messages.error(request, 'Access denied.')
-        return redirect('dashboard')
-    return render(request, 'proprietor_dashboard.html')
+# Role-specific dashboard views. The async ones run their independent blocks of
+# queries and cache lookups concurrently (school/parallel.py); under WSGI
+# Django runs them in an event loop of their own.
+@role_required(roles.PROPRIETOR)
+@replica_reads
+async def proprietor_dashboard(request):
+    from . import analytics
 
-@login_required
-def headteacher_dashboard(request):
-    if not request.user.groups.filter(name='HeadTeacher').exists():
-        messages.error(request, 'Access denied.')
-        return redirect('dashboard')
-    return render(request, 'headteacher_dashboard.html')
+    context = {'admin_enabled': apps.is_installed('django.contrib.admin')}
+    if request.school_id is not None:
+        context['summary'], (context['terms'], context['results']) = await parallel.gather(
+            (summaries.get, request.school_id),
+            (analytics.dashboard, request.school_id, request.GET.get('term')),
+        )
+    return render(request, 'proprietor_dashboard.html', context)
 
-@login_required
+@role_required(roles.HEAD_TEACHER)
+@replica_reads
+async def headteacher_dashboard(request):
+    from . import analytics
+
+    school_id = request.school_id
+
+    def plan_counts():
+        return LessonPlan.objects.filter(school_id=school_id).aggregate(
+            total=Count('id'),
+            approved=Count('id', filter=Q(approved=True)),
+        )
+
+    def recent_pending():
+        return list(
+            LessonPlan.objects.filter(school_id=school_id, approved=False)
+            .select_related('teacher')
+            .only('id', 'title', 'submission_date', 'teacher__username', 'teacher__first_name', 'teacher__last_name')
+            .order_by('-submission_date', '-id')[:5]
+        )
+
+    async def stats():
+        plans, teacher_count, student_count, pending = await parallel.gather(
+            plan_counts,
+            TeacherProfile.objects.filter(school_id=school_id).count,
+            Student.objects.filter(school_id=school_id).count,
+            recent_pending,
+        )
+        return {
+            'pending_approvals': plans['total'] - plans['approved'],
+            'approval_rate': round(100 * plans['approved'] / plans['total']) if plans['total'] else None,
+            'teacher_count': teacher_count,
+            'student_count': student_count,
+            'recent_pending': pending,
+        }
+
+    context, (terms, results), version = await asyncio.gather(
+        caching.acached(school_id, 'headteacher_dashboard', stats),
+        parallel.run(analytics.dashboard, school_id, request.GET.get('term')),
+        caching.aget_version(school_id),
+    )
+    context['terms'], context['results'] = terms, results
+    context['cache_version'] = version
+    context['cache_timeout'] = caching.timeout()
+    context['admin_enabled'] = apps.is_installed('django.contrib.admin')
+    return render(request, 'headteacher_dashboard.html', context)
+
+@role_required(roles.VICE_ADMIN, roles.VICE_ACADEMICS)
+@replica_reads
 def vice_dashboard(request):
-    if not request.user.groups.filter(name__in=['ViceAdmin', 'ViceAcademics']).exists():
-        messages.error(request, 'Access denied.')
-        return redirect('dashboard')
-    return render(request, 'vice_dashboard.html')
+    context = {'admin_enabled': apps.is_installed('django.contrib.admin')}
+    if request.school_id is not None:
+        context['summary'] = summaries.get(request.school_id)
+    return render(request, 'vice_dashboard.html', context)
 
-@login_required
-def teacher_dashboard(request):
-    if not request.user.groups.filter(name='Teacher').exists():
-        messages.error(request, 'Access denied.')
-        return redirect('dashboard')
-    
+@role_required(roles.TEACHER)
+@replica_reads
+async def teacher_dashboard(request):
     # Get teacher's profile and relevant data
-    try:
-        profile = TeacherProfile.objects.get(user=request.user)
-        lesson_plans = LessonPlan.objects.filter(teacher=request.user).order_by('-created_at')[:5]
-        pending_approvals = LessonPlan.objects.filter(teacher=request.user, approved=False).count()
-    except TeacherProfile.DoesNotExist:
-        profile = None
-        lesson_plans = []
-        pending_approvals = 0
-    
+    profile = request.teacher_profile
+    plans = LessonPlan.objects.filter(teacher_id=request.user.pk)
+
+    async def teacher_data():
+        lesson_plans, pending_approvals = await parallel.gather(
+            lambda: list(plans.order_by('-submission_date', '-id')[:5]),
+            plans.filter(approved=False).count,
+        )
+        return {'lesson_plans': lesson_plans, 'pending_approvals': pending_approvals}
+
+    async def no_data():
+        return {'lesson_plans': [], 'pending_approvals': 0}
+
+    data, version = await asyncio.gather(
+        caching.acached(request.school_id, 'teacher_dashboard', teacher_data, request.user.pk)
+        if profile is not None else no_data(),
+        caching.aget_version(request.school_id),
+    )
+
     context = {
         'profile': profile,
-        'lesson_plans': lesson_plans,
-        'pending_approvals': pending_approvals,
+        'lesson_plans': data['lesson_plans'],
+        'pending_approvals': data['pending_approvals'],
+        'cache_version': version,
+        'cache_timeout': caching.timeout(),
     }
     return render(request, 'teacher_dashboard.html', context)
 
-@login_required
+@role_required(roles.PARENT)
+@replica_reads
 def parent_dashboard(request):
-    if not request.user.groups.filter(name='Parent').exists():
-        messages.error(request, 'Access denied.')
-        return redirect('dashboard')
-    
-    try:
-        profile = ParentProfile.objects.get(user=request.user)
+    profile = request.parent_profile
+    if profile is not None:
         students = profile.students.all()
+        # Subquery on the enrolled courses rather than joining through the
+        # enrollment table, which repeats an assignment once per sibling.
         recent_assignments = Assignment.objects.filter(
-            course__student__in=students
-        ).order_by('-due_date')[:5]
-    except ParentProfile.DoesNotExist:
-        profile = None
+            course__in=Course.objects.filter(student__in=students).values('id')
+        ).order_by('-due_date', '-id')[:5]
+    else:
         students = []
         recent_assignments = []
-    
+
     context = {
         'profile': profile,
         'students': students,
         'recent_assignments': recent_assignments,
+        'notifications': request.user.notifications.order_by('-created_at')[:5],
     }
     return render(request, 'parent_dashboard.html', context)
 
-class TeacherProfileForm(forms.ModelForm):
-    class Meta:
-        model = TeacherProfile
-        fields = ['courses_taught']
-        widgets = {
-            'courses_taught': forms.SelectMultiple(attrs={'class': 'w-full p-2 border rounded-lg'}),
-        }
-
-@login_required
+@role_required(roles.TEACHER)
 def teacher_profile(request):
-    if not request.user.groups.filter(name='Teacher').exists():
-        messages.error(request, 'Access denied.')
-        return redirect('dashboard')
-    
-    try:
-        profile = TeacherProfile.objects.get(user=request.user)
-    except TeacherProfile.DoesNotExist:
+    from .forms import TeacherProfileForm
+
+    profile = request.teacher_profile
+    if profile is None:
         messages.error(request, 'Teacher profile not found.')
         return redirect('dashboard')
-    
+
     if request.method == 'POST':
         form = TeacherProfileForm(request.POST, instance=profile)
         if form.is_valid():
@@ -202,113 +267,364 @@ def teacher_profile(request):
             return redirect('teacher_profile')
     else:
         form = TeacherProfileForm(instance=profile)
-    
-    return render(request, 'teacher_profile.html', {'form': form, 'profile': profile})
 
-class LessonPlanForm(forms.ModelForm):
-    class Meta:
-        model = LessonPlan
-        fields = ['title', 'objective', 'materials', 'activities']
-        widgets = {
-            'title': forms.TextInput(attrs={'class': 'w-full p-2 border rounded-lg'}),
-            'objective': forms.Textarea(attrs={'class': 'w-full p-2 border rounded-lg', 'rows': 3}),
-            'materials': forms.Textarea(attrs={'class': 'w-full p-2 border rounded-lg', 'rows': 3}),
-            'activities': forms.Textarea(attrs={'class': 'w-full p-2 border rounded-lg', 'rows': 5}),
-        }
+    return render(request, 'teacher_profile.html', {'form': form, 'profile': profile})
 
-@login_required
+@role_required(roles.TEACHER)
 def submit_lesson_plan(request):
-    if not request.user.groups.filter(name='Teacher').exists():
-        messages.error(request, 'Access denied.')
-        return redirect('dashboard')
-    
-    try:
-        profile = TeacherProfile.objects.get(user=request.user)
-    except TeacherProfile.DoesNotExist:
+    from .forms import LessonPlanForm
+
+    if request.teacher_profile is None:
         messages.error(request, 'Teacher profile not found.')
         return redirect('dashboard')
-    
+
     if request.method == 'POST':
         form = LessonPlanForm(request.POST)
         if form.is_valid():
             plan = form.save(commit=False)
             plan.teacher = request.user
-            plan.school = profile.school
-            plan.save()
+            plan.school_id = request.school_id
+            with transaction.atomic():
+                plan.save()
+                jobs.enqueue('lesson_plan_submitted', {'plan_id': plan.pk})
             messages.success(request, 'Lesson plan submitted successfully! It is now pending approval.')
             return redirect('teacher_dashboard')
     else:
         form = LessonPlanForm()
-    
+
     return render(request, 'lesson_plan.html', {'form': form})
 
-@login_required
+@role_required(roles.PARENT)
+@replica_reads
 def parent_view_student(request):
-    if not request.user.groups.filter(name='Parent').exists():
-        messages.error(request, 'Access denied.')
-        return redirect('dashboard')
-    
-    try:
-        profile = ParentProfile.objects.get(user=request.user)
-        students = profile.students.all()
-        assignments = Assignment.objects.filter(
-            course__student__in=students
-        ).order_by('-due_date')
-    except ParentProfile.DoesNotExist:
+    from . import gradebook
+
+    profile = request.parent_profile
+    if profile is None:
         messages.error(request, 'Parent profile not found.')
         return redirect('dashboard')
-    
+
+    # One query for the children and one each for their courses and clubs,
+    # however many children the parent has.
+    students = list(profile.students.prefetch_related(
+        Prefetch('courses', queryset=Course.objects.only('id', 'name', 'description')),
+        Prefetch('clubs', queryset=Club.objects.only('id', 'name', 'description')),
+    ).order_by('name'))
+    course_ids = {course.id for student in students for course in student.courses.all()}
+
+    # Each assignment belongs to exactly one course, so filtering on the
+    # course ids cannot produce duplicates when siblings share a course.
+    assignments = Assignment.objects.filter(course_id__in=course_ids).order_by('-due_date', '-id')
+    page = Paginator(assignments, ASSIGNMENTS_PER_PAGE).get_page(request.GET.get('page'))
+
+    student_ids = [student.id for student in students]
+    report_cards = {}
+    for row in gradebook.report_cards(student_ids):
+        report_cards.setdefault(row['student_id'], []).append(row)
+    term = current_term()
+    attendance_summaries = attendance.summaries_for(student_ids, term)
+
+    for student in students:
+        enrolled = {course.id for course in student.courses.all()}
+        student.assignment_list = [a for a in page if a.course_id in enrolled]
+        student.report_card = report_cards.get(student.id, [])
+        student.attendance_summary = attendance_summaries.get(student.id)
+
     context = {
         'students': students,
-        'assignments': assignments,
+        'assignments': page,
+        'page_obj': page,
+        'term': term,
     }
     return render(request, 'parent_view.html', context)
 
-class LessonPlanApprovalForm(forms.ModelForm):
-    rejection_reason = forms.CharField(
-        widget=forms.Textarea(attrs={'class': 'w-full p-2 border rounded-lg', 'rows': 3, 'placeholder': 'Optional feedback for the teacher...'}),
-        required=False
-    )
-
-    class Meta:
-        model = LessonPlan
-        fields = ['approved', 'rejection_reason']
-        widgets = {
-            'approved': forms.Select(choices=[(True, 'Approve'), (False, 'Reject')], attrs={'class': 'w-full p-2 border rounded-lg'}),
-        }
-
-@login_required
+@role_required(roles.HEAD_TEACHER)
 def approve_lesson_plan(request):
-    if not request.user.groups.filter(name='HeadTeacher').exists():
-        messages.error(request, 'Access denied.')
-        return redirect('dashboard')
-    
-    try:
-        profile = TeacherProfile.objects.get(user=request.user)
-        lesson_plans = LessonPlan.objects.filter(school=profile.school, approved=False).order_by('-created_at')
-    except TeacherProfile.DoesNotExist:
+    from . import approvals
+    from .forms import BulkReviewForm, LessonPlanApprovalForm
+
+    if request.teacher_profile is None:
         messages.error(request, 'Profile not found.')
         return redirect('dashboard')
-    
-    if request.method == 'POST':
+
+    form = LessonPlanApprovalForm()
+    if request.method == 'POST' and 'plan_ids' in request.POST:
+        bulk_form = BulkReviewForm(request.POST, school_id=request.school_id)
+        if bulk_form.is_valid():
+            approved = bulk_form.cleaned_data['action'] == 'approve'
+            updated = approvals.review_plans(
+                request.school_id,
+                [plan.id for plan in bulk_form.cleaned_data['plan_ids']],
+                approved,
+                bulk_form.cleaned_data['rejection_reason'],
+            )
+            action = "approved" if approved else "rejected"
+            messages.success(request, f'{updated} lesson plan(s) have been {action}.')
+            return redirect('approve_lesson_plan')
+        messages.error(request, 'Select at least one lesson plan and an action.')
+    elif request.method == 'POST':
         plan_id = request.POST.get('plan_id')
         try:
-            plan = LessonPlan.objects.get(id=plan_id, school=profile.school)
+            plan = LessonPlan.objects.get(id=plan_id, school_id=request.school_id)
             form = LessonPlanApprovalForm(request.POST, instance=plan)
             if form.is_valid():
-                form.save()
-                action = "approved" if plan.approved else "rejected"
+                # The same path as bulk reviews: pending count, audit and notification.
+                approved = form.cleaned_data['approved']
+                approvals.review_plans(request.school_id, [plan.id], approved, form.cleaned_data['rejection_reason'])
+                action = "approved" if approved else "rejected"
                 messages.success(request, f'Lesson plan "{plan.title}" has been {action}.')
                 return redirect('approve_lesson_plan')
-        except LessonPlan.DoesNotExist:
+        except (LessonPlan.DoesNotExist, ValueError):
             messages.error(request, 'Lesson plan not found.')
-    
-    else:
-        form = LessonPlanApprovalForm()
-    
+
+    lesson_plans, next_cursor = approvals.pending_page(request.school_id, request.GET.get('after'))
     context = {
         'lesson_plans': lesson_plans,
         'form': form,
-        'pending_count': lesson_plans.count(),
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('after'),
+    }
+    return render(request, 'approve_lesson_plan.html', context)
+
+@role_required(roles.HEAD_TEACHER, roles.VICE_ADMIN)
+def import_students(request):
+    from .forms import RosterUploadForm
+    from .roster import RosterError, import_roster
+
+    if request.school_id is None:
+        messages.error(request, 'Your account is not linked to a school.')
+        return redirect('dashboard')
+
+    report = None
+    if request.method == 'POST':
+        form = RosterUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            roster = form.cleaned_data['roster']
+            try:
+                report = import_roster(
+                    roster, roster.name, School(pk=request.school_id),
+                    dry_run=form.cleaned_data['dry_run'],
+                )
+            except RosterError as exc:
+                messages.error(request, str(exc))
+            else:
+                messages.success(request, str(report))
+    else:
+        form = RosterUploadForm()
+
+    return render(request, 'import_students.html', {'form': form, 'report': report})
+
+@role_required(roles.HEAD_TEACHER, roles.VICE_ACADEMICS, roles.PROPRIETOR)
+@replica_reads
+def class_averages(request):
+    from . import gradebook
+
+    if request.school_id is None:
+        messages.error(request, 'Your account is not linked to a school.')
+        return redirect('dashboard')
+
+    terms = gradebook.terms(request.school_id)
+    term = request.GET.get('term') or (terms[0] if terms else None)
+    averages = gradebook.class_averages(request.school_id, term) if term else []
+
+    context = {
+        'terms': terms,
+        'term': term,
+        'averages': averages,
+    }
+    return render(request, 'class_averages.html', context)
+
+@role_required(roles.TEACHER, roles.HEAD_TEACHER)
+def roll_call(request, course_id):
+    from .forms import RollCallForm
+
+    course = get_object_or_404(Course, pk=course_id, school_id=request.school_id)
+    if course.teacher_id != request.user.id and roles.HEAD_TEACHER not in request.roles:
+        messages.error(request, 'You can only take attendance for your own courses.')
+        return redirect('dashboard')
+
+    students = list(attendance.course_roster(course))
+    form = RollCallForm(request.POST or None, initial={'date': timezone.localdate()})
+    if request.method == 'POST' and form.is_valid():
+        statuses = {
+            student.id: request.POST.get(f'status_{student.id}', AttendanceRecord.PRESENT)
+            for student in students
+        }
+        try:
+            saved = attendance.record_roll_call(
+                request.school_id, form.cleaned_data['date'], statuses, recorded_by=request.user
+            )
+        except ValueError as exc:
+            messages.error(request, str(exc))
+        else:
+            messages.success(request, f'Attendance saved for {saved} students in {course.name}.')
+            return redirect('roll_call', course_id=course.id)
+
+    context = {
+        'course': course,
+        'students': students,
+        'form': form,
+        'status_choices': AttendanceRecord.STATUS_CHOICES,
+    }
+    return render(request, 'roll_call.html', context)
+
+@login_required
+@gzip_page
+@require_GET
+def sync_changes(request):
+    """Versioned JSON delta sync; see school/sync.py for the payload format."""
+    if not request.roles:
+        return JsonResponse({'error': 'Access denied.'}, status=403)
+    try:
+        payload = sync.changes_since(request, request.GET.get('cursor'))
+    except sync.InvalidCursor as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+
+    body = json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':'))
+    etag = '"%s"' % hashlib.md5(body.encode(), usedforsecurity=False).hexdigest()
+    # GZipMiddleware-style weakening turns "abc" into W/"abc"; compare loosely.
+    if etag in request.headers.get('If-None-Match', '').replace('W/', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+@role_required(roles.HEAD_TEACHER, roles.VICE_ADMIN, roles.VICE_ACADEMICS, roles.PROPRIETOR, roles.TEACHER)
+@replica_reads
+def search_view(request):
+    from .forms import SearchForm
+
+    if request.school_id is None:
+        messages.error(request, 'Your account is not linked to a school.')
+        return redirect('dashboard')
+
+    form = SearchForm(request.GET)
+    hits = []
+    if form.is_valid() and form.cleaned_data['q']:
+        doc_types = [form.cleaned_data['type']] if form.cleaned_data['type'] else search.DOC_TYPES
+        hits = search.search(form.cleaned_data['q'], request.school_id, doc_types)
+
+    return render(request, 'search.html', {'form': form, 'hits': hits})
+
+@role_required(roles.HEAD_TEACHER, roles.VICE_ACADEMICS)
+def timetable_view(request):
+    from . import timetable
+
+    if request.school_id is None:
+        messages.error(request, 'Your account is not linked to a school.')
+        return redirect('dashboard')
+
+    pending = Job.objects.filter(
+        task='generate_timetable', payload__school_id=request.school_id, status__in=(Job.QUEUED, Job.RUNNING)
+    ).exists()
+    if request.method == 'POST':
+        if request.POST.get('action') == 'create_periods':
+            created = timetable.create_default_periods(request.school_id)
+            messages.success(request, f'{created} periods created.')
+        elif pending:
+            messages.info(request, 'A timetable is already being generated.')
+        else:
+            jobs.enqueue('generate_timetable', {'school_id': request.school_id, 'user_id': request.user.pk})
+            messages.success(request, 'Timetable generation has started. You will be notified when it is ready.')
+        return redirect('timetable')
+
+    teacher_id = request.GET.get('teacher', '')
+    teacher_id = int(teacher_id) if teacher_id.isdigit() else None
+    days, rows = timetable.week(request.school_id, teacher_id)
+    context = {
+        'days': days,
+        'rows': rows,
+        'pending': pending,
+        'teacher_id': teacher_id,
+        'teachers': Course.objects.filter(school_id=request.school_id).order_by('teacher__username')
+        .values_list('teacher_id', 'teacher__username').distinct(),
+        'notifications': request.user.notifications.order_by('-created_at')[:3],
     }
-    return render(request, 'approve_lesson_plan.html', context)
\ No newline at end of file
+    return render(request, 'timetable.html', context)
+
+@role_required(roles.PROPRIETOR, roles.HEAD_TEACHER)
+def rollover_view(request):
+    from . import rollover
+    from .models import RolloverRun
+
+    if request.school_id is None:
+        messages.error(request, 'Your account is not linked to a school.')
+        return redirect('dashboard')
+
+    pending = Job.objects.filter(
+        task='rollover_term', payload__school_id=request.school_id, status__in=(Job.QUEUED, Job.RUNNING)
+    ).exists()
+    if request.method == 'POST':
+        promote = {'yes': True, 'no': False}.get(request.POST.get('promote'))
+        if pending:
+            messages.info(request, 'A rollover is already running.')
+            return redirect('rollover')
+        try:
+            run = rollover.start(request.school_id, request.POST.get('term') or None, promote, request.user)
+        except rollover.RolloverError as error:
+            messages.error(request, str(error))
+            return redirect('rollover')
+        if run.finished_at is not None:
+            messages.info(request, f'{run.term} has already been rolled over.')
+        else:
+            jobs.enqueue('rollover_term', {'run_id': run.pk, 'school_id': request.school_id})
+            messages.success(request, f'The rollover of {run.term} has started. You will be notified when it is done.')
+        return redirect('rollover')
+
+    context = {
+        'runs': RolloverRun.objects.filter(school_id=request.school_id).order_by('-created_at')[:10],
+        'term': rollover.previous_term(),
+        'pending': pending,
+    }
+    return render(request, 'rollover.html', context)
+
+@role_required(roles.PROPRIETOR, roles.HEAD_TEACHER, roles.VICE_ADMIN, roles.VICE_ACADEMICS)
+def object_history(request, model, object_id):
+    from . import audit
+
+    if model not in {audited._meta.model_name for audited in audit.AUDITED}:
+        raise Http404('No history for this kind of record.')
+    context = {
+        'model': model,
+        'object_id': object_id,
+        'events': audit.history(model, object_id, request.school_id),
+    }
+    return render(request, 'object_history.html', context)
+
+@role_required(roles.PROPRIETOR, roles.HEAD_TEACHER)
+def export_index(request):
+    from . import exports, gradebook
+
+    if request.school_id is None:
+        messages.error(request, 'Your account is not linked to a school.')
+        return redirect('dashboard')
+
+    terms = gradebook.terms(request.school_id)
+    if current_term() not in terms:
+        terms.insert(0, current_term())
+    context = {
+        'datasets': [(name, label, by_term) for name, (label, _, by_term) in exports.DATASETS.items()],
+        'terms': terms,
+    }
+    return render(request, 'exports.html', context)
+
+@role_required(roles.PROPRIETOR, roles.HEAD_TEACHER)
+@replica_reads
+def export_data(request, dataset):
+    from . import exports
+
+    if request.school_id is None:
+        messages.error(request, 'Your account is not linked to a school.')
+        return redirect('dashboard')
+    if dataset not in exports.DATASETS:
+        raise Http404('Unknown export.')
+
+    fmt = request.GET.get('format') if request.GET.get('format') in exports.CONTENT_TYPES else 'csv'
+    term = request.GET.get('term') or current_term()
+    school = get_object_or_404(School.objects.only('id', 'name'), pk=request.school_id)
+    # Rows are read while the response streams, after this view (and its
+    # replica routing) has returned, so the database is chosen now.
+    return exports.response(school, dataset, fmt, term, using=router.db_for_read(Student) or 'default',
+                            asynchronous=isinstance(request, ASGIRequest))